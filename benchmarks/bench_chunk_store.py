@@ -0,0 +1,102 @@
+"""
+Startup του QueryAI: τα παλιά <name>_chunks.pkl + <name>_chunks_embeddings.npy
+(pickle.load + np.load + normalize) vs το memory-mapped chunk store. Μετρά χρόνο
+φόρτωσης, RSS μετά τη φόρτωση και χρόνο του πρώτου brute-force query (top-k
+και αποκωδικοποίηση των chunks τους). Κάθε φόρτωση τρέχει σε νέο process.
+
+    python -m benchmarks.bench_chunk_store --sizes 10000 100000 --dtype float32 float16 int8
+"""
+import os
+import sys
+import json
+import pickle
+import argparse
+import tempfile
+import subprocess
+import numpy as np
+
+from benchmarks.bench_retrieval import synthetic_embeddings
+from core.chunk_store import ChunkStore
+
+LOAD_SCRIPT = """
+import os, sys, json, time, pickle
+import numpy as np
+from core.chunk_store import ChunkStore
+kind, folder, k = sys.argv[1], sys.argv[2], 5
+query = np.load(os.path.join(folder, "query.npy"))
+
+start = time.perf_counter()
+if kind == "pickle":
+    with open(os.path.join(folder, "schema_chunks.pkl"), "rb") as f:
+        chunks = pickle.load(f)
+    embeddings = np.load(os.path.join(folder, "schema_chunks_embeddings.npy"))
+    embeddings = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+else:
+    store = ChunkStore.load(os.path.join(folder, kind))
+load = time.perf_counter() - start
+
+start = time.perf_counter()
+if kind == "pickle":
+    sims = embeddings @ query
+    hits = [chunks[i] for i in np.argsort(-sims)[:k]]
+else:
+    sims = store.scores(query)
+    hits = [store.chunk(*store.locate(int(i))) for i in np.argsort(-sims)[:k]]
+first_query = time.perf_counter() - start
+
+with open("/proc/self/status") as f:
+    rss_mb = next(int(line.split()[1]) for line in f if line.startswith("VmRSS")) / 1024
+print(json.dumps({"load_ms": round(load * 1000, 1), "first_query_ms": round(first_query * 1000, 1),
+                  "rss_mb": round(rss_mb, 1)}))
+"""
+
+
+def measure(kind, folder):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    out = subprocess.run([sys.executable, "-c", LOAD_SCRIPT, kind, folder], cwd=root,
+                         capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def disk_mb(*paths):
+    total = 0
+    for path in paths:
+        if os.path.isdir(path):
+            total += sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+        else:
+            total += os.path.getsize(path)
+    return round(total / 1e6, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--dtype", nargs="+", default=["float32", "float16", "int8"])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    for n in args.sizes:
+        embeddings = synthetic_embeddings(n, args.dim, rng)
+        normalized = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+        chunks = [[{"table": f"s{i % 4}.Table{i}", "columns": [f"Column{j}" for j in range(12)],
+                    "primary_key": [f"Table{i}ID"], "importance_score": 0}] for i in range(n)]
+
+        with tempfile.TemporaryDirectory() as folder:
+            np.save(os.path.join(folder, "query.npy"), normalized[0])
+            pkl = os.path.join(folder, "schema_chunks.pkl")
+            npy = os.path.join(folder, "schema_chunks_embeddings.npy")
+            with open(pkl, "wb") as f:
+                pickle.dump(chunks, f)
+            np.save(npy, embeddings)
+
+            row = {"chunks": n, "pickle": {"disk_mb": disk_mb(pkl, npy), **measure("pickle", folder)}}
+            for dtype in args.dtype:
+                path = os.path.join(folder, dtype)
+                ChunkStore.save(path, {"schema": (chunks, normalized)}, "bench", "", dtype=dtype)
+                row[f"store_{dtype}"] = {"disk_mb": disk_mb(path), **measure(dtype, folder)}
+        print(json.dumps(row))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+# ----------------------------- benchmarks/bench_context.py -----------------------------
+"""
+Prompt context του QueryAI: παλιά chunks των 50 πινάκων (JSON με indent=2), ένα
+chunk ανά πίνακα με επέκταση στον graph σε JSON γραμμές, και το ίδιο σε γραμμές
+DDL με token budget (QueryAI.build_prompt). Μετρά tokens του prompt, πόσα prompts
+δεν χωρούν στο n_ctx μαζί με τα max_tokens της απάντησης, χρόνο του StubLLM και
+join recall (ερώτηση για πίνακα με FK: μπήκαν και οι δύο πίνακες στο context;).
+Με --model τα tokens μετρώνται με τον tokenizer του GGUF (vocab_only), αλλιώς ~3
+χαρακτήρες ανά token.
+
+    python -m benchmarks.bench_context --tables 500 --questions 100
+"""
+import os
+import re
+import json
+import time
+import random
+import argparse
+import tempfile
+
+from benchmarks.stubs import LexicalStubEmbedder, StubTokenizer
+from benchmarks.synthetic import synthetic_schema
+from core.graph_builder import GraphBuilder
+from core.chunks import MultiJSONChunker
+from core.query_ai import QueryAI
+from core.llm_server import StubLLM
+from core.prompts import build_sql_prompt, estimate_tokens, token_counter
+
+
+def legacy_context(query_ai, question, max_tokens):
+    # Η παλιά μορφή: τα top_k chunks ολόκληρα, με indent=2
+    top_chunks = query_ai.similarity_search(question)
+    context_text = ""
+    for c in top_chunks:
+        context_text += f"Source: {c['source']}\n{json.dumps(c['chunk'], indent=2)}\n\n"
+    return build_sql_prompt(context_text, question), {e["table"] for c in top_chunks for e in c["chunk"]}
+
+
+def json_context(query_ai, question, max_tokens):
+    # Η προηγούμενη μορφή: JSON γραμμές, greedy μέσα στα context_tokens με estimate_tokens
+    tables, used = [], 0
+    for entry in query_ai.retrieve_tables(question, budget=10 ** 9):
+        cost = estimate_tokens(json.dumps(entry))
+        if used + cost <= query_ai.context_tokens:
+            tables.append(entry)
+            used += cost
+    context_text = "\n".join(json.dumps(t) for t in tables)
+    return build_sql_prompt(context_text, question), {t["table"] for t in tables}
+
+
+def ddl_context(query_ai, question, max_tokens):
+    prompt, _, _ = query_ai.build_prompt(question, max_tokens=max_tokens)
+    return prompt, set(re.findall(r"^([\w.\[\]]+)\(", prompt, re.MULTILINE))
+
+
+def run(base, db_name, chunk_size, questions, context_fn, embedder, tokenizer, max_tokens):
+    MultiJSONChunker(base, db_name, chunk_size=chunk_size, embed_model=embedder, cache_path=None).run()
+    llm = StubLLM(prompt_token_ms=0.5, gen_token_ms=0.0)
+    # Το QueryAI χρησιμοποιεί το llm μόνο για tokens/n_ctx: το prompt φτιάχνεται χωρίς παραγωγή
+    query_ai = QueryAI(base, db_name, top_k=3, llm=tokenizer, embed_model=embedder, result_cache_path=None)
+    count = token_counter(tokenizer)
+
+    tokens, overflows, hits, elapsed = [], 0, 0, 0.0
+    for question, pair in questions:
+        prompt, tables = context_fn(query_ai, question, max_tokens)
+        tokens.append(count(prompt))
+        overflows += tokens[-1] + max_tokens > query_ai.n_ctx
+        start = time.perf_counter()
+        llm(prompt, max_tokens=1)
+        elapsed += time.perf_counter() - start
+        hits += pair <= tables
+    return {
+        "avg_prompt_tokens": round(sum(tokens) / len(tokens), 1),
+        "max_prompt_tokens": max(tokens),
+        "overflows": overflows,
+        "avg_stub_llm_ms": round(elapsed / len(questions) * 1000, 3),
+        "join_recall": round(hits / len(questions), 3)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tables", type=int, default=500)
+    parser.add_argument("--columns", type=int, default=12)
+    parser.add_argument("--questions", type=int, default=100)
+    parser.add_argument("--n-ctx", type=int, default=2048)
+    parser.add_argument("--max-tokens", type=int, default=1024)
+    parser.add_argument("--model", help="GGUF για μέτρηση με τον πραγματικό tokenizer")
+    args = parser.parse_args()
+
+    if args.model:
+        from llama_cpp import Llama
+        tokenizer = Llama(model_path=args.model, n_ctx=args.n_ctx, vocab_only=True, verbose=False)
+    else:
+        tokenizer = StubTokenizer(n_ctx=args.n_ctx)
+
+    db_name = "bench"
+    schema = synthetic_schema(tables=args.tables, columns=args.columns, shared_id_columns=0, fk_density=1.0)
+    rnd = random.Random(0)
+    fks = [(f"{sch}.{tbl}", f"{fk['ref_schema']}.{fk['ref_table']}")
+           for sch, tables in schema["schemas"].items() for tbl, t in tables.items() for fk in t["foreign_keys"]]
+    questions = []
+    for source, target in rnd.sample(fks, min(args.questions, len(fks))):
+        table = source.split(".", 1)[1]
+        questions.append((f"List the {table} rows with their details", {source, target}))
+
+    embedder = LexicalStubEmbedder()
+    results = {"tables": args.tables, "questions": len(questions)}
+    with tempfile.TemporaryDirectory() as base:
+        db_folder = os.path.join(base, "databases", db_name)
+        os.makedirs(db_folder)
+        with open(os.path.join(db_folder, f"{db_name}.json"), "w", encoding="utf-8") as f:
+            json.dump(schema, f)
+        GraphBuilder(base, db_name).build()
+
+        options = (embedder, tokenizer, args.max_tokens)
+        results["legacy_50_tables_per_chunk"] = run(base, db_name, 50, questions, legacy_context, *options)
+        results["per_table_json_lines"] = run(base, db_name, 1, questions, json_context, *options)
+        results["per_table_ddl_budgeted"] = run(base, db_name, 1, questions, ddl_context, *options)
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
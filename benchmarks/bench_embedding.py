@@ -0,0 +1,68 @@
+# ----------------------------- benchmarks/bench_embedding.py -----------------------------
+"""
+Chunks/sec του MultiJSONChunker.embed_chunks: παλιό loop (ένα encode ανά chunk),
+batched με άδειο cache (cold), batched με γεμάτο cache (warm) και rebuild μετά
+από αλλαγή σε έναν πίνακα.
+
+    python -m benchmarks.bench_embedding --tables 2000 --chunk-size 1
+    python -m benchmarks.bench_embedding --tables 2000 --stub   # χωρίς το πραγματικό μοντέλο
+"""
+import os
+import time
+import json
+import argparse
+import tempfile
+
+from benchmarks.stubs import StubEmbedder
+from benchmarks.synthetic import synthetic_schema
+from core.chunks import MultiJSONChunker
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tables", type=int, default=2000)
+    parser.add_argument("--chunk-size", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--stub", action="store_true", help="StubEmbedder αντί για SentenceTransformer")
+    args = parser.parse_args()
+
+    model = StubEmbedder() if args.stub else args.model
+    schema = synthetic_schema(tables=args.tables)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        chunker = MultiJSONChunker(tmp, "bench", chunk_size=args.chunk_size, embed_model=model,
+                                   batch_size=args.batch_size,
+                                   cache_path=os.path.join(tmp, "cache", "embeddings.sqlite"))
+        chunks = chunker.chunk_json(schema, "schema")
+        n = len(chunks)
+        results = {"tables": args.tables, "chunks": n, "model": chunker.embed_model_name}
+
+        def legacy():
+            for chunk in chunks:
+                chunker.embed_model.encode(json.dumps(chunk), convert_to_numpy=True)
+
+        results["legacy_per_chunk_chunks_per_s"] = round(n / timed(legacy), 1)
+        results["batched_cold_chunks_per_s"] = round(n / timed(lambda: chunker.embed_chunks(chunks)), 1)
+        results["batched_warm_chunks_per_s"] = round(n / timed(lambda: chunker.embed_chunks(chunks)), 1)
+
+        # Μικρή αλλαγή σχήματος: ένας πίνακας παίρνει μία στήλη παραπάνω
+        first_schema = next(iter(schema["schemas"].values()))
+        first_table = next(iter(first_schema.values()))
+        first_table["columns"].append({"name": "NewColumn", "type": "int", "max_length": 4, "nullable": True})
+        changed = chunker.chunk_json(schema, "schema")
+        results["rebuild_after_one_table_change_s"] = round(timed(lambda: chunker.embed_chunks(changed)), 4)
+        results["cache_hits"] = chunker.cache.hits
+        results["cache_misses"] = chunker.cache.misses
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
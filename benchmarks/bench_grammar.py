@@ -0,0 +1,128 @@
+"""
+Grammar-constrained SQL decoding (core.sql_grammar):
+
+1. Compile: χρόνος και μέγεθος του GBNF για όλο το σχήμα σε μεγάλους καταλόγους, χρόνος
+   του grammar ανά ερώτηση (πίνακες του context), χρόνος ανάγνωσης από το GrammarMatcher
+   και, αν υπάρχει το llama-cpp-python, από το LlamaGrammar.from_string.
+2. Decode: QueryAI με StubLLM που γράφει πρόλογο, φλυαρεί και κάθε τόσο βάζει πίνακα που
+   δεν υπάρχει, με sql_grammar off / context / schema: tokens ανά απάντηση, ποσοστό SQL
+   που δεν τηρεί το σχήμα (θα ξαναζητηθεί) και p50/p95 του grammar ανά ερώτηση (span
+   query.grammar). Ο χρόνος του StubLLM δεν μετράει: ελέγχει το grammar στην Python.
+
+    python -m benchmarks.bench_grammar --tables 1000 10000 50000 --questions 200
+"""
+import os
+import json
+import time
+import random
+import argparse
+import tempfile
+
+from benchmarks.stubs import LexicalStubEmbedder
+from benchmarks.synthetic import synthetic_schema
+from core.sql_grammar import build_sql_grammar, GrammarMatcher
+from core.graph_builder import GraphBuilder
+from core.chunks import MultiJSONChunker
+from core.query_ai import QueryAI
+from core.llm_server import StubLLM
+from core.instrumentation import instrumentation
+
+
+def schema_tables(schema):
+    return [(f"{sch}.{tbl}", [c["name"] for c in info.get("columns", [])])
+            for sch, tables in schema["schemas"].items() for tbl, info in tables.items()]
+
+
+def llama_compile_seconds(gbnf):
+    try:
+        from llama_cpp import LlamaGrammar
+    except ImportError:
+        return None
+    start = time.perf_counter()
+    LlamaGrammar.from_string(gbnf, verbose=False)
+    return round(time.perf_counter() - start, 4)
+
+
+def compile_row(n_tables, columns, context_tables, rnd):
+    tables = schema_tables(synthetic_schema(tables=n_tables, columns=columns, fk_density=1.0))
+    start = time.perf_counter()
+    gbnf = build_sql_grammar(tables)
+    build_s = time.perf_counter() - start
+    start = time.perf_counter()
+    matcher = GrammarMatcher(gbnf)
+    parse_s = time.perf_counter() - start
+
+    key, cols = tables[rnd.randrange(len(tables))]
+    sql = f"SELECT t.{cols[0]}, COUNT(*) AS N FROM {key} t WHERE t.{cols[-1]} IS NOT NULL GROUP BY t.{cols[0]};"
+    start = time.perf_counter()
+    valid = matcher.complete(sql)
+    match_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    for _ in range(20):
+        build_sql_grammar(rnd.sample(tables, min(context_tables, len(tables))))
+    context_ms = (time.perf_counter() - start) / 20 * 1000
+    return {"tables": n_tables, "columns": n_tables * columns, "schema_grammar_kb": round(len(gbnf) / 1024, 1),
+            "build_s": round(build_s, 4), "parse_s": round(parse_s, 4), "llama_compile_s": llama_compile_seconds(gbnf),
+            "match_ms": round(match_ms, 3), "sample_valid": valid, "context_grammar_ms": round(context_ms, 3)}
+
+
+def decode_rows(args):
+    db_name = "bench"
+    rnd = random.Random(1)
+    schema = synthetic_schema(tables=args.decode_tables, columns=12, fk_density=1.0)
+    tables = [t for ts in schema["schemas"].values() for t in ts]
+    questions = [f"Show the {rnd.choice(tables)} rows of week {i}" for i in range(args.questions)]
+    validator = GrammarMatcher(build_sql_grammar(schema_tables(schema)))
+
+    rows = []
+    with tempfile.TemporaryDirectory() as base:
+        db_folder = os.path.join(base, "databases", db_name)
+        os.makedirs(db_folder)
+        with open(os.path.join(db_folder, f"{db_name}.json"), "w", encoding="utf-8") as f:
+            json.dump(schema, f)
+        GraphBuilder(base, db_name, export_json=False).build()
+        MultiJSONChunker(base, db_name, embed_model=LexicalStubEmbedder(), cache_path=None).run()
+
+        for mode in ("off", "context", "schema"):
+            llm = StubLLM(prompt_token_ms=0.0, gen_token_ms=0.0, ramble_tokens=args.ramble_tokens,
+                          preamble=args.preamble, hallucinate_every=args.hallucinate_every)
+            query_ai = QueryAI(base, db_name, llm=llm, embed_model=LexicalStubEmbedder(),
+                               result_cache_path=None, sql_grammar=mode)
+            tokens, invalid = 0, 0
+            instrumentation.reset()
+            instrumentation.configure(enabled=True)
+            for question in questions:
+                pieces = list(query_ai.stream_sql(question))
+                tokens += len(pieces)
+                invalid += not validator.complete("".join(pieces).strip())
+            instrumentation.configure(enabled=False)
+            grammar = instrumentation.metrics().get("query.grammar", {})
+            rows.append({"mode": mode, "questions": len(questions),
+                         "tokens_per_answer": round(tokens / len(questions), 2),
+                         "invalid_pct": round(100 * invalid / len(questions), 1),
+                         "grammar_p50_ms": grammar.get("p50_ms", 0.0), "grammar_p95_ms": grammar.get("p95_ms", 0.0)})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tables", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--columns", type=int, default=20)
+    parser.add_argument("--context-tables", type=int, default=12)
+    parser.add_argument("--decode-tables", type=int, default=300)
+    parser.add_argument("--questions", type=int, default=200)
+    parser.add_argument("--preamble", default="Here is the SQL query:")
+    parser.add_argument("--ramble-tokens", type=int, default=20)
+    parser.add_argument("--hallucinate-every", type=int, default=5)
+    args = parser.parse_args()
+
+    rnd = random.Random(0)
+    for n_tables in args.tables:
+        print(json.dumps(compile_row(n_tables, args.columns, args.context_tables, rnd)))
+    for row in decode_rows(args):
+        print(json.dumps(row))
+
+
+if __name__ == "__main__":
+    main()
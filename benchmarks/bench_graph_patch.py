@@ -0,0 +1,146 @@
+# ----------------------------- benchmarks/bench_graph_patch.py -----------------------------
+"""
+GraphBuilder.patch (incremental refresh) vs πλήρες build() στο ίδιο νέο σχήμα. Σε ένα
+συνθετικό σχήμα (χωρίς δηλωμένες FK, ώστε οι στήλες *ID να γίνουν virtual FK) προσθέτει
+πίνακες με PK ίδιο με υπάρχουσες στήλες *ID (νέοι υποψήφιοι για στήλες που δεν
+άλλαξαν), αφαιρεί πίνακες-στόχους και αλλάζει κάποιους άλλους. Στο αρχικό σχήμα
+υπάρχουν --mirrors πίνακες Mirror* με PK μια στήλη *ID, ώστε οι στήλες της να έχουν
+πάνω από virtual_top_k υποψηφίους, και το patch αφαιρεί τον Mirror που είναι στις top_k
+(ο επόμενος πρέπει να πάρει τη θέση του). Ελέγχει ότι κόμβοι,
+ακμές και virtual ακμές του patched graph είναι ίδιες με του rebuilt και ότι καμία
+στήλη δεν έχει πάνω από virtual_top_k virtual ακμές.
+
+    python -m benchmarks.bench_graph_patch --tables 500 2000 --added 20 --removed 10 --altered 10 --mirrors 4
+"""
+import os
+import json
+import time
+import random
+import argparse
+import tempfile
+from collections import Counter
+
+from benchmarks.synthetic import synthetic_schema
+from core.graph_builder import GraphBuilder
+
+
+def write_schema(base, db_name, schema):
+    db_folder = os.path.join(base, "databases", db_name)
+    os.makedirs(db_folder, exist_ok=True)
+    with open(os.path.join(db_folder, f"{db_name}.json"), "w", encoding="utf-8") as f:
+        json.dump(schema, f)
+
+
+def id_columns(schema):
+    return [(sch, tbl, col["name"]) for sch, ts in schema["schemas"].items() for tbl, info in ts.items()
+            for col in info["columns"][1:] if col["name"].endswith("ID")]
+
+
+def add_mirrors(schema, n, rnd):
+    """n πίνακες με PK την ίδια στήλη *ID, στο ίδιο schema (Mirror0 πρώτος στις ισοβαθμίες)."""
+    column = rnd.choice([c for _, _, c in id_columns(schema) if c not in ("TenantID", "CompanyID")])
+    sch = next(iter(schema["schemas"]))
+    for i in range(n):
+        schema["schemas"][sch][f"Mirror{i}"] = {
+            "columns": [{"name": column, "type": "int", "max_length": 4, "nullable": False}],
+            "primary_key": [column], "foreign_keys": [], "indexes": [], "constraints": []
+        }
+    return f"{sch}.Mirror0" if n else None
+
+
+def mutate(schema, args, rnd, mirror=None):
+    """Νέο σχήμα και (changed, removed) κλειδιά για το patch."""
+    schema = json.loads(json.dumps(schema))
+    changed, removed = [], []
+    if mirror is not None:
+        sch, tbl = mirror.split(".", 1)
+        del schema["schemas"][sch][tbl]
+        removed.append(mirror)
+    tables = [(sch, tbl) for sch, ts in schema["schemas"].items() for tbl in ts if not tbl.startswith("Mirror")]
+    sources = id_columns(schema)
+
+    for sch, tbl in rnd.sample(tables, args.removed):
+        del schema["schemas"][sch][tbl]
+        removed.append(f"{sch}.{tbl}")
+    tables = [(sch, tbl) for sch, ts in schema["schemas"].items() for tbl in ts]
+    for sch, tbl in rnd.sample(tables, args.altered):
+        schema["schemas"][sch][tbl]["columns"].append(
+            {"name": f"Extra{len(changed)}", "type": "nvarchar", "max_length": 100, "nullable": True})
+        changed.append(f"{sch}.{tbl}")
+    # Λίγες στήλες με πολλούς νέους υποψηφίους η καθεμία: πάνω από virtual_top_k
+    columns = [column for _, _, column in rnd.sample(sources, max(1, args.added // 4))]
+    for i in range(args.added):
+        column = columns[i % len(columns)]
+        sch = rnd.choice(list(schema["schemas"]))
+        tbl = f"Archive{i}"
+        schema["schemas"][sch][tbl] = {
+            "columns": [{"name": column, "type": "int", "max_length": 4, "nullable": False}],
+            "primary_key": [column], "foreign_keys": [], "indexes": [], "constraints": []
+        }
+        changed.append(f"{sch}.{tbl}")
+    return schema, changed, removed
+
+
+def edge_key(edge):
+    return edge["type"], edge["from"], edge["column"], edge["to"], edge["ref_column"], edge["confidence"]
+
+
+def normalized(graph):
+    nodes = {key: (json.dumps(node["columns"], sort_keys=True), tuple(node["primary_key"]),
+                   sorted(map(edge_key, node["outgoing_edges"])), sorted(map(edge_key, node["incoming_edges"])))
+             for key, node in graph["nodes"].items()}
+    return nodes, sorted(map(edge_key, graph["edges"])), sorted(map(edge_key, graph["virtual_edges"]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tables", type=int, nargs="+", default=[500, 2000])
+    parser.add_argument("--columns", type=int, default=12)
+    parser.add_argument("--fk-density", type=float, default=1.5)
+    parser.add_argument("--added", type=int, default=20)
+    parser.add_argument("--removed", type=int, default=10)
+    parser.add_argument("--altered", type=int, default=10)
+    parser.add_argument("--mirrors", type=int, default=4, help="Υποψήφιοι στόχοι μιας στήλης (> virtual_top_k)")
+    args = parser.parse_args()
+
+    db_name = "bench"
+    for n_tables in args.tables:
+        rnd = random.Random(n_tables)
+        schema = synthetic_schema(tables=n_tables, columns=args.columns, fk_density=args.fk_density)
+        for tables in schema["schemas"].values():
+            for info in tables.values():
+                info["foreign_keys"] = []
+        mirror = add_mirrors(schema, args.mirrors, rnd)
+        new_schema, changed, removed = mutate(schema, args, rnd, mirror)
+
+        with tempfile.TemporaryDirectory() as patched_base, tempfile.TemporaryDirectory() as rebuilt_base:
+            write_schema(patched_base, db_name, schema)
+            GraphBuilder(patched_base, db_name, export_json=False).build()
+            write_schema(patched_base, db_name, new_schema)
+            start = time.perf_counter()
+            GraphBuilder(patched_base, db_name, export_json=False).patch(changed, removed)
+            patch_s = time.perf_counter() - start
+            patched = GraphBuilder(patched_base, db_name, export_json=False).load()
+
+            write_schema(rebuilt_base, db_name, new_schema)
+            start = time.perf_counter()
+            GraphBuilder(rebuilt_base, db_name, export_json=False).build()
+            build_s = time.perf_counter() - start
+            rebuilt = GraphBuilder(rebuilt_base, db_name, export_json=False).load()
+
+        per_column = Counter((e["from"], e["column"]) for e in patched["virtual_edges"])
+        patched_nodes, patched_edges, patched_virtual = normalized(patched)
+        rebuilt_nodes, rebuilt_edges, rebuilt_virtual = normalized(rebuilt)
+        print(json.dumps({
+            "tables": n_tables, "changed": len(changed), "removed": len(removed),
+            "patch_s": round(patch_s, 3), "build_s": round(build_s, 3),
+            "virtual_edges": len(rebuilt_virtual),
+            "max_virtual_per_column": max(per_column.values(), default=0),
+            "same_nodes": patched_nodes == rebuilt_nodes,
+            "same_edges": patched_edges == rebuilt_edges,
+            "same_virtual_edges": patched_virtual == rebuilt_virtual
+        }))
+
+
+if __name__ == "__main__":
+    main()
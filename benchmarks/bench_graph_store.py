@@ -0,0 +1,113 @@
+"""
+<db>_graph.json vs core.graph_store: μέγεθος στο δίσκο, χρόνος φόρτωσης και RSS
+ενός νέου process μετά τη φόρτωση, και χρόνος neighbour lookup / shortest join path.
+Κάθε φόρτωση τρέχει σε ξεχωριστό subprocess ώστε το RSS να μη μοιράζεται.
+
+Τα lookups γίνονται στα ίδια ~1000 κλειδιά και για τα δύο: node_lookup_cold_us η πρώτη
+ανάγνωση κάθε κόμβου, node_lookup_us οι επόμενες. Το lookup_ok ελέγχει ότι το store δεν
+είναι πιο αργό από το JSON (με --lookup-tolerance) και αλλιώς το exit code είναι 1.
+
+    python -m benchmarks.bench_graph_store --tables 5000 50000
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+
+from benchmarks.synthetic import synthetic_schema
+from core.graph_builder import GraphBuilder
+
+LOAD_SCRIPT = """
+import sys, json, time, random
+from core.graph_store import GraphStore
+kind, path = sys.argv[1], sys.argv[2]
+start = time.perf_counter()
+if kind == "json":
+    with open(path, "r", encoding="utf-8") as f:
+        nodes = json.load(f)["nodes"]
+else:
+    nodes = GraphStore.load(path)
+load = time.perf_counter() - start
+names = sorted(nodes.keys())
+keys = names[::max(1, len(names) // 1000)]
+# VmRSS και όχι ru_maxrss: το ru_maxrss κρατά το peak του parent μετά το fork
+with open("/proc/self/status") as f:
+    rss_mb = next(int(line.split()[1]) for line in f if line.startswith("VmRSS")) / 1024
+
+def lookups(sample):
+    start = time.perf_counter()
+    for key in sample:
+        node = nodes.get(key)
+        [e["to"] for e in node["outgoing_edges"]] + [e["from"] for e in node["incoming_edges"]]
+    return (time.perf_counter() - start) / len(sample)
+
+cold = lookups(keys)
+rnd = random.Random(0)
+sample = [rnd.choice(keys) for _ in range(20000)]
+lookup = min(lookups(sample) for _ in range(5))
+
+path_ms = None
+if kind == "store":
+    start = time.perf_counter()
+    for a, b in zip(sample[:100], sample[100:200]):
+        nodes.shortest_join_path(a, b)
+    path_ms = round((time.perf_counter() - start) / 100 * 1000, 3)
+print(json.dumps({"load_seconds": round(load, 3), "rss_mb": round(rss_mb, 1),
+                  "node_lookup_cold_us": round(cold * 1e6, 1), "node_lookup_us": round(lookup * 1e6, 2),
+                  "shortest_path_ms": path_ms}))
+"""
+
+
+def disk_mb(path):
+    if os.path.isdir(path):
+        return round(sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path)) / 1e6, 2)
+    return round(os.path.getsize(path) / 1e6, 2)
+
+
+def measure(kind, path):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    out = subprocess.run([sys.executable, "-c", LOAD_SCRIPT, kind, path], cwd=root,
+                         capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tables", type=int, nargs="+", default=[5000, 50000])
+    parser.add_argument("--columns", type=int, default=12)
+    parser.add_argument("--lookup-tolerance", type=float, default=0.25,
+                        help="Ανεκτή διαφορά του node_lookup_us από το JSON (0.25 = +25%%)")
+    args = parser.parse_args()
+
+    slower = False
+    for n in args.tables:
+        db_name = "bench"
+        schema = synthetic_schema(tables=n, columns=args.columns, fk_density=1.0)
+        # Οι μισοί πίνακες χωρίς δηλωμένες FK, ώστε να υπάρχουν και virtual ακμές
+        for tables in schema["schemas"].values():
+            for table in list(tables.values())[::2]:
+                table["foreign_keys"] = []
+
+        with tempfile.TemporaryDirectory() as base:
+            db_folder = os.path.join(base, "databases", db_name)
+            os.makedirs(db_folder)
+            with open(os.path.join(db_folder, f"{db_name}.json"), "w", encoding="utf-8") as f:
+                json.dump(schema, f)
+            builder = GraphBuilder(base, db_name)
+            start = time.perf_counter()
+            builder.build()
+            row = {"tables": n, "build_seconds": round(time.perf_counter() - start, 2)}
+            for kind, path in (("json", builder.graph_file), ("store", builder.store_path)):
+                row[kind] = {"disk_mb": disk_mb(path), **measure(kind, path)}
+        row["lookup_ok"] = row["store"]["node_lookup_us"] <= row["json"]["node_lookup_us"] * (1 + args.lookup_tolerance)
+        slower = slower or not row["lookup_ok"]
+        print(json.dumps(row))
+    if slower:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
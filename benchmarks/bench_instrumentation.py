@@ -0,0 +1,119 @@
+"""
+Κόστος του core.instrumentation σε όλο το pipeline (stats σε SQLite stand-in, graph,
+chunks με stub embedder) και σε Q ερωτήσεις του QueryAI με StubLLM: χρόνος με
+instrumentation κλειστό, ανοιχτό (metrics στη μνήμη), με JSON lines και με cProfile
+στα hot paths. Στο τέλος η ανάλυση ανά span και έλεγχος ότι τα sql_roundtrips των spans
+συμφωνούν με τα round-trips που μέτρησε το stand-in connection.
+
+    python -m benchmarks.bench_instrumentation --tables 200 --rows 2000 --questions 200
+"""
+import os
+import json
+import time
+import random
+import sqlite3
+import argparse
+import tempfile
+
+from benchmarks.standin import create_standin, CountingConnection
+from benchmarks.stubs import LexicalStubEmbedder
+from benchmarks.synthetic import synthetic_schema
+from core.instrumentation import instrumentation
+from core.stats_collector import StatsCollector
+from core.graph_builder import GraphBuilder
+from core.chunks import MultiJSONChunker
+from core.query_ai import QueryAI
+from core.llm_server import StubLLM
+
+MODES = {
+    "off": {"enabled": False, "profiling": False, "jsonl": False},
+    "on": {"enabled": True, "profiling": False, "jsonl": False},
+    "on+jsonl": {"enabled": True, "profiling": False, "jsonl": True},
+    "on+profile": {"enabled": True, "profiling": True, "jsonl": False},
+}
+
+
+def run(tmp, mode, args, standin_path, names, schema, questions):
+    options = MODES[mode]
+    base = os.path.join(tmp, mode.replace("+", "_"))
+    db_name = "bench"
+    db_folder = os.path.join(base, "databases", db_name)
+    os.makedirs(db_folder)
+    with open(os.path.join(db_folder, f"{db_name}.json"), "w", encoding="utf-8") as f:
+        json.dump(schema, f)
+
+    jsonl_path = os.path.join(tmp, f"{mode}.jsonl") if options["jsonl"] else None
+    instrumentation.reset()
+    instrumentation.configure(enabled=options["enabled"], profiling=options["profiling"], jsonl_path=jsonl_path)
+
+    connections = []
+
+    def connect():
+        connections.append(CountingConnection(sqlite3.connect(standin_path), names))
+        return connections[-1]
+
+    start = time.perf_counter()
+    StatsCollector(base, db_name, mode="full", dialect="sqlite", connect=connect).collect_stats()
+    GraphBuilder(base, db_name, export_json=False).build()
+    MultiJSONChunker(base, db_name, embed_model=LexicalStubEmbedder(), cache_path=None).run()
+    pipeline = time.perf_counter() - start
+
+    query_ai = QueryAI(base, db_name, llm=StubLLM(prompt_token_ms=0.0, gen_token_ms=0.0),
+                       embed_model=LexicalStubEmbedder(), result_cache_path=None)
+    start = time.perf_counter()
+    for question in questions:
+        "".join(query_ai.stream_sql(question))
+    queries = time.perf_counter() - start
+    instrumentation.configure(enabled=False, profiling=False, jsonl_path=None)
+
+    metrics = instrumentation.metrics()
+    row = {"mode": mode, "pipeline_s": round(pipeline, 3), "queries_s": round(queries, 3),
+           "spans": sum(m["count"] for m in metrics.values())}
+    if jsonl_path:
+        row["jsonl_kb"] = round(os.path.getsize(jsonl_path) / 1024, 1)
+    if options["enabled"]:
+        counted = sum(m.get("sql_roundtrips", 0) for m in metrics.values())
+        row["sql_roundtrips"] = counted
+        row["roundtrips_match"] = counted == sum(c.round_trips for c in connections)
+    return row, metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tables", type=int, default=200)
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--questions", type=int, default=200)
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=list(MODES))
+    args = parser.parse_args()
+
+    rnd = random.Random(0)
+    schema = synthetic_schema(tables=args.tables, columns=12, shared_id_columns=0, fk_density=1.0)
+    tables = [t for ts in schema["schemas"].values() for t in ts]
+    questions = [f"Show the {rnd.choice(tables)} rows of week {i}" for i in range(args.questions)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        standin_path = os.path.join(tmp, "standin.sqlite")
+        names = create_standin(standin_path, tables=args.tables, rows=args.rows)
+
+        rows, breakdown = [], None
+        for mode in args.modes:
+            row, metrics = run(tmp, mode, args, standin_path, names, schema, questions)
+            rows.append(row)
+            if mode == "on":
+                breakdown = metrics
+
+        baseline = next((r for r in rows if r["mode"] == "off"), None)
+        for row in rows:
+            if baseline is not None:
+                row["overhead_pct"] = round(100 * ((row["pipeline_s"] + row["queries_s"])
+                                                   / (baseline["pipeline_s"] + baseline["queries_s"]) - 1), 1)
+            print(json.dumps(row))
+        for name, metric in (breakdown or {}).items():
+            print(json.dumps({"span": name, **metric}))
+        report = instrumentation.profile_report("query.retrieve", top=8)
+        if report:
+            print(report)
+
+
+if __name__ == "__main__":
+    main()
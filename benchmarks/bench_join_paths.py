@@ -0,0 +1,82 @@
+"""
+Join path index (core.join_index) vs BFS τη στιγμή της ερώτησης
+(GraphStore.shortest_join_path): χρόνος κατασκευής, μέγεθος του index, χρόνος
+lookup (μόνο confidence/hops και ολόκληρο μονοπάτι) και χρόνος του BFS, για
+ζεύγη πινάκων που συνδέονται μέσα σε max_hops.
+
+    python -m benchmarks.bench_join_paths --tables 2000 20000 --max-hops 3
+"""
+import os
+import json
+import time
+import random
+import argparse
+import tempfile
+
+from benchmarks.synthetic import synthetic_schema
+from core.graph_builder import GraphBuilder
+from core.graph_store import GraphStore
+from core.join_index import JoinPathIndex
+
+
+def per_call_us(fn, pairs):
+    start = time.perf_counter()
+    for a, b in pairs:
+        fn(a, b)
+    return round((time.perf_counter() - start) / len(pairs) * 1e6, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tables", type=int, nargs="+", default=[2000, 20000])
+    parser.add_argument("--columns", type=int, default=12)
+    parser.add_argument("--max-hops", type=int, default=3)
+    parser.add_argument("--max-targets", type=int, default=64)
+    parser.add_argument("--pairs", type=int, default=1000)
+    args = parser.parse_args()
+
+    for n in args.tables:
+        db_name = "bench"
+        schema = synthetic_schema(tables=n, columns=args.columns, fk_density=1.5)
+        with tempfile.TemporaryDirectory() as base:
+            db_folder = os.path.join(base, "databases", db_name)
+            os.makedirs(db_folder)
+            with open(os.path.join(db_folder, f"{db_name}.json"), "w", encoding="utf-8") as f:
+                json.dump(schema, f)
+            builder = GraphBuilder(base, db_name, export_json=False, join_max_hops=args.max_hops,
+                                   join_max_targets=args.max_targets)
+            builder.build()
+            store = GraphStore.load(builder.store_path)
+
+            start = time.perf_counter()
+            index = JoinPathIndex.build(store, max_hops=args.max_hops, max_targets=args.max_targets)
+            build_seconds = time.perf_counter() - start
+            index.save(builder.join_index_path)
+            index = JoinPathIndex.load(builder.join_index_path)
+
+            # Ζεύγη με μονοπάτι 2+ βημάτων: αυτά που χρειάζονται hint στο prompt
+            rnd = random.Random(0)
+            rows = [i for i in range(index.size) if index.hops[i] >= 2]
+            pairs = []
+            for i in rnd.sample(rows, min(args.pairs, len(rows))):
+                source = int(index.src_ptr.searchsorted(i, side="right")) - 1
+                pairs.append((store.node_name(source), store.node_name(int(index.dst[i]))))
+            ids = [(store.node_id(a), store.node_id(b)) for a, b in pairs]
+
+            size_mb = sum(os.path.getsize(os.path.join(builder.join_index_path, f))
+                          for f in os.listdir(builder.join_index_path)) / 1e6
+            row = {
+                "tables": n,
+                "edges": store.edge_count,
+                "index_paths": index.size,
+                "index_mb": round(size_mb, 2),
+                "index_build_seconds": round(build_seconds, 2),
+                "lookup_by_id_us": per_call_us(index.lookup, ids),
+                "path_from_index_us": per_call_us(lambda a, b: index.path(store, a, b), pairs),
+                "bfs_us": per_call_us(lambda a, b: store.shortest_join_path(a, b, max_hops=args.max_hops), pairs)
+            }
+        print(json.dumps(row))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+# ----------------------------- benchmarks/bench_pipeline.py -----------------------------
+"""
+Όλη η pipeline σε συνθετικά catalogs (benchmarks.synthetic) σε όποια κλίμακα χρειαστεί:
+SchemaLoader (catalog stand-in του ίδιου σχήματος), GraphBuilder, StatsCollector (SQLite
+stand-in με τα ίδια δεδομένα), MultiJSONChunker, φόρτωμα του QueryAI, similarity_search
+και generate_sql με ντετερμινιστικό StubLLM. Κάθε κλίμακα τρέχει σε νέο process και
+για κάθε στάδιο δίνει χρόνο, peak RSS (και αύξησή του στο στάδιο), bytes που γράφτηκαν
+στον φάκελο της βάσης και, με --tracemalloc, peak των Python allocations.
+
+Με --output γράφει ένα JSON (version, python, παράμετροι, αποτελέσματα) για σύγκριση
+ανάμεσα σε εκδόσεις. Με --baseline συγκρίνει με ένα παλιότερο τέτοιο αρχείο και
+επιστρέφει exit code 1 όταν κάποιο στάδιο είναι πάνω από --tolerance χειρότερο.
+
+    python -m benchmarks.bench_pipeline --tables 100 1000 5000 --output pipeline.json
+    python -m benchmarks.bench_pipeline --tables 100 1000 5000 --baseline pipeline.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import sqlite3
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+import tracemalloc
+
+import numpy as np
+
+from benchmarks.stubs import LexicalStubEmbedder
+from benchmarks.synthetic import synthetic_schema
+from benchmarks.standin import create_standin_from_schema, SchemaCatalogConnection
+
+# Μετρικές που συγκρίνονται με το baseline και η ελάχιστη διαφορά που μετράει ως regression
+COMPARED = {"seconds": 0.1, "rss_growth_mb": 5.0, "output_bytes": 4096}
+
+
+def files_in(folder):
+    """{path: (size, mtime)} για όλα τα αρχεία κάτω από τον φάκελο."""
+    result = {}
+    for root, _, files in os.walk(folder):
+        for name in files:
+            path = os.path.join(root, name)
+            stat = os.stat(path)
+            result[path] = (stat.st_size, stat.st_mtime_ns)
+    return result
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure(stages, name, folder, trace, fn, **extra):
+    """Τρέχει το fn() ως στάδιο name και προσθέτει τη γραμμή του στο stages."""
+    before = files_in(folder)
+    rss_before = peak_rss_mb()
+    if trace:
+        tracemalloc.reset_peak()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    after = files_in(folder)
+    row = {"stage": name, "seconds": round(elapsed, 4), "peak_rss_mb": round(peak_rss_mb(), 1),
+           "rss_growth_mb": round(peak_rss_mb() - rss_before, 1),
+           "output_bytes": sum(size for path, (size, mtime) in after.items() if before.get(path) != (size, mtime))}
+    if trace:
+        row["alloc_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 1)
+    row.update(extra)
+    stages.append(row)
+    return result
+
+
+def questions_for(schema, n, rnd):
+    tables = [(tbl, info) for ts in schema["schemas"].values() for tbl, info in ts.items()]
+    questions = []
+    for i in range(n):
+        tbl, info = tables[rnd.randrange(len(tables))]
+        column = rnd.choice(info["columns"][1:])["name"]
+        questions.append(f"total {column} per {tbl} for week {i}")
+    return questions
+
+
+def timed(fn, items):
+    ms = []
+    for item in items:
+        start = time.perf_counter()
+        fn(item)
+        ms.append((time.perf_counter() - start) * 1000)
+    return {"p50_ms": round(float(np.percentile(ms, 50)), 3), "p95_ms": round(float(np.percentile(ms, 95)), 3)}
+
+
+def child(args):
+    from core.schema_loader import SchemaLoader
+    from core.graph_builder import GraphBuilder
+    from core.stats_collector import StatsCollector
+    from core.chunks import MultiJSONChunker
+    from core.query_ai import QueryAI
+    from core.llm_server import StubLLM
+
+    os.environ.update({"DB_DRIVER": "stand-in", "DB_SERVER": "stand-in", "DB_DATABASE": "bench",
+                       "DB_USER": "bench", "DB_PASSWORD": "bench"})
+    db_name = "bench"
+    base = os.path.join(args.base, f"t{args.child}")
+    db_folder = os.path.join(base, "databases", db_name)
+    os.makedirs(db_folder)
+
+    # Ένα schema "main", ώστε τα κλειδιά του <db>_stats.json (SQLite) να ταιριάζουν με το <db>.json
+    schema = synthetic_schema(tables=args.child, columns=args.columns, fk_density=args.fk_density,
+                              shared_id_columns=args.shared_id_columns, seed=args.seed, schema_names=["main"])
+    start = time.perf_counter()
+    db_path = os.path.join(args.base, f"standin_{args.child}.sqlite")
+    create_standin_from_schema(db_path, schema, rows=args.rows, seed=args.seed)
+    standin_s = time.perf_counter() - start
+    questions = questions_for(schema, args.questions, random.Random(args.seed))
+
+    if args.tracemalloc:
+        tracemalloc.start()
+    stages = []
+
+    loader = SchemaLoader(base, db_name, fmt=args.schema_format)
+    loader._conn = SchemaCatalogConnection(schema, rows=args.rows)
+    loaded = measure(stages, "schema", db_folder, args.tracemalloc, loader.extract_schema)
+    stages[-1].update(tables=loaded["tables"], columns=loaded["columns"])
+
+    graph = measure(stages, "graph", db_folder, args.tracemalloc,
+                    GraphBuilder(base, db_name, export_json=False).build)
+    stages[-1].update(edges=len(graph["edges"]), virtual_edges=len(graph["virtual_edges"]))
+
+    collector = StatsCollector(base, db_name, mode=args.stats_mode, dialect="sqlite",
+                               workers=args.stats_workers, distinct_limit=args.distinct_limit,
+                               connect=lambda: sqlite3.connect(db_path, check_same_thread=False))
+    stats = measure(stages, "stats", db_folder, args.tracemalloc, collector.collect_stats)
+    stages[-1]["tables"] = len(stats)
+
+    chunker = MultiJSONChunker(base, db_name, embed_model=LexicalStubEmbedder(), cache_path=None)
+    measure(stages, "chunks", db_folder, args.tracemalloc, chunker.run)
+
+    llm = StubLLM(prompt_token_ms=0.0, gen_token_ms=0.0)
+    query_ai = measure(stages, "query_load", db_folder, args.tracemalloc,
+                       lambda: QueryAI(base, db_name, llm=llm, embed_model=LexicalStubEmbedder(),
+                                       result_cache_path=None))
+    latency = {}
+    measure(stages, "similarity_search", db_folder, args.tracemalloc,
+            lambda: latency.update(timed(query_ai.similarity_search, questions)), questions=len(questions))
+    stages[-1].update(latency)
+    measure(stages, "generate_sql", db_folder, args.tracemalloc,
+            lambda: latency.update(timed(query_ai.generate_sql, questions)), questions=len(questions))
+    stages[-1].update(latency)
+    query_ai.close()
+
+    print(json.dumps({"tables": args.child, "standin_s": round(standin_s, 3), "stages": stages}))
+
+
+def version():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], cwd=root, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, tolerance):
+    """Γραμμές σύγκρισης ανά (tables, stage) και όσες είναι regressions."""
+    previous = {(run["tables"], row["stage"]): row for run in baseline["results"] for row in run["stages"]}
+    rows, regressions = [], []
+    for run in results:
+        for row in run["stages"]:
+            old = previous.get((run["tables"], row["stage"]))
+            if old is None:
+                continue
+            for metric, floor in COMPARED.items():
+                if metric not in old or metric not in row:
+                    continue
+                ratio = row[metric] / old[metric] if old[metric] else None
+                worse = row[metric] - old[metric] > floor and (ratio is None or ratio > 1 + tolerance)
+                line = {"tables": run["tables"], "stage": row["stage"], "metric": metric, "baseline": old[metric],
+                        "current": row[metric], "ratio": round(ratio, 2) if ratio is not None else None,
+                        "regression": worse}
+                rows.append(line)
+                if worse:
+                    regressions.append(line)
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tables", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--columns", type=int, default=12, help="Στήλες ανά πίνακα")
+    parser.add_argument("--fk-density", type=float, default=1.0, help="Μέσος αριθμός FK ανά πίνακα")
+    parser.add_argument("--shared-id-columns", type=int, default=2, help="Κοινές στήλες *ID (TenantID, ...)")
+    parser.add_argument("--rows", type=int, default=200, help="Γραμμές ανά πίνακα στο SQLite stand-in")
+    parser.add_argument("--questions", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--schema-format", choices=["json", "ndjson"], default="json")
+    parser.add_argument("--stats-mode", choices=["full", "approx", "light"], default="full")
+    parser.add_argument("--stats-workers", type=int, default=1)
+    parser.add_argument("--distinct-limit", type=int, default=50)
+    parser.add_argument("--tracemalloc", action="store_true", help="Και peak των Python allocations (πιο αργό)")
+    parser.add_argument("--output", help="Αρχείο JSON με τα αποτελέσματα")
+    parser.add_argument("--baseline", help="Παλιότερο --output για σύγκριση")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Ανεκτή χειροτέρευση (0.25 = +25%%)")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--base", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return child(args)
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    params = {name: getattr(args, name) for name in ("columns", "fk_density", "shared_id_columns", "rows", "questions",
+                                                      "seed", "schema_format", "stats_mode", "stats_workers",
+                                                      "distinct_limit", "tracemalloc")}
+    results = []
+    with tempfile.TemporaryDirectory() as base:
+        for n_tables in args.tables:
+            command = [sys.executable, "-m", "benchmarks.bench_pipeline", "--child", str(n_tables), "--base", base]
+            for name, value in params.items():
+                flag = "--" + name.replace("_", "-")
+                if value is True:
+                    command.append(flag)
+                elif value is not False:
+                    command += [flag, str(value)]
+            out = subprocess.run(command, cwd=root, capture_output=True, text=True, check=True).stdout
+            run = json.loads(out.strip().splitlines()[-1])
+            results.append(run)
+            for row in run["stages"]:
+                print(json.dumps({"tables": n_tables, **row}))
+
+    report = {"version": version(), "python": platform.python_version(), "platform": platform.platform(),
+              "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "params": params, "results": results}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results saved at: {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("params") != params:
+            print(json.dumps({"warning": "different params", "baseline": baseline.get("params")}))
+        rows, regressions = compare(results, baseline, args.tolerance)
+        for row in rows:
+            print(json.dumps(row))
+        print(json.dumps({"baseline_version": baseline.get("version"), "version": report["version"],
+                          "compared": len(rows), "regressions": len(regressions)}))
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Πολλές βάσεις από ένα process (core.registry.DatabaseRegistry): N συνθετικές βάσεις,
+η καθεμία με δικό της λεξιλόγιο πινάκων, και ερωτήσεις με skew (λίγες βάσεις παίρνουν
+τις περισσότερες). Για κάθε max_active: RSS στο τέλος, loads / evictions, latency
+ανά ερώτηση (cold load και ενεργή βάση) και ακρίβεια του routing χωρίς πρόθεμα.
+Κάθε ρύθμιση τρέχει σε νέο process.
+
+    python -m benchmarks.bench_registry --databases 8 --tables 300 --max-active 1 2 4 8
+"""
+import os
+import sys
+import json
+import random
+import argparse
+import tempfile
+import subprocess
+
+from benchmarks.stubs import LexicalStubEmbedder
+from benchmarks.synthetic import synthetic_schema, WORDS
+from core.graph_builder import GraphBuilder
+from core.chunks import MultiJSONChunker
+
+DOMAINS = ["Clinic", "Fleet", "Payroll", "Retail", "Mining", "Hotel", "Airline", "Library",
+           "Farm", "Casino", "School", "Bank", "Garage", "Theatre", "Museum", "Harbor"]
+
+RUN_SCRIPT = """
+import sys, json, time
+from benchmarks.stubs import LexicalStubEmbedder
+from core.llm_server import StubLLM
+from core.registry import DatabaseRegistry
+base, max_active, questions = sys.argv[1], int(sys.argv[2]), json.loads(sys.argv[3])
+
+registry = DatabaseRegistry(base, StubLLM(prompt_token_ms=0.0, gen_token_ms=0.0), embed_model=LexicalStubEmbedder(),
+                            max_active=max_active, result_cache_path=None)
+routed, cold, warm = 0, [], []
+for db_name, question in questions:
+    start = time.perf_counter()
+    loads = registry.counters["loads"]
+    target, text, query_vec = registry.resolve(question)
+    "".join(registry.get(target).stream_sql(text, query_vec=query_vec))
+    (cold if registry.counters["loads"] > loads else warm).append(time.perf_counter() - start)
+    routed += target == db_name
+
+with open("/proc/self/status") as f:
+    rss_mb = next(int(line.split()[1]) for line in f if line.startswith("VmRSS")) / 1024
+ms = lambda xs: round(sum(xs) / len(xs) * 1000, 2) if xs else None
+print(json.dumps(dict(registry.stats(), active=len(registry.active()), routing_accuracy=round(routed / len(questions), 3),
+                      cold_ms=ms(cold), warm_ms=ms(warm), rss_mb=round(rss_mb, 1))))
+"""
+
+
+def domain_schema(domain, tables, columns, seed):
+    # Οι πίνακες και οι στήλες κάθε βάσης παίρνουν το λεξιλόγιο του domain της
+    text = json.dumps(synthetic_schema(tables=tables, columns=columns, shared_id_columns=0,
+                                       fk_density=1.0, seed=seed, database=f"{domain}DB"))
+    for word in WORDS:
+        text = text.replace(word, f"{domain}{word}")
+    return json.loads(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--databases", type=int, default=8)
+    parser.add_argument("--tables", type=int, default=300)
+    parser.add_argument("--columns", type=int, default=12)
+    parser.add_argument("--questions", type=int, default=200)
+    parser.add_argument("--max-active", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    embedder = LexicalStubEmbedder()
+    rnd = random.Random(0)
+    with tempfile.TemporaryDirectory() as base:
+        tables_by_db = {}
+        for i, domain in enumerate(DOMAINS[:args.databases]):
+            db_name = f"{domain}DB"
+            db_folder = os.path.join(base, "databases", db_name)
+            os.makedirs(db_folder)
+            schema = domain_schema(domain, args.tables, args.columns, seed=i)
+            with open(os.path.join(db_folder, f"{db_name}.json"), "w", encoding="utf-8") as f:
+                json.dump(schema, f)
+            GraphBuilder(base, db_name, export_json=False).build()
+            MultiJSONChunker(base, db_name, embed_model=embedder, cache_path=None).run()
+            tables_by_db[db_name] = [t for tables in schema["schemas"].values() for t in tables]
+
+        # Zipf: η βάση i παίρνει βάρος 1/(i+1)
+        names = list(tables_by_db)
+        weights = [1 / (i + 1) for i in range(len(names))]
+        questions = []
+        for db_name in rnd.choices(names, weights, k=args.questions):
+            questions.append((db_name, f"Show the {rnd.choice(tables_by_db[db_name])} rows with their details"))
+
+        for max_active in args.max_active:
+            out = subprocess.run([sys.executable, "-c", RUN_SCRIPT, base, str(max_active), json.dumps(questions)],
+                                 cwd=root, capture_output=True, text=True, check=True).stdout
+            row = json.loads(out.strip().splitlines()[-1])
+            print(json.dumps({"databases": len(names), "tables": args.tables, "max_active": max_active, **row}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Εξαγωγή σχήματος από catalog με εκατομμύρια στήλες (CatalogConnection stand-in): το
+παλιό load_schema (fetchall στα τέσσερα queries, όλο το σχήμα σε dict, json.dump με
+indent=2) vs το streaming SchemaLoader (fetchmany, merge πίνακα-πίνακα, εγγραφή όσο
+διαβάζει) σε json και ndjson. Κάθε run σε νέο process: χρόνος, peak RSS πάνω από τη
+μνήμη πριν την εξαγωγή, μέγεθος αρχείου, και έλεγχος ότι όλες οι μορφές διαβάζονται
+στο ίδιο σχήμα.
+
+    python -m benchmarks.bench_schema_stream --tables 20000 --columns 50 --wide-columns 5000
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import tempfile
+import subprocess
+
+from benchmarks.standin import CatalogConnection
+from core.schema_loader import SchemaLoader, read_schema_file
+
+
+def catalog(args):
+    return CatalogConnection(tables=args.tables, schemas=args.schemas, columns=args.columns,
+                             wide_columns=args.wide_columns)
+
+
+def legacy_load_schema(loader):
+    """Ο παλιός αλγόριθμος: fetchall ανά query, nested dict, ένα json.dump(indent=2) στο τέλος."""
+    schemas, names = {}, {}
+    queries = loader._catalog_queries("")
+    cursor = loader.conn.cursor()
+    cursor.execute(queries["columns"])
+    for row in cursor.fetchall():
+        names[(row.schema_id, row.object_id)] = (row.schema_name, row.table_name)
+        table = schemas.setdefault(row.schema_name, {}).setdefault(row.table_name, {
+            "columns": [], "primary_key": [], "foreign_keys": [], "indexes": [], "constraints": []})
+        table["columns"].append({"name": row.column_name, "type": row.data_type,
+                                 "max_length": row.max_length, "nullable": bool(row.is_nullable)})
+
+    def table(row):
+        sch, tbl = names[(row.schema_id, row.object_id)]
+        return schemas[sch][tbl]
+
+    cursor.execute(queries["primary_key"])
+    for row in cursor.fetchall():
+        table(row)["primary_key"].append(row.column_name)
+    cursor.execute(queries["foreign_keys"])
+    for row in cursor.fetchall():
+        table(row)["foreign_keys"].append({"column": row.parent_column, "ref_schema": row.ref_schema,
+                                           "ref_table": row.ref_table, "ref_column": row.ref_column})
+    cursor.execute(queries["indexes"])
+    indexes = {}
+    for row in cursor.fetchall():
+        key = (row.schema_id, row.object_id, row.index_name)
+        if key not in indexes:
+            indexes[key] = {"name": row.index_name, "unique": bool(row.is_unique), "columns": []}
+            table(row)["indexes"].append(indexes[key])
+        if row.column_name is not None:
+            indexes[key]["columns"].append(row.column_name)
+
+    schema = {"database": loader.database, "generated_at": "", "dialect": "sqlserver", "schemas": schemas}
+    path = os.path.join(loader.db_folder, f"{loader.db_name}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(schema, f, indent=2, ensure_ascii=False)
+    return path
+
+
+def child(args):
+    os.environ.update({"DB_DRIVER": "stand-in", "DB_SERVER": "stand-in", "DB_DATABASE": "bench",
+                       "DB_USER": "bench", "DB_PASSWORD": "bench"})
+    base = os.path.join(args.base, args.child.replace(":", "_"))
+    mode, _, array_size = args.child.partition(":")
+    loader = SchemaLoader(base, "bench", array_size=int(array_size or 5000),
+                          fmt="ndjson" if mode == "ndjson" else "json")
+    loader._conn = catalog(args)
+    loader.table_versions = lambda: {}  # το manifest δεν μετράει εδώ
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    path = legacy_load_schema(loader) if mode == "legacy" else loader.extract_schema()["path"]
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({"mode": mode, "array_size": int(array_size) if array_size else None,
+                      "seconds": round(elapsed, 2), "peak_rss_mb": round((peak - rss_before) / 1024, 1),
+                      "file_mb": round(os.path.getsize(path) / 2 ** 20, 1), "path": path}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tables", type=int, default=20000)
+    parser.add_argument("--schemas", type=int, default=20)
+    parser.add_argument("--columns", type=int, default=50)
+    parser.add_argument("--wide-columns", type=int, default=5000, help="Στήλες του μεγαλύτερου πίνακα")
+    parser.add_argument("--array-size", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--base", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return child(args)
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with tempfile.TemporaryDirectory() as base:
+        runs = ["legacy"] + [f"{mode}:{size}" for mode in ("json", "ndjson") for size in args.array_size]
+        results = []
+        for run in runs:
+            out = subprocess.run([sys.executable, "-m", "benchmarks.bench_schema_stream", "--child", run,
+                                  "--base", base, "--tables", str(args.tables), "--schemas", str(args.schemas),
+                                  "--columns", str(args.columns), "--wide-columns", str(args.wide_columns)],
+                                 cwd=root, capture_output=True, text=True, check=True).stdout
+            results.append(json.loads(out.strip().splitlines()[-1]))
+
+        # Όλες οι μορφές πρέπει να δίνουν το ίδιο σχήμα (εκτός από generated_at)
+        reference = None
+        for row in results:
+            schema = read_schema_file(row.pop("path"))
+            schema.pop("generated_at", None)
+            if reference is None:
+                reference = schema
+            row["same_schema"] = schema == reference
+            print(json.dumps({"tables": args.tables, "columns_total": args.columns * (args.tables - 1) + args.wide_columns,
+                              **row}))
+
+
+if __name__ == "__main__":
+    main()
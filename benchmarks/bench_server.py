@@ -0,0 +1,113 @@
+"""
+Load test του core.query_server: C ταυτόχρονοι clients στέλνουν ερωτήσεις, με stub
+embedder (σταθερό κόστος ανά encode + ανά κείμενο) και StubLLM. Σύγκριση με το
+σειριακό loop του main.py (μία ερώτηση τη φορά) για διάφορα max_batch και
+llm_concurrency: throughput, p50/p95 latency και μέσο μέγεθος batch. Τα νούμερα με
+llm_concurrency > 1 ισχύουν μόνο για το StubLLM: ένα llama.cpp μοντέλο (στο process
+ή πίσω από το LLMService) παράγει μία απάντηση τη φορά.
+
+    python -m benchmarks.bench_server --tables 300 --questions 200 --clients 16 --max-batch 1 16 --llm-concurrency 1 4
+"""
+import os
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+
+import numpy as np
+
+from benchmarks.stubs import LexicalStubEmbedder
+from benchmarks.synthetic import synthetic_schema
+from core.graph_builder import GraphBuilder
+from core.chunks import MultiJSONChunker
+from core.llm_server import StubLLM
+from core.registry import DatabaseRegistry
+from core.query_server import QueryServer
+
+
+def sequential(registry, questions):
+    latencies = []
+    start = time.perf_counter()
+    for _, question in questions:
+        t = time.perf_counter()
+        "".join(registry.stream_sql(question))
+        latencies.append(time.perf_counter() - t)
+    return time.perf_counter() - start, latencies
+
+
+async def concurrent(server, questions, clients):
+    await server.start()
+    latencies = []
+
+    async def client(i):
+        for name, question in questions[i::clients]:
+            t = time.perf_counter()
+            await server.generate_sql(question, client=name)
+            latencies.append(time.perf_counter() - t)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(i) for i in range(clients)))
+    elapsed = time.perf_counter() - start
+    stats = server.stats()
+    await server.stop()
+    return elapsed, latencies, stats
+
+
+def summary(elapsed, latencies):
+    return {
+        "throughput_qps": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 1),
+        "p95_ms": round(float(np.percentile(latencies, 95)) * 1000, 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tables", type=int, default=300)
+    parser.add_argument("--questions", type=int, default=200)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--max-batch", type=int, nargs="+", default=[1, 16])
+    parser.add_argument("--llm-concurrency", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--embed-call-ms", type=float, default=20.0, help="Σταθερό κόστος ανά encode")
+    parser.add_argument("--embed-text-ms", type=float, default=1.0, help="Κόστος ανά κείμενο")
+    parser.add_argument("--gen-token-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    rnd = random.Random(0)
+    schema = synthetic_schema(tables=args.tables, columns=12, shared_id_columns=0, fk_density=1.0)
+    tables = [t for ts in schema["schemas"].values() for t in ts]
+    # Μοναδικές ερωτήσεις: ο result cache δεν παίζει ρόλο
+    questions = [(f"analyst{i % args.clients}", f"Show the {rnd.choice(tables)} rows of week {i}")
+                 for i in range(args.questions)]
+
+    with tempfile.TemporaryDirectory() as base:
+        db_name = "bench"
+        db_folder = os.path.join(base, "databases", db_name)
+        os.makedirs(db_folder)
+        with open(os.path.join(db_folder, f"{db_name}.json"), "w", encoding="utf-8") as f:
+            json.dump(schema, f)
+        GraphBuilder(base, db_name, export_json=False).build()
+        MultiJSONChunker(base, db_name, embed_model=LexicalStubEmbedder(), cache_path=None).run()
+
+        def registry():
+            embedder = LexicalStubEmbedder(call_overhead_ms=args.embed_call_ms, per_text_ms=args.embed_text_ms)
+            llm = StubLLM(prompt_token_ms=0.0, gen_token_ms=args.gen_token_ms)
+            return DatabaseRegistry(base, llm, embed_model=embedder, result_cache_path=None)
+
+        row = {"mode": "sequential", "clients": 1, **summary(*sequential(registry(), questions))}
+        print(json.dumps(row))
+        for llm_concurrency in args.llm_concurrency:
+            for max_batch in args.max_batch:
+                server = QueryServer(registry(), max_batch=max_batch, llm_concurrency=llm_concurrency,
+                                     queue_depth=args.clients * 2)
+                elapsed, latencies, stats = asyncio.run(concurrent(server, questions, args.clients))
+                print(json.dumps({"mode": "server", "clients": args.clients, "max_batch": max_batch,
+                                  "llm_concurrency": llm_concurrency, **summary(elapsed, latencies),
+                                  "avg_batch": stats["avg_batch"], "prepare_p50_ms": stats.get("prepare_p50_ms"),
+                                  "llm_wait_p95_ms": stats.get("llm_wait_p95_ms")}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Startup του main.py ανά στάδιο, με όλα τα αρχεία της βάσης ήδη φτιαγμένα: το παλιό
+start (όλα τα imports στην αρχή, embedding model πριν από το pipeline, κάθε στάδιο
+ξαναφορτώνει τα JSON του και ο chunker ξαναφτιάχνει chunks και index) vs το lazy
+(imports μέσα στα στάδια, skip των ενημερωμένων σταδίων, embedding model σε background
+μαζί με το LLM). Η φόρτωση των μοντέλων μοντελοποιείται με sleep (--embed-load-s,
+--llm-load-s), ή με --real-embedder φορτώνεται το all-MiniLM-L6-v2. Κάθε start σε νέο process.
+
+    python -m benchmarks.bench_startup --tables 2000 --embed-load-s 4 --llm-load-s 6
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+
+from benchmarks.stubs import LexicalStubEmbedder
+from benchmarks.synthetic import synthetic_schema
+from core.graph_builder import GraphBuilder
+from core.chunks import MultiJSONChunker
+
+START_SCRIPT = """
+import sys, json, time
+started = time.perf_counter()
+mode, base, db_name, embed_load_s, llm_load_s, real = sys.argv[1], sys.argv[2], sys.argv[3], float(sys.argv[4]), float(sys.argv[5]), sys.argv[6] == "1"
+timings = {}
+
+def load_embedder():
+    if real:
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer("all-MiniLM-L6-v2")
+        model.model_name = "all-MiniLM-L6-v2"
+        return model
+    from benchmarks.stubs import LexicalStubEmbedder
+    time.sleep(embed_load_s)
+    return LexicalStubEmbedder()
+
+def load_llm():
+    from core.llm_server import StubLLM
+    time.sleep(llm_load_s)
+    return StubLLM(prompt_token_ms=0.0, gen_token_ms=0.0)
+
+if mode == "eager":
+    phase = time.perf_counter()
+    import os
+    from core.schema_loader import SchemaLoader
+    from core.graph_builder import GraphBuilder
+    from core.stats_collector import StatsCollector
+    from core.chunks import MultiJSONChunker
+    from core.registry import DatabaseRegistry
+    from core.refresh import IncrementalRefresher
+    from core.llm_server import RemoteLLM
+    for optional in ("sentence_transformers", "llama_cpp", "pyodbc"):
+        try:
+            __import__(optional)
+        except ImportError:
+            pass
+    timings["imports"] = time.perf_counter() - phase
+
+    phase = time.perf_counter()
+    embed_model = load_embedder()
+    timings["embed_model"] = time.perf_counter() - phase
+
+    # Το παλιό pipeline: κάθε στάδιο φορτώνει το αρχείο του, ο chunker τρέχει πάντα
+    phase = time.perf_counter()
+    with open(os.path.join(base, "databases", db_name, f"{db_name}.json"), encoding="utf-8") as f:
+        json.load(f)
+    GraphBuilder(base, db_name).build()
+    MultiJSONChunker(base, db_name, embed_model=embed_model, cache_path=None).run()
+    timings["pipeline"] = time.perf_counter() - phase
+else:
+    phase = time.perf_counter()
+    import main
+    from core.background import BackgroundModel
+    timings["imports"] = time.perf_counter() - phase
+
+    embed_model = BackgroundModel(load_embedder, "lexical-stub-embedder-384" if not real else "all-MiniLM-L6-v2")
+    phase = time.perf_counter()
+    main.build_database(base, db_name, embed_model, "none", 1, None, 10000, True)
+    timings["pipeline"] = time.perf_counter() - phase
+
+phase = time.perf_counter()
+llm = load_llm()
+timings["llm"] = time.perf_counter() - phase
+
+phase = time.perf_counter()
+from core.registry import DatabaseRegistry
+registry = DatabaseRegistry(base, llm, embed_model=embed_model, databases=[db_name], result_cache_path=None)
+timings["query_ai"] = time.perf_counter() - phase
+ready = time.perf_counter() - started
+
+phase = time.perf_counter()
+registry.generate_sql("Show the Customer rows with their details")
+first_answer = time.perf_counter() - phase
+
+with open("/proc/self/status") as f:
+    rss_mb = next(int(line.split()[1]) for line in f if line.startswith("VmRSS")) / 1024
+print(json.dumps({**{f"{k}_s": round(v, 3) for k, v in timings.items()}, "ready_s": round(ready, 3),
+                  "first_answer_s": round(first_answer, 3), "rss_mb": round(rss_mb, 1)}))
+"""
+
+
+def start(mode, base, db_name, args):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    out = subprocess.run([sys.executable, "-c", START_SCRIPT, mode, base, db_name, str(args.embed_load_s),
+                          str(args.llm_load_s), "1" if args.real_embedder else "0"],
+                         cwd=root, capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tables", type=int, default=2000)
+    parser.add_argument("--columns", type=int, default=12)
+    parser.add_argument("--embed-load-s", type=float, default=4.0)
+    parser.add_argument("--llm-load-s", type=float, default=6.0)
+    parser.add_argument("--real-embedder", action="store_true")
+    args = parser.parse_args()
+
+    db_name = "bench"
+    with tempfile.TemporaryDirectory() as base:
+        db_folder = os.path.join(base, "databases", db_name)
+        os.makedirs(db_folder)
+        with open(os.path.join(db_folder, f"{db_name}.json"), "w", encoding="utf-8") as f:
+            json.dump(synthetic_schema(tables=args.tables, columns=args.columns, fk_density=1.0), f)
+        GraphBuilder(base, db_name).build()
+        if args.real_embedder:
+            MultiJSONChunker(base, db_name, cache_path=None).run()
+        else:
+            MultiJSONChunker(base, db_name, embed_model=LexicalStubEmbedder(), cache_path=None).run()
+
+        for mode in ("eager", "lazy"):
+            print(json.dumps({"mode": mode, "tables": args.tables, **start(mode, base, db_name, args)}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# ----------------------------- benchmarks/bench_stats_parallel.py -----------------------------
+"""
+Κλιμάκωση του παράλληλου StatsCollector (workers=1,2,4,8) σε SQLite stand-in και
+έλεγχος ότι το <db>_stats.json είναι byte-identical με το serial.
+
+    python -m benchmarks.bench_stats_parallel --tables 40 --rows 20000 --workers 1 2 4 8
+"""
+import os
+import time
+import json
+import sqlite3
+import argparse
+import tempfile
+
+from benchmarks.standin import create_standin, CountingConnection
+from core.stats_collector import StatsCollector
+
+
+def run(tmp, db_path, names, workers, latency):
+    db_name = f"bench_w{workers}"
+    collector = StatsCollector(
+        tmp, db_name, mode="full", dialect="sqlite", workers=workers,
+        connect=lambda: CountingConnection(sqlite3.connect(db_path), names, latency=latency)
+    )
+    start = time.perf_counter()
+    collector.collect_stats()
+    elapsed = time.perf_counter() - start
+
+    with open(os.path.join(collector.db_folder, f"{db_name}_stats.json"), "rb") as f:
+        return elapsed, f.read()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tables", type=int, default=40)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--columns", type=int, default=8)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--latency-ms", type=float, default=1.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "standin.sqlite")
+        names = create_standin(db_path, tables=args.tables, rows=args.rows, columns=args.columns)
+
+        results = []
+        baseline = None
+        for workers in args.workers:
+            elapsed, output = run(tmp, db_path, names, workers, args.latency_ms / 1000)
+            if baseline is None:
+                baseline = (elapsed, output)
+            results.append({
+                "workers": workers,
+                "seconds": round(elapsed, 4),
+                "speedup": round(baseline[0] / elapsed, 2),
+                "identical_to_first": output == baseline[1],
+            })
+
+    print(json.dumps({
+        "tables": args.tables,
+        "rows": args.rows,
+        "columns": args.columns,
+        "latency_ms": args.latency_ms,
+        "results": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
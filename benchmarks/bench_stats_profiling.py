@@ -0,0 +1,75 @@
+# ----------------------------- benchmarks/bench_stats_profiling.py -----------------------------
+"""
+Συγκρίνει το set-based profiling του StatsCollector (strategy="batched") με την
+παλιά προσέγγιση των 3 queries ανά στήλη (strategy="per_column") σε SQLite stand-in.
+
+    python -m benchmarks.bench_stats_profiling --tables 50 --rows 5000 --columns 10 --latency-ms 1
+"""
+import os
+import time
+import json
+import sqlite3
+import argparse
+import tempfile
+
+from benchmarks.standin import create_standin, CountingConnection
+from core.stats_profiler import TableProfiler, get_dialect
+
+
+def run(strategy, db_path, names, latency=0.0):
+    conn = CountingConnection(sqlite3.connect(db_path), names, latency=latency)
+    profiler = TableProfiler(conn, get_dialect("sqlite"), strategy=strategy)
+
+    start = time.perf_counter()
+    tables = profiler.list_tables()
+    columns = profiler.list_columns()
+    stats = {}
+    for schema, table, row_count in tables:
+        stats[f"{schema}.{table}"] = profiler.profile(
+            schema, table, columns.get((schema, table), []), mode="full", row_count=row_count
+        )
+    elapsed = time.perf_counter() - start
+    conn.close()
+
+    return {
+        "strategy": strategy,
+        "seconds": round(elapsed, 4),
+        "round_trips": conn.round_trips,
+        "table_scans": conn.scans,
+    }, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tables", type=int, default=50)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--columns", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=1.0,
+                        help="Προσομοιωμένο network latency ανά round-trip")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "standin.sqlite")
+        names = create_standin(db_path, tables=args.tables, rows=args.rows, columns=args.columns)
+
+        results = []
+        outputs = {}
+        for strategy in ("per_column", "batched"):
+            result, stats = run(strategy, db_path, names, latency=args.latency_ms / 1000)
+            results.append(result)
+            outputs[strategy] = stats
+
+    same = json.dumps(outputs["per_column"], sort_keys=True) == json.dumps(outputs["batched"], sort_keys=True)
+
+    print(json.dumps({
+        "tables": args.tables,
+        "rows": args.rows,
+        "columns": args.columns,
+        "latency_ms": args.latency_ms,
+        "results": results,
+        "identical_output": same,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
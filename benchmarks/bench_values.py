@@ -0,0 +1,134 @@
+# ----------------------------- benchmarks/bench_values.py -----------------------------
+"""
+Value index (core.value_index) σε συνθετικά stats: χρόνος build, μέγεθος στο δίσκο,
+χρόνος load και lookup ανά ερώτηση, όσο μεγαλώνει το πλήθος των τιμών. Μετά QueryAI
+με max_value_columns=0 (όπως πριν) και 3 σε ερωτήσεις "rows where ... is <τιμή>":
+πόσες φορές ο πίνακας της τιμής μπήκε στο context, πόσες φορές το prompt έδωσε τη
+σωστή στήλη φίλτρου και tokens του context.
+
+    python -m benchmarks.bench_values --values 10000 100000 1000000 --questions 200
+"""
+import os
+import json
+import time
+import random
+import argparse
+import tempfile
+
+import numpy as np
+
+from benchmarks.stubs import LexicalStubEmbedder
+from benchmarks.synthetic import synthetic_schema
+from core.graph_builder import GraphBuilder
+from core.chunks import MultiJSONChunker
+from core.query_ai import QueryAI
+from core.llm_server import StubLLM
+from core.value_index import ValueIndex
+
+SYLLABLES = ["an", "na", "ger", "ma", "ny", "lo", "ri", "ta", "mo", "ko", "sa", "el", "ve", "du", "pi", "ra"]
+
+
+def synthetic_value(rnd):
+    words = rnd.choice((1, 1, 1, 2))
+    return " ".join("".join(rnd.choice(SYLLABLES) for _ in range(rnd.randint(2, 4))).title() for _ in range(words))
+
+
+def synthetic_stats(schema, values_per_column, text_columns, rnd):
+    """Stats στη μορφή του StatsCollector, με text_columns κειμενικές στήλες ανά πίνακα."""
+    stats = {}
+    for sch, tables in schema["schemas"].items():
+        for tbl, info in tables.items():
+            columns = {}
+            for col in info["columns"][-text_columns:]:
+                values = [{"value": synthetic_value(rnd), "count": rnd.randint(1, 1000)} for _ in range(values_per_column)]
+                columns[col["name"]] = {"type": "nvarchar", "unique_count": values_per_column,
+                                        "top_values": values[:5], "values": values[5:]}
+            stats[f"{sch}.{tbl}"] = {"row_count": 1000, "column_count": len(info["columns"]),
+                                     "columns": columns, "importance_score": 0}
+    return stats
+
+
+def index_row(n_values, rnd):
+    tables = max(1, n_values // 200)
+    schema = synthetic_schema(tables=tables, columns=8)
+    stats = synthetic_stats(schema, 100, 2, rnd)
+    start = time.perf_counter()
+    index = ValueIndex.build(stats)
+    build_s = time.perf_counter() - start
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "value_index")
+        index.save(path)
+        size = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+        start = time.perf_counter()
+        index = ValueIndex.load(path)
+        load_ms = (time.perf_counter() - start) * 1000
+        picked = [rnd.choice(list(stats.values()))["columns"] for _ in range(200)]
+        questions = [f"orders from {rnd.choice(list(c.values()))['values'][0]['value']} last week" for c in picked]
+        start = time.perf_counter()
+        found = sum(bool(index.lookup(q)) for q in questions)
+        lookup_ms = (time.perf_counter() - start) / len(questions) * 1000
+    return {"values": index.size, "columns": len(index.columns), "build_s": round(build_s, 3),
+            "disk_mb": round(size / 2 ** 20, 2), "load_ms": round(load_ms, 3),
+            "lookup_ms": round(lookup_ms, 4), "found_pct": round(100 * found / len(questions), 1)}
+
+
+def query_rows(args):
+    db_name = "bench"
+    rnd = random.Random(1)
+    schema = synthetic_schema(tables=args.tables, columns=10, fk_density=1.0)
+    stats = synthetic_stats(schema, 30, 2, rnd)
+    questions = []
+    for _ in range(args.questions):
+        table = rnd.choice(list(stats))
+        column, col_stat = rnd.choice(list(stats[table]["columns"].items()))
+        value = rnd.choice(col_stat["values"])["value"]
+        questions.append((f"rows where the value is {value}", table, column))
+
+    rows = []
+    with tempfile.TemporaryDirectory() as base:
+        db_folder = os.path.join(base, "databases", db_name)
+        os.makedirs(db_folder)
+        with open(os.path.join(db_folder, f"{db_name}.json"), "w", encoding="utf-8") as f:
+            json.dump(schema, f)
+        with open(os.path.join(db_folder, f"{db_name}_stats.json"), "w", encoding="utf-8") as f:
+            json.dump(stats, f)
+        GraphBuilder(base, db_name, export_json=False).build()
+        MultiJSONChunker(base, db_name, embed_model=LexicalStubEmbedder(), cache_path=None).run()
+
+        for max_value_columns in (0, 3):
+            query_ai = QueryAI(base, db_name, llm=StubLLM(prompt_token_ms=0.0, gen_token_ms=0.0),
+                               embed_model=LexicalStubEmbedder(), result_cache_path=None,
+                               max_value_columns=max_value_columns)
+            in_context, filter_column, tokens, ms = 0, 0, [], []
+            for question, table, column in questions:
+                start = time.perf_counter()
+                prompt, usage, _ = query_ai.build_prompt(question)
+                ms.append((time.perf_counter() - start) * 1000)
+                in_context += f"\n{table}(" in prompt
+                filter_column += f"{table}.{column} = " in prompt
+                tokens.append(usage["context_tokens"])
+            query_ai.close()
+            rows.append({"max_value_columns": max_value_columns, "questions": len(questions),
+                         "table_in_context_pct": round(100 * in_context / len(questions), 1),
+                         "filter_column_pct": round(100 * filter_column / len(questions), 1),
+                         "context_tokens_avg": round(float(np.mean(tokens)), 1),
+                         "prompt_p50_ms": round(float(np.percentile(ms, 50)), 3)})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--values", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--tables", type=int, default=300)
+    parser.add_argument("--questions", type=int, default=200)
+    args = parser.parse_args()
+
+    rnd = random.Random(0)
+    for n_values in args.values:
+        print(json.dumps(index_row(n_values, rnd)))
+    for row in query_rows(args):
+        print(json.dumps(row))
+
+
+if __name__ == "__main__":
+    main()
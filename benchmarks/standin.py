@@ -0,0 +1,307 @@
+# ----------------------------- benchmarks/standin.py -----------------------------
+"""
+Τοπικό SQLite stand-in για benchmarks χωρίς SQL Server.
+
+Φτιάχνει μια βάση με συνθετικούς πίνακες (ids, FK στήλες, αριθμούς, κείμενα,
+ημερομηνίες και NULLs) ώστε ο StatsCollector να τρέχει με dialect="sqlite".
+Το CatalogConnection παράγει τα αποτελέσματα των queries του catalog για τον SchemaLoader.
+Τα create_standin_from_schema και SchemaCatalogConnection κάνουν το ίδιο για ένα
+συνθετικό σχήμα (benchmarks.synthetic), ώστε catalog και δεδομένα να συμφωνούν.
+"""
+import os
+import random
+import time
+import sqlite3
+import datetime
+import itertools
+from collections import namedtuple
+
+from benchmarks.synthetic import WORDS
+
+
+def create_standin(path: str, tables: int = 20, rows: int = 1000, columns: int = 8, seed: int = 0):
+    """Δημιουργεί (ή ξαναφτιάχνει) το SQLite αρχείο και επιστρέφει τα ονόματα πινάκων."""
+    if os.path.exists(path):
+        os.remove(path)
+
+    rnd = random.Random(seed)
+    conn = sqlite3.connect(path)
+    names = [f"Table{i:04d}" for i in range(tables)]
+
+    for t, name in enumerate(names):
+        cols = [(f"{name}ID", "INTEGER PRIMARY KEY")]
+        if t > 0:
+            cols.append((f"{names[rnd.randrange(t)]}ID", "INTEGER"))
+        kinds = ["INTEGER", "REAL", "VARCHAR(50)", "DATE"]
+        while len(cols) < columns:
+            kind = kinds[len(cols) % len(kinds)]
+            cols.append((f"Col{len(cols)}", kind))
+
+        conn.execute(
+            f'CREATE TABLE "{name}" (' + ", ".join(f'"{c}" {k}' for c, k in cols) + ")"
+        )
+
+        data = []
+        base_date = datetime.date(2020, 1, 1)
+        for r in range(rows):
+            row = [r + 1]
+            for _, kind in cols[1:]:
+                if rnd.random() < 0.05:
+                    row.append(None)
+                elif kind == "INTEGER":
+                    row.append(rnd.randrange(1, 1 + max(rows // 10, 1)))
+                elif kind == "REAL":
+                    row.append(round(rnd.uniform(0, 1000), 2))
+                elif kind.startswith("VARCHAR"):
+                    row.append(f"value_{rnd.randrange(50)}")
+                else:
+                    row.append((base_date + datetime.timedelta(days=rnd.randrange(1000))).isoformat())
+            data.append(row)
+
+        placeholders = ", ".join("?" for _ in cols)
+        conn.executemany(f'INSERT INTO "{name}" VALUES ({placeholders})', data)
+
+    conn.commit()
+    conn.close()
+    return names
+
+
+_SQLITE_TYPES = {"int": "INTEGER", "bit": "INTEGER", "decimal": "REAL", "date": "DATE"}
+
+
+def create_standin_from_schema(path: str, schema: dict, rows: int = 1000, text_values: int = 20, seed: int = 0):
+    """
+    SQLite αρχείο με τους πίνακες ενός συνθετικού σχήματος (όλων των schemas, με το
+    όνομα του πίνακα). Οι FK στήλες δείχνουν σε υπαρκτά ids και οι κειμενικές στήλες
+    έχουν έως text_values διακριτές τιμές. Επιστρέφει τα ονόματα πινάκων.
+    """
+    if os.path.exists(path):
+        os.remove(path)
+
+    rnd = random.Random(seed)
+    conn = sqlite3.connect(path)
+    names = []
+    base_date = datetime.date(2020, 1, 1)
+    for tables in schema["schemas"].values():
+        for name, info in tables.items():
+            names.append(name)
+            fk_columns = {fk["column"] for fk in info["foreign_keys"]}
+            cols = []
+            for col in info["columns"]:
+                kind = _SQLITE_TYPES.get(col["type"], f"VARCHAR({col['max_length']})")
+                cols.append((col["name"], "INTEGER PRIMARY KEY" if col["name"] in info["primary_key"] else kind))
+            conn.execute(f'CREATE TABLE "{name}" (' + ", ".join(f'"{c}" {k}' for c, k in cols) + ")")
+
+            vocabulary = {c: [f"{rnd.choice(WORDS)} {rnd.choice(WORDS)}" for _ in range(text_values)]
+                          for c, k in cols if k.startswith("VARCHAR")}
+            data = []
+            for r in range(rows):
+                row = [r + 1]
+                for c, kind in cols[1:]:
+                    if c in fk_columns:
+                        row.append(rnd.randrange(1, rows + 1))
+                    elif rnd.random() < 0.05:
+                        row.append(None)
+                    elif kind == "INTEGER":
+                        row.append(rnd.randrange(1, 1 + max(rows // 10, 1)))
+                    elif kind == "REAL":
+                        row.append(round(rnd.uniform(0, 1000), 2))
+                    elif kind == "DATE":
+                        row.append((base_date + datetime.timedelta(days=rnd.randrange(1000))).isoformat())
+                    else:
+                        row.append(rnd.choice(vocabulary[c]))
+                data.append(row)
+
+            placeholders = ", ".join("?" for _ in cols)
+            conn.executemany(f'INSERT INTO "{name}" VALUES ({placeholders})', data)
+
+    conn.commit()
+    conn.close()
+    return names
+
+
+class CountingConnection:
+    """
+    Τυλίγει ένα sqlite3 connection και μετρά round-trips (execute) και σαρώσεις
+    πινάκων χρηστών μέσω EXPLAIN QUERY PLAN. Το latency (δευτερόλεπτα) προσομοιώνει
+    το δίκτυο ενός απομακρυσμένου SQL Server σε κάθε round-trip.
+    """
+    def __init__(self, conn, user_tables, latency: float = 0.0):
+        self.conn = conn
+        self.latency = latency
+        self.user_tables = {t.lower() for t in user_tables}
+        self.round_trips = 0
+        self.scans = 0
+
+    def cursor(self):
+        return _CountingCursor(self)
+
+    def close(self):
+        self.conn.close()
+
+    def interrupt(self):
+        self.conn.interrupt()
+
+    def count_scans(self, sql, params=()):
+        plan = self.conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+        for row in plan:
+            detail = row[-1].split()
+            if len(detail) >= 2 and detail[0] == "SCAN" and detail[1].strip('"').lower() in self.user_tables:
+                self.scans += 1
+
+
+class _CountingCursor:
+    def __init__(self, owner):
+        self.owner = owner
+        self.cursor = owner.conn.cursor()
+
+    def execute(self, sql, params=()):
+        self.owner.round_trips += 1
+        self.owner.count_scans(sql, params)
+        if self.owner.latency:
+            time.sleep(self.owner.latency)
+        self.cursor.execute(sql, params)
+        return self
+
+    def fetchone(self):
+        return self.cursor.fetchone()
+
+    def fetchall(self):
+        return self.cursor.fetchall()
+
+    def fetchmany(self, size=None):
+        return self.cursor.fetchmany(size) if size is not None else self.cursor.fetchmany()
+
+
+_CATALOG_ROWS = {
+    "columns": namedtuple("ColumnRow", "schema_id object_id schema_name table_name column_name data_type max_length is_nullable"),
+    "primary_key": namedtuple("PrimaryKeyRow", "schema_id object_id column_name"),
+    "foreign_keys": namedtuple("ForeignKeyRow", "schema_id object_id parent_column ref_schema ref_table ref_column"),
+    "indexes": namedtuple("IndexRow", "schema_id object_id index_name is_unique column_name"),
+    "versions": namedtuple("VersionRow", "schema_name table_name object_id modify_date row_count"),
+}
+
+
+class CatalogConnection:
+    """
+    Stand-in για το catalog του SQL Server (sys.tables/columns/indexes/foreign_keys) όπως
+    το διαβάζει ο SchemaLoader: οι γραμμές κάθε query παράγονται lazily με τη σειρά
+    (schema_id, object_id), ώστε μόνο ο client να κρατά μνήμη. Ο πίνακας 0 έχει
+    wide_columns στήλες (ο μεγαλύτερος πίνακας), οι υπόλοιποι columns.
+    """
+    def __init__(self, tables: int = 10000, schemas: int = 10, columns: int = 40, wide_columns: int = 2000,
+                 foreign_keys: int = 2, indexes: int = 2):
+        self.tables = tables
+        self.schemas = schemas
+        self.columns = columns
+        self.wide_columns = wide_columns
+        self.foreign_keys = foreign_keys
+        self.indexes = indexes
+        self.round_trips = 0
+
+    def cursor(self):
+        return _CatalogCursor(self)
+
+    def close(self):
+        pass
+
+    def table_list(self):
+        """[(schema_id, object_id, schema_name, table_name, n_columns)] με τη σειρά του catalog."""
+        per_schema = -(-self.tables // self.schemas)
+        for t in range(self.tables):
+            schema_id = 1 + t // per_schema
+            yield (schema_id, 1000 + t, f"s{schema_id}", f"Table{t:06d}",
+                   self.wide_columns if t == 0 else self.columns)
+
+    def rows(self, kind):
+        row = _CATALOG_ROWS[kind]
+        for schema_id, object_id, sch, tbl, n_columns in self.table_list():
+            t = object_id - 1000
+            if kind == "columns":
+                for c in range(n_columns):
+                    name = f"{tbl}ID" if c == 0 else f"Col{c:04d}"
+                    yield row(schema_id, object_id, sch, tbl, name, "int" if c % 3 == 0 else "nvarchar",
+                              4 if c % 3 == 0 else 100, c % 4 == 3)
+            elif kind == "primary_key":
+                yield row(schema_id, object_id, f"{tbl}ID")
+            elif kind == "foreign_keys":
+                for k in range(min(self.foreign_keys, t)):
+                    ref = (t * 7 + k) % t
+                    ref_schema = 1 + ref // -(-self.tables // self.schemas)
+                    yield row(schema_id, object_id, f"Col{3 * (k + 1):04d}", f"s{ref_schema}",
+                              f"Table{ref:06d}", f"Table{ref:06d}ID")
+            elif kind == "indexes":
+                for i in range(self.indexes):
+                    for c in range(2):
+                        yield row(schema_id, object_id, f"IX_{tbl}_{i}", i == 0, f"Col{i * 2 + c + 1:04d}")
+            else:
+                yield row(sch, tbl, object_id, datetime.datetime(2024, 1, 1), 1000)
+
+
+class SchemaCatalogConnection(CatalogConnection):
+    """Το catalog ενός συνθετικού σχήματος (benchmarks.synthetic) για τον SchemaLoader."""
+    def __init__(self, schema: dict, rows: int = 1000):
+        self.schema = schema
+        self.row_count = rows
+        self.round_trips = 0
+
+    def table_list(self):
+        object_id = 1000
+        for schema_id, (sch, tables) in enumerate(self.schema["schemas"].items(), start=1):
+            for tbl, info in tables.items():
+                yield schema_id, object_id, sch, tbl, info
+                object_id += 1
+
+    def rows(self, kind):
+        row = _CATALOG_ROWS[kind]
+        for schema_id, object_id, sch, tbl, info in self.table_list():
+            if kind == "columns":
+                for col in info["columns"]:
+                    yield row(schema_id, object_id, sch, tbl, col["name"], col["type"],
+                              col["max_length"], col["nullable"])
+            elif kind == "primary_key":
+                for column in info["primary_key"]:
+                    yield row(schema_id, object_id, column)
+            elif kind == "foreign_keys":
+                for fk in info["foreign_keys"]:
+                    yield row(schema_id, object_id, fk["column"], fk["ref_schema"], fk["ref_table"], fk["ref_column"])
+            elif kind == "indexes":
+                for index in info["indexes"]:
+                    for column in index["columns"]:
+                        yield row(schema_id, object_id, index["name"], index["unique"], column)
+            else:
+                yield row(sch, tbl, object_id, datetime.datetime(2024, 1, 1), self.row_count)
+
+
+class _CatalogCursor:
+    def __init__(self, owner):
+        self.owner = owner
+        self.arraysize = 1
+        self._rows = iter(())
+
+    def execute(self, sql, params=()):
+        self.owner.round_trips += 1
+        if "sys.foreign_keys" in sql:
+            kind = "foreign_keys"
+        elif "is_primary_key = 1" in sql:
+            kind = "primary_key"
+        elif "is_primary_key = 0" in sql:
+            kind = "indexes"
+        elif "dm_db_partition_stats" in sql:
+            kind = "versions"
+        else:
+            kind = "columns"
+        self._rows = self.owner.rows(kind)
+        return self
+
+    def fetchone(self):
+        return next(self._rows, None)
+
+    def fetchmany(self, size=None):
+        return list(itertools.islice(self._rows, size or self.arraysize))
+
+    def fetchall(self):
+        return list(self._rows)
+
+    def close(self):
+        self._rows = iter(())
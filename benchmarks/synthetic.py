@@ -0,0 +1,67 @@
+# ----------------------------- benchmarks/synthetic.py -----------------------------
+"""
+Συνθετικά catalogs στη μορφή του <db>.json (SchemaLoader) σε όποια κλίμακα χρειαστεί.
+"""
+import random
+from datetime import datetime
+
+TYPES = [("int", 4), ("varchar", 50), ("date", 3), ("decimal", 9), ("nvarchar", 200), ("bit", 1)]
+WORDS = ["Customer", "Order", "Product", "Invoice", "Employee", "Store", "Supplier", "Shipment",
+         "Payment", "Account", "Region", "Category", "Campaign", "Ticket", "Contract", "Asset"]
+
+
+def synthetic_schema(tables: int = 100, columns: int = 10, fk_density: float = 0.5,
+                     shared_id_columns: int = 2, schemas: int = 4, seed: int = 0,
+                     database: str = "SyntheticDB", schema_names=None) -> dict:
+    """
+    fk_density: μέσος αριθμός δηλωμένων FK ανά πίνακα.
+    shared_id_columns: πόσες στήλες τύπου TenantID/CompanyID έχει κάθε πίνακας
+    (το σενάριο όπου η *ID heuristic φτιάχνει τετραγωνικό πλήθος ακμών).
+    schema_names: ονόματα των schemas αντί για s0..s{schemas-1} (π.χ. ["main"] για SQLite).
+    """
+    rnd = random.Random(seed)
+    schema_names = list(schema_names or [f"s{i}" for i in range(schemas)])
+    schemas = len(schema_names)
+    shared = ["TenantID", "CompanyID", "CreatedByID", "ModifiedByID", "SiteID"][:shared_id_columns]
+
+    keys = []
+    for i in range(tables):
+        name = f"{WORDS[i % len(WORDS)]}{i // len(WORDS) or ''}"
+        keys.append((schema_names[i % schemas], name))
+
+    result = {
+        "database": database,
+        "generated_at": datetime.utcnow().isoformat(),
+        "dialect": "sqlserver",
+        "schemas": {s: {} for s in schema_names}
+    }
+
+    for i, (sch, tbl) in enumerate(keys):
+        pk = f"{tbl}ID"
+        cols = [{"name": pk, "type": "int", "max_length": 4, "nullable": False}]
+        for col in shared:
+            cols.append({"name": col, "type": "int", "max_length": 4, "nullable": True})
+
+        fks = []
+        n_fk = int(fk_density) + (1 if rnd.random() < fk_density % 1 else 0)
+        for _ in range(n_fk if i else 0):
+            ref_sch, ref_tbl = keys[rnd.randrange(i)]
+            col_name = f"{ref_tbl}ID"
+            if any(c["name"] == col_name for c in cols):
+                continue
+            cols.append({"name": col_name, "type": "int", "max_length": 4, "nullable": True})
+            fks.append({"column": col_name, "ref_schema": ref_sch, "ref_table": ref_tbl, "ref_column": f"{ref_tbl}ID"})
+
+        while len(cols) < columns:
+            col_type, length = TYPES[rnd.randrange(len(TYPES))]
+            cols.append({"name": f"{rnd.choice(WORDS)}{len(cols)}", "type": col_type,
+                         "max_length": length, "nullable": rnd.random() < 0.5})
+
+        result["schemas"][sch][tbl] = {
+            "columns": cols,
+            "primary_key": [pk],
+            "foreign_keys": fks,
+            "indexes": [],
+            "constraints": []
+        }
+    return result
@@ -0,0 +1,35 @@
+# ----------------------------- core/background.py -----------------------------
+import threading
+
+
+class BackgroundModel:
+    """
+    Φορτώνει ένα μοντέλο (π.χ. SentenceTransformer) σε background thread και
+    συμπεριφέρεται σαν αυτό: η πρώτη χρήση περιμένει να τελειώσει η φόρτωση.
+    model_name είναι διαθέσιμο αμέσως (το γράφει ο MultiJSONChunker στο chunk store),
+    ώστε ο έλεγχος αν τα chunks είναι ενημερωμένα να μη χρειάζεται το μοντέλο.
+    """
+    def __init__(self, factory, model_name: str):
+        self.model_name = model_name
+        self._model = None
+        self._error = None
+        self._thread = threading.Thread(target=self._load, args=(factory,), name=f"load-{model_name}", daemon=True)
+        self._thread.start()
+
+    def _load(self, factory):
+        try:
+            self._model = factory()
+        except BaseException as exc:
+            self._error = exc
+
+    def get(self):
+        self._thread.join()
+        if self._error is not None:
+            raise RuntimeError(f"Loading {self.model_name} failed") from self._error
+        return self._model
+
+    def __getattr__(self, name):
+        # Μόνο για attributes που δεν έχει το ίδιο το proxy (encode, get_sentence_embedding_dimension, ...)
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.get(), name)
@@ -0,0 +1,184 @@
+# ----------------------------- core/chunk_store.py -----------------------------
+import os
+import json
+import shutil
+
+import numpy as np
+
+FORMAT_VERSION = 1
+DTYPES = ("float32", "float16", "int8")
+ROUTING_ROWS = 256
+
+
+def chunk_store_path_for(db_folder: str) -> str:
+    return os.path.join(db_folder, "chunk_store")
+
+
+def _quantize(vectors, dtype):
+    """(matrix, scales): int8 με scale ανά γραμμή, αλλιώς απλό cast (scales = None)."""
+    if dtype == "int8":
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        return np.round(vectors / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+    return vectors.astype(dtype), None
+
+
+def _routing_sample(vectors, rows=ROUTING_ROWS):
+    """Έως rows γραμμές σε ίσες αποστάσεις: μικρό δείγμα της βάσης για το routing ερωτήσεων."""
+    if len(vectors) <= rows:
+        return np.asarray(vectors, dtype=np.float32)
+    picked = np.linspace(0, len(vectors) - 1, rows).astype(np.int64)
+    return np.asarray(vectors[picked], dtype=np.float32)
+
+
+class ChunkStore:
+    """
+    Όλα τα chunks μιας βάσης σε ένα φάκελο, χωρίς pickle:
+      header.json    έκδοση, μοντέλο, διάσταση, dtype, schema fingerprint, ρυθμίσεις build, εύρος γραμμών ανά source
+      embeddings.npy (n, dim) normalized embeddings σε float32 / float16 / int8 (memory-mapped)
+      scales.npy     scale ανά γραμμή για int8
+      routing.npy    έως 256 float32 γραμμές, για να διαλέγει ο DatabaseRegistry βάση χωρίς να τη φορτώσει
+      payloads.bin   τα chunks ως JSON το ένα μετά το άλλο, offsets.npy τα όριά τους
+
+    Η γραμμή i είναι και το id της στο FAISS index. Τα payloads αποκωδικοποιούνται
+    μόνο για τα αποτελέσματα της αναζήτησης.
+    """
+    def __init__(self, path: str, header: dict, embeddings, scales, offsets, payloads):
+        self.path = path
+        self.header = header
+        self.embeddings = embeddings
+        self.scales = scales
+        self.offsets = offsets
+        self.payloads = payloads
+        self.sources = {name: tuple(span) for name, span in header["sources"].items()}
+
+    @staticmethod
+    def save(path: str, sources: dict, model_name: str, fingerprint: str, dtype: str = "float32", build: dict = None):
+        """
+        sources: {name: (chunks, normalized embeddings)} με τη σειρά του FAISS index.
+        build: ρυθμίσεις του MultiJSONChunker που το έφτιαξε (βλ. is_current).
+        """
+        if dtype not in DTYPES:
+            raise ValueError(f"Unknown chunk store dtype: {dtype} (expected one of {DTYPES})")
+
+        spans, payloads, lengths, matrices = {}, [], [], []
+        row = 0
+        for name, (chunks, embeddings) in sources.items():
+            spans[name] = [row, row + len(chunks)]
+            row += len(chunks)
+            for chunk in chunks:
+                data = json.dumps(chunk, ensure_ascii=False, default=str).encode("utf-8")
+                payloads.append(data)
+                lengths.append(len(data))
+            matrices.append(np.asarray(embeddings, dtype=np.float32))
+
+        dim = next((m.shape[1] for m in matrices if m.ndim == 2), 0)
+        filled = [m.reshape(-1, dim) for m in matrices if m.size]
+        vectors = np.vstack(filled) if filled else np.zeros((0, dim), np.float32)
+        matrix, scales = _quantize(vectors, dtype)
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+
+        header = {
+            "version": FORMAT_VERSION,
+            "model": model_name,
+            "dim": int(dim),
+            "dtype": dtype,
+            "count": int(row),
+            "fingerprint": fingerprint,
+            "build": build or {},
+            "sources": spans
+        }
+
+        tmp = path + ".tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        np.save(os.path.join(tmp, "embeddings.npy"), matrix)
+        if scales is not None:
+            np.save(os.path.join(tmp, "scales.npy"), scales)
+        np.save(os.path.join(tmp, "offsets.npy"), offsets)
+        np.save(os.path.join(tmp, "routing.npy"), _routing_sample(vectors))
+        with open(os.path.join(tmp, "payloads.bin"), "wb") as f:
+            for data in payloads:
+                f.write(data)
+        with open(os.path.join(tmp, "header.json"), "w", encoding="utf-8") as f:
+            json.dump(header, f, indent=2)
+
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp, path)
+        print(f"✅ Chunk store ({row} chunks, {dtype}) saved to {path}")
+
+    @classmethod
+    def load(cls, path: str) -> "ChunkStore":
+        with open(os.path.join(path, "header.json"), "r", encoding="utf-8") as f:
+            header = json.load(f)
+        if header.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported chunk store version {header.get('version')} in {path}")
+
+        # Όλα memory-mapped: οι σελίδες μοιράζονται μεταξύ processes
+        embeddings = np.load(os.path.join(path, "embeddings.npy"), mmap_mode="r")
+        scales_file = os.path.join(path, "scales.npy")
+        scales = np.load(scales_file, mmap_mode="r") if os.path.exists(scales_file) else None
+        offsets = np.load(os.path.join(path, "offsets.npy"), mmap_mode="r")
+        payloads_file = os.path.join(path, "payloads.bin")
+        payloads = np.memmap(payloads_file, dtype=np.uint8, mode="r") if os.path.getsize(payloads_file) else b""
+        return cls(path, header, embeddings, scales, offsets, payloads)
+
+    def __len__(self) -> int:
+        return int(self.header["count"])
+
+    def count(self, name: str) -> int:
+        start, end = self.sources.get(name, (0, 0))
+        return end - start
+
+    def row(self, name: str, idx: int) -> int:
+        return self.sources[name][0] + idx
+
+    def locate(self, row: int):
+        """(source, chunk_idx) της γραμμής row."""
+        for name, (start, end) in self.sources.items():
+            if start <= row < end:
+                return name, row - start
+        raise IndexError(row)
+
+    def ids(self):
+        return [(name, i) for name, (start, end) in self.sources.items() for i in range(end - start)]
+
+    def chunk(self, name: str, idx: int):
+        row = self.row(name, idx)
+        start, end = self.offsets[row:row + 2].tolist()
+        return json.loads(bytes(self.payloads[start:end]).decode("utf-8"))
+
+    def vectors(self, start: int = 0, end: int = None) -> np.ndarray:
+        """Οι γραμμές start:end ως float32."""
+        block = np.asarray(self.embeddings[start:end], dtype=np.float32)
+        if self.scales is not None:
+            block *= np.asarray(self.scales[start:end])[:, None]
+        return block
+
+    def vectors_at(self, rows) -> np.ndarray:
+        """Μόνο οι γραμμές rows ως float32 (διαβάζονται μόνο οι σελίδες τους)."""
+        rows = np.asarray(rows, dtype=np.int64)
+        block = np.asarray(self.embeddings[rows], dtype=np.float32)
+        if self.scales is not None:
+            block *= np.asarray(self.scales[rows])[:, None]
+        return block
+
+    def routing_vectors(self) -> np.ndarray:
+        """Το δείγμα του routing.npy (stores χωρίς αυτό: υπολογίζεται από τα embeddings)."""
+        path = os.path.join(self.path, "routing.npy")
+        if os.path.exists(path):
+            return np.load(path)
+        if self.scales is None:
+            return _routing_sample(self.embeddings)
+        picked = np.linspace(0, len(self) - 1, min(len(self), ROUTING_ROWS)).astype(np.int64)
+        return self.vectors_at(picked)
+
+    def scores(self, query_vec, block_rows: int = 8192) -> np.ndarray:
+        """Cosine similarity όλων των γραμμών, σε blocks ώστε να μη φορτώνεται όλος ο πίνακας."""
+        query = np.asarray(query_vec, dtype=np.float32).reshape(-1)
+        n = len(self)
+        result = np.empty(n, dtype=np.float32)
+        for start in range(0, n, block_rows):
+            result[start:start + block_rows] = self.vectors(start, start + block_rows) @ query
+        return result
@@ -1,33 +1,77 @@
 # ----------------------------- core/chunks.py (updated) -----------------------------
 import os
 import json
-import pickle
 import numpy as np
-from sentence_transformers import SentenceTransformer
 import faiss  # για fast similarity search
 
+from core.embedding_cache import EmbeddingCache
+from core.chunk_store import ChunkStore, chunk_store_path_for, FORMAT_VERSION
+from core.fingerprint import schema_fingerprint, file_digest
+from core.graph_store import GraphStore, store_path_for
+from core.lexical_index import LexicalIndex, lexical_index_path_for
+from core.value_index import ValueIndex, value_index_path_for
+from core.vector_index import build_index, normalize, resolve_index_type, resolve_quantization, save_ids
+from core.instrumentation import instrumentation, traced, hot_path
+from core.schema_loader import schema_path_for, read_schema_file
+
 class MultiJSONChunker:
     """
     Σπάει JSON αρχεία (graph, schema, stats) σε chunks, φτιάχνει embeddings
     και φτιάχνει FAISS index για γρήγορη αναζήτηση.
+
+    chunk_size: πίνακες ανά chunk (1 = ένα chunk ανά πίνακα, ώστε η αναζήτηση να
+    επιστρέφει μόνο τους σχετικούς πίνακες). Πίνακες με περισσότερες από
+    column_group_size στήλες σπάνε σε ομάδες στηλών.
+    index_type: "auto" (flat μέχρι ann_threshold chunks, μετά HNSW), "flat", "hnsw", "ivf"
+    cache_path: SQLite cache embeddings (None = χωρίς cache), cache_mb: όριο μεγέθους
+    store_dtype: dtype των embeddings στο chunk store ("float32", "float16", "int8")
+    quantization: vectors του FAISS index ("none", "sq8", "pq"). Το QueryAI κάνει
+    rescoring των υποψηφίων με τα embeddings του chunk store.
+
+    Δίπλα στο FAISS index γράφεται και BM25 index των ονομάτων πινάκων/στηλών
+    (core.lexical_index) για το hybrid retrieval του QueryAI, και από τα stats το
+    index τιμή -> στήλη (core.value_index) για τα literals των ερωτήσεων.
     """
-    def __init__(self, base_path: str, db_name: str, chunk_size: int = 50,
-                 embed_model: str = "all-MiniLM-L6-v2", index_path=None):
+    def __init__(self, base_path: str, db_name: str, chunk_size: int = 1, column_group_size: int = 40,
+                 embed_model: str = "all-MiniLM-L6-v2", index_path=None,
+                 index_type: str = "auto", ann_threshold: int = 20000,
+                 batch_size: int = 64, cache_path="default", cache_mb: float = 256,
+                 store_dtype: str = "float32", quantization: str = "none"):
         self.base_path = base_path
         self.db_name = db_name
         self.chunk_size = chunk_size
+        self.column_group_size = column_group_size
+        self.index_type = index_type
+        self.store_dtype = store_dtype
+        self.quantization = quantization
+        self.ann_threshold = ann_threshold
         self.db_folder = os.path.join(base_path, "databases", db_name)
         self.index_path = index_path or os.path.join(self.db_folder, "faiss_index.idx")
 
         self.files = {
             "graph": os.path.join(self.db_folder, f"{db_name}_graph.json"),
-            "schema": os.path.join(self.db_folder, f"{db_name}.json"),
+            "schema": schema_path_for(self.db_folder, db_name),
             "stats": os.path.join(self.db_folder, f"{db_name}_stats.json")
         }
+        self.graph_store_path = store_path_for(self.db_folder, db_name)
+        self.lexical_index_path = lexical_index_path_for(self.db_folder)
+        self.value_index_path = value_index_path_for(self.db_folder)
 
-        self.embed_model = SentenceTransformer(embed_model)
+        # embed_model: όνομα μοντέλου ή ήδη φορτωμένο SentenceTransformer
+        if isinstance(embed_model, str):
+            from sentence_transformers import SentenceTransformer
+            self.embed_model_name = embed_model
+            self.embed_model = SentenceTransformer(embed_model)
+        else:
+            self.embed_model_name = getattr(embed_model, "model_name", type(embed_model).__name__)
+            self.embed_model = embed_model
+        self.batch_size = batch_size
         os.makedirs(self.db_folder, exist_ok=True)
 
+        if cache_path == "default":
+            cache_path = os.path.join(base_path, "cache", "embeddings.sqlite")
+        self.cache = EmbeddingCache(cache_path, self.embed_model_name, max_mb=cache_mb) if cache_path else None
+
     def chunk_json(self, json_data, name):
         chunks = []
         if name in ("graph", "schema"):
@@ -39,17 +83,20 @@ class MultiJSONChunker:
                     for table_name, table_info in tables.items():
                         nodes.append((f"{schema_name}.{table_name}", table_info))
 
-            for i in range(0, len(nodes), self.chunk_size):
-                chunk_nodes = nodes[i:i+self.chunk_size]
-                chunk_summary = []
-                for table_key, table_info in chunk_nodes:
-                    chunk_summary.append({
+            entries = []
+            for table_key, table_info in nodes:
+                columns = [c["name"] for c in table_info.get("columns", [])]
+                group = self.column_group_size or len(columns) or 1
+                for g in range(0, max(len(columns), 1), group):
+                    entries.append({
                         "table": table_key,
-                        "columns": [c["name"] for c in table_info.get("columns", [])],
+                        "columns": columns[g:g + group],
                         "primary_key": table_info.get("primary_key", []),
                         "importance_score": table_info.get("importance_score", 0)
                     })
-                chunks.append(chunk_summary)
+
+            for i in range(0, len(entries), self.chunk_size):
+                chunks.append(entries[i:i+self.chunk_size])
 
         elif name == "stats":
             for i, (table_key, table_info) in enumerate(json_data.items()):
@@ -63,58 +110,168 @@ class MultiJSONChunker:
                 })
         return chunks
 
+    @traced("chunks.embed")
+    @hot_path("chunks.embed")
     def embed_chunks(self, chunks):
-        embeddings = []
-        for chunk in chunks:
-            text = json.dumps(chunk)
-            vec = self.embed_model.encode(text, convert_to_numpy=True)
-            embeddings.append(vec)
-        return np.array(embeddings, dtype=np.float32)
-
-    def save_chunks(self, name, chunks, embeddings):
-        chunks_file = os.path.join(self.db_folder, f"{name}_chunks.pkl")
-        embeddings_file = os.path.join(self.db_folder, f"{name}_chunks_embeddings.npy")
-
-        with open(chunks_file, "wb") as f:
-            pickle.dump(chunks, f)
-        np.save(embeddings_file, embeddings)
-        print(f"✅ {name} chunks and embeddings saved")
-
-    def build_faiss_index(self, embeddings):
-        dim = embeddings.shape[1]
-        index = faiss.IndexFlatIP(dim)  # inner product ~ cosine similarity
-        faiss.normalize_L2(embeddings)
-        index.add(embeddings)
+        """
+        Embeddings με batched encode: ίδια κείμενα υπολογίζονται μία φορά, τα batches
+        έχουν παρόμοιο μήκος (λιγότερο padding) και ό,τι υπάρχει στο cache δεν ξαναϋπολογίζεται.
+        """
+        texts = [json.dumps(chunk) for chunk in chunks]
+        if not texts:
+            return np.zeros((0, self.embed_model.get_sentence_embedding_dimension()), dtype=np.float32)
+
+        keys = [self.cache.key(t) for t in texts] if self.cache else texts
+        vectors = self.cache.get_many(keys) if self.cache else {}
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors:
+                missing.setdefault(key, text)
+
+        if missing:
+            pending = sorted(missing.items(), key=lambda kv: len(kv[1]))
+            computed = []
+            for i in range(0, len(pending), self.batch_size):
+                batch = pending[i:i + self.batch_size]
+                with instrumentation.span("chunks.embed_batch", texts=len(batch),
+                                          chars=sum(len(text) for _, text in batch)):
+                    encoded = self.embed_model.encode(
+                        [text for _, text in batch], batch_size=self.batch_size, convert_to_numpy=True
+                    )
+                computed.extend(zip([key for key, _ in batch], encoded))
+            vectors.update(computed)
+            if self.cache:
+                self.cache.put_many(computed)
+
+        instrumentation.current().set(embedded=len(missing), reused=len(texts) - len(missing))
+        print(f"Embedded {len(missing)} new chunks, {len(texts) - len(missing)} reused")
+        return np.array([vectors[k] for k in keys], dtype=np.float32)
+
+    @traced("chunks.save")
+    def save_chunks(self, sources):
+        """sources: {name: (chunks, embeddings)} -> chunk_store/ (βλ. core.chunk_store)."""
+        ChunkStore.save(
+            chunk_store_path_for(self.db_folder),
+            {name: (chunks, normalize(embeddings) if len(embeddings) else embeddings)
+             for name, (chunks, embeddings) in sources.items()},
+            model_name=self.embed_model_name,
+            fingerprint=schema_fingerprint(self.db_folder, self.db_name),
+            dtype=self.store_dtype,
+            build=self.build_settings()
+        )
+        # Τα παλιά pickle/npy αρχεία δεν διαβάζονται πια
+        for name in self.files:
+            for old in (f"{name}_chunks.pkl", f"{name}_chunks_embeddings.npy"):
+                old_path = os.path.join(self.db_folder, old)
+                if os.path.exists(old_path):
+                    os.remove(old_path)
+
+    def build_settings(self) -> dict:
+        """Ό,τι εκτός από σχήμα/graph και μοντέλο αλλάζει τα chunks ή το index."""
+        return {
+            "chunk_size": self.chunk_size,
+            "column_group_size": self.column_group_size,
+            "index_type": self.index_type,
+            "ann_threshold": self.ann_threshold,
+            "quantization": self.quantization,
+            "stats": file_digest(self.files["stats"])
+        }
+
+    def is_current(self) -> bool:
+        """
+        Chunk store και FAISS index φτιάχτηκαν από τα τωρινά JSON, με το ίδιο μοντέλο
+        και τις ίδιες ρυθμίσεις: το run() θα έβγαζε τα ίδια αρχεία.
+        """
+        header_file = os.path.join(chunk_store_path_for(self.db_folder), "header.json")
+        outputs = (header_file, self.index_path, self.lexical_index_path, self.value_index_path)
+        if not all(os.path.exists(p) for p in outputs):
+            return False
+        with open(header_file, "r", encoding="utf-8") as f:
+            header = json.load(f)
+        return (header.get("version") == FORMAT_VERSION
+                and header.get("model") == self.embed_model_name
+                and header.get("dtype") == self.store_dtype
+                and header.get("build") == self.build_settings()
+                and header.get("fingerprint") == schema_fingerprint(self.db_folder, self.db_name))
+
+    @traced("chunks.faiss_index")
+    def build_faiss_index(self, embeddings, ids=None):
+        """
+        ids[i] = [source, chunk_idx] της γραμμής i, ώστε το QueryAI να βρίσκει
+        το chunk κάθε αποτελέσματος χωρίς brute-force αναζήτηση.
+        """
+        # Normalized vectors: inner product ~ cosine similarity
+        index = build_index(embeddings, self.index_type, self.ann_threshold, self.quantization)
         faiss.write_index(index, self.index_path)
-        print(f"✅ FAISS index saved to {self.index_path}")
+        if ids is not None:
+            save_ids(self.index_path, ids)
+        kind = resolve_index_type(len(embeddings), self.index_type, self.ann_threshold)
+        quantization = resolve_quantization(len(embeddings), self.quantization)
+        print(f"✅ FAISS index ({kind}, {quantization}, {index.ntotal} vectors) saved to {self.index_path}")
+        return index
+
+    @traced("chunks.lexical_index")
+    def build_lexical_index(self, sources):
+        """BM25 index των identifiers, ένα doc ανά γραμμή του chunk store (ίδια σειρά sources)."""
+        index = LexicalIndex.build(chunk for chunks, _ in sources.values() for chunk in chunks)
+        index.save(self.lexical_index_path)
+        instrumentation.current().set(terms=len(index.term_ids), docs=index.doc_count)
         return index
 
+    @traced("chunks.value_index")
+    def build_value_index(self, stats):
+        """Index τιμή -> (πίνακας, στήλη) από τα top_values / values των stats ({} χωρίς stats)."""
+        index = ValueIndex.build(stats)
+        index.save(self.value_index_path)
+        instrumentation.current().set(values=index.size, columns=len(index.columns))
+        return index
+
+    @traced("chunks.run")
     def run(self):
         all_embeddings = []
+        all_ids = []
+        sources = {}
+        stats = {}
         for name, path in self.files.items():
-            if not os.path.exists(path):
+            if name == "graph" and os.path.exists(self.graph_store_path):
+                # Από το graph store: χωρίς json.load ολόκληρου του <db>_graph.json
+                print(f"Processing {name} store...")
+                data = {"nodes": GraphStore.load(self.graph_store_path)}
+            elif not os.path.exists(path):
                 if name == "stats":
                     print(f"⚠️ Stats file not found, skipping {name}")
                     continue
                 else:
                     raise FileNotFoundError(f"{name} file not found: {path}")
+            elif name == "schema":
+                print(f"Processing {name} JSON...")
+                data = read_schema_file(path)
+            else:
+                print(f"Processing {name} JSON...")
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
 
-            print(f"Processing {name} JSON...")
-            with open(path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-
-            chunks = self.chunk_json(data, name)
+            if name == "stats":
+                stats = data
+            with instrumentation.span("chunks.chunk_json", source=name):
+                chunks = self.chunk_json(data, name)
             print(f"Created {len(chunks)} chunks for {name}")
 
             embeddings = self.embed_chunks(chunks)
             print(f"Created embeddings for {name}")
 
-            self.save_chunks(name, chunks, embeddings)
+            sources[name] = (chunks, embeddings)
             all_embeddings.append(embeddings)
+            all_ids.extend([name, i] for i in range(len(chunks)))
+
+        self.save_chunks(sources)
+        self.build_lexical_index(sources)
+        self.build_value_index(stats)
 
         # Συνενώνουμε όλα τα embeddings για FAISS
         if all_embeddings:
             combined_embeddings = np.vstack(all_embeddings)
-            self.build_faiss_index(combined_embeddings)
+            self.build_faiss_index(combined_embeddings, ids=all_ids)
 
         print("✅ Multi-JSON chunking pipeline completed successfully!")
@@ -0,0 +1,37 @@
+# ----------------------------- core/connection_pool.py -----------------------------
+import threading
+
+
+class ConnectionPool:
+    """
+    Bounded pool με ένα connection ανά worker thread.
+    Τα pyodbc connections δεν μοιράζονται με ασφάλεια μεταξύ threads, οπότε κάθε
+    thread παίρνει το δικό του connection την πρώτη φορά που το ζητήσει.
+    """
+    def __init__(self, connect, size: int):
+        self.connect = connect
+        self.size = size
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+
+    def get(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            with self._lock:
+                if len(self._connections) >= self.size:
+                    raise RuntimeError(f"Connection pool exhausted (size={self.size})")
+                conn = self.connect()
+                self._connections.append(conn)
+            self._local.conn = conn
+        return conn
+
+    def close_all(self):
+        with self._lock:
+            for conn in self._connections:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+            self._connections = []
+        self._local = threading.local()
@@ -0,0 +1,90 @@
+# ----------------------------- core/embedding_cache.py -----------------------------
+import os
+import time
+import sqlite3
+import hashlib
+import numpy as np
+
+
+class EmbeddingCache:
+    """
+    Persistent cache embeddings σε SQLite, με κλειδί το hash(model name + chunk text).
+    Όταν ξεπεραστεί το max_mb, διαγράφονται πρώτα τα λιγότερο πρόσφατα χρησιμοποιημένα.
+    """
+    def __init__(self, path: str, model_name: str, max_mb: float = 256):
+        self.path = path
+        self.model_name = model_name
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                dim INTEGER NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS ix_embeddings_last_used ON embeddings(last_used)")
+        self.conn.commit()
+
+    def key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, keys):
+        """{key: vector} για όσα keys υπάρχουν στην cache."""
+        found = {}
+        keys = list(dict.fromkeys(keys))
+        for i in range(0, len(keys), 500):
+            batch = keys[i:i + 500]
+            placeholders = ", ".join("?" for _ in batch)
+            rows = self.conn.execute(
+                f"SELECT key, dim, vector FROM embeddings WHERE key IN ({placeholders})", batch
+            ).fetchall()
+            for key, dim, blob in rows:
+                found[key] = np.frombuffer(blob, dtype=np.float32, count=dim)
+
+        if found:
+            now = time.time()
+            self.conn.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE key = ?", [(now, k) for k in found]
+            )
+            self.conn.commit()
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, items):
+        """items: [(key, vector)]"""
+        now = time.time()
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (key, dim, vector, last_used) VALUES (?, ?, ?, ?)",
+            [(k, len(v), np.asarray(v, dtype=np.float32).tobytes(), now) for k, v in items]
+        )
+        self.conn.commit()
+        self._evict()
+
+    def _evict(self):
+        total = self.conn.execute("SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        # LRU: διαγράφουμε τα παλαιότερα μέχρι να πέσουμε κάτω από το όριο
+        excess = total - self.max_bytes
+        removed = 0
+        to_delete = []
+        cursor = self.conn.execute("SELECT key, LENGTH(vector) FROM embeddings ORDER BY last_used")
+        for key, size in cursor:
+            to_delete.append((key,))
+            removed += size
+            if removed >= excess:
+                break
+        cursor.close()
+        self.conn.executemany("DELETE FROM embeddings WHERE key = ?", to_delete)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
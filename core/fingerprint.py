@@ -0,0 +1,40 @@
+# ----------------------------- core/fingerprint.py -----------------------------
+import os
+import json
+import hashlib
+
+from core.graph_store import store_path_for
+from core.schema_loader import schema_path_for
+
+
+def file_digest(path: str):
+    """sha256 ενός αρχείου (None αν δεν υπάρχει)."""
+    if not os.path.exists(path):
+        return None
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def schema_fingerprint(db_folder: str, db_name: str) -> str:
+    """
+    sha256 των <db>.json (ή <db>.ndjson) και <db>_graph.json: αλλάζει μόλις αλλάξει το σχήμα ή οι
+    σχέσεις, ώστε caches και indexes που εξαρτώνται από αυτά να ακυρώνονται.
+    Το checksum του graph store (<db>_graph/meta.json) μπαίνει επίσης στο hash.
+    """
+    h = hashlib.sha256()
+    meta_file = os.path.join(store_path_for(db_folder, db_name), "meta.json")
+    if os.path.exists(meta_file):
+        with open(meta_file, "r", encoding="utf-8") as f:
+            h.update(json.load(f).get("checksum", "").encode("utf-8"))
+    for name in (os.path.basename(schema_path_for(db_folder, db_name)), f"{db_name}_graph.json"):
+        path = os.path.join(db_folder, name)
+        if not os.path.exists(path):
+            h.update(b"missing:" + name.encode("utf-8"))
+            continue
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+    return h.hexdigest()
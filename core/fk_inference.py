@@ -0,0 +1,206 @@
+# ----------------------------- core/fk_inference.py -----------------------------
+"""
+Inference virtual foreign keys χωρίς τετραγωνικό πλήθος ακμών.
+
+Υποψήφιοι στόχοι μιας στήλης *ID είναι μόνο key στήλες (μονόστηλο PK ή unique
+index) άλλων πινάκων, που βρίσκονται με lookup σε dicts:
+  - ίδιο όνομα στήλης:   Orders.CustomerID  -> Customers.CustomerID
+  - name stem = πίνακας: Orders.customer_id -> Customers.id
+Κάθε υποψήφια ακμή παίρνει score από PK/unique, τύπο/μήκος, όνομα/stem και
+(αν υπάρχουν stats) εύρος τιμών. Κρατούνται οι top_k ανά στήλη.
+"""
+import re
+from collections import defaultdict
+
+TYPE_FAMILIES = {
+    "int": "integer", "bigint": "integer", "smallint": "integer", "tinyint": "integer", "integer": "integer",
+    "char": "string", "varchar": "string", "nchar": "string", "nvarchar": "string", "text": "string",
+    "decimal": "numeric", "numeric": "numeric",
+    "uniqueidentifier": "guid"
+}
+
+NAME_MATCH = 0.35
+STEM_MATCH = 0.35
+PRIMARY_KEY = 0.2
+UNIQUE_KEY = 0.1
+EXACT_TYPE = 0.1
+VALUE_RANGE = 0.1
+VALUE_RANGE_MISMATCH = -0.3
+
+
+def _normalize(name: str) -> str:
+    return re.sub(r"[^0-9a-z]", "", name.lower())
+
+
+def column_stem(column: str):
+    """'CustomerID' / 'customer_id' -> 'customer', None αν η στήλη δεν είναι *ID με stem."""
+    name = _normalize(column)
+    if not name.endswith("id") or len(name) <= 2:
+        return None
+    return name[:-2]
+
+
+def table_stems(table: str):
+    """Ενικός και πληθυντικός: Customers -> {customers, customer}, Categories -> {..., category}."""
+    name = _normalize(table)
+    stems = {name}
+    if name.endswith("ies"):
+        stems.add(name[:-3] + "y")
+    if name.endswith("es"):
+        stems.add(name[:-2])
+    if name.endswith("s"):
+        stems.add(name[:-1])
+    return stems
+
+
+def _family(col):
+    return TYPE_FAMILIES.get((col.get("type") or "").lower(), (col.get("type") or "").lower())
+
+
+def _key_columns(table):
+    """{column name: "primary_key" | "unique"} για μονόστηλα keys."""
+    keys = {}
+    for index in table.get("indexes", []):
+        if index.get("unique") and len(index.get("columns", [])) == 1:
+            keys[index["columns"][0]] = "unique"
+    if len(table["primary_key"]) == 1:
+        keys[table["primary_key"][0]] = "primary_key"
+    return keys
+
+
+def _value_score(source_stats, target_stats):
+    # Τιμές της πηγής εκτός του εύρους του στόχου: σχεδόν σίγουρα όχι FK
+    if not source_stats or not target_stats:
+        return 0.0, None
+    s_min, s_max = source_stats.get("min"), source_stats.get("max")
+    t_min, t_max = target_stats.get("min"), target_stats.get("max")
+    if None in (s_min, s_max, t_min, t_max):
+        return 0.0, None
+    try:
+        inside = t_min <= s_min and s_max <= t_max
+    except TypeError:
+        return 0.0, None
+    return (VALUE_RANGE, "value range within target") if inside else (VALUE_RANGE_MISMATCH, "value range outside target")
+
+
+def infer_virtual_foreign_keys(tables, stats=None, top_k: int = 2, min_confidence: float = 0.5, only=None,
+                               columns=()):
+    """
+    tables: {"schema.table": {"columns", "primary_key", "foreign_keys", "indexes"}}
+    stats: το <db>_stats.json (προαιρετικά), για έλεγχο εύρους τιμών
+    only: αν δοθεί, μόνο οι στήλες-πηγές που αγγίζουν αυτούς τους πίνακες (στήλες τους
+    ή με υποψήφιο στόχο σε αυτούς). Οι στήλες αυτές βαθμολογούνται με όλους τους
+    υποψηφίους τους, ώστε οι top_k να είναι ίδιες με ένα πλήρες inference.
+    columns: επιπλέον (πίνακας, στήλη) πηγές για πλήρη βαθμολόγηση με το only (π.χ.
+    όσες είχαν ακμή προς πίνακα που άλλαξε ή αφαιρέθηκε)
+
+    Επιστρέφει (edges, report).
+    """
+    stats = stats or {}
+
+    # Lookups O(#στηλών): key στήλες ανά όνομα και πίνακες ανά stem
+    keys_by_name = defaultdict(list)
+    tables_by_stem = defaultdict(list)
+    key_columns = {}
+    for table_key, table in tables.items():
+        key_columns[table_key] = _key_columns(table)
+        columns_by_name = {c["name"]: c for c in table["columns"]}
+        for col_name, kind in key_columns[table_key].items():
+            if col_name in columns_by_name:
+                keys_by_name[_normalize(col_name)].append((table_key, columns_by_name[col_name], kind))
+        for stem in table_stems(table.get("table") or table_key.split(".", 1)[-1]):
+            tables_by_stem[stem].append(table_key)
+
+    edges = []
+    naive = 0
+    scored = 0
+    name_counts = defaultdict(set)
+    for table_key, table in tables.items():
+        for col in table["columns"]:
+            name_counts[col["name"].lower()].add(table_key)
+
+    for source_key, table in tables.items():
+        declared = {fk["column"] for fk in table.get("foreign_keys", [])}
+        source_pk = table["primary_key"][0] if len(table["primary_key"]) == 1 else None
+        source_columns_stats = stats.get(source_key, {}).get("columns", {})
+
+        for col in table["columns"]:
+            name = col["name"].lower()
+            if name.endswith("id"):
+                # Όσες ακμές θα έφτιαχνε η παλιά heuristic (κάθε πίνακας με ίδιο όνομα στήλης)
+                naive += len(name_counts[name]) - (source_key in name_counts[name])
+
+            stem = column_stem(col["name"])
+            if stem is None or col["name"] in declared:
+                continue
+
+            candidates = {}
+            for target_key, target_col, kind in keys_by_name.get(_normalize(col["name"]), []):
+                candidates[(target_key, target_col["name"])] = (target_col, kind, {"name match"})
+            for target_key in tables_by_stem.get(stem, []):
+                pk = tables[target_key]["primary_key"]
+                if len(pk) != 1:
+                    continue
+                target_col = next((c for c in tables[target_key]["columns"] if c["name"] == pk[0]), None)
+                if target_col is None:
+                    continue
+                entry = candidates.setdefault((target_key, pk[0]), (target_col, "primary_key", set()))
+                entry[2].add("name stem")
+
+            if (only is not None and source_key not in only and (source_key, col["name"]) not in columns
+                    and not any(target_key in only for target_key, _ in candidates)):
+                continue
+
+            ranked = []
+            for (target_key, ref_column), (target_col, kind, reasons) in candidates.items():
+                if target_key == source_key and ref_column == col["name"]:
+                    continue
+                # Το PK ενός πίνακα δείχνει μόνο στον πίνακα του ονόματός του (1:1), όχι σε κάθε "id"
+                if col["name"] == source_pk and "name stem" not in reasons:
+                    continue
+                if _family(col) != _family(target_col):
+                    continue
+                scored += 1
+
+                score = 0.0
+                reasons = sorted(reasons)
+                score += NAME_MATCH if "name match" in reasons else 0.0
+                score += STEM_MATCH if "name stem" in reasons else 0.0
+                score += PRIMARY_KEY if kind == "primary_key" else UNIQUE_KEY
+                reasons.append(kind.replace("_", " "))
+                if (col.get("type"), col.get("max_length")) == (target_col.get("type"), target_col.get("max_length")):
+                    score += EXACT_TYPE
+                    reasons.append("same type")
+                value, value_reason = _value_score(
+                    source_columns_stats.get(col["name"]),
+                    stats.get(target_key, {}).get("columns", {}).get(ref_column)
+                )
+                score += value
+                if value_reason:
+                    reasons.append(value_reason)
+
+                score = round(min(score, 1.0), 2)
+                if score >= min_confidence:
+                    ranked.append((score, target_key, ref_column, reasons))
+
+            ranked.sort(key=lambda r: (-r[0], r[1]))
+            for score, target_key, ref_column, reasons in ranked[:top_k]:
+                edges.append({
+                    "type": "virtual_foreign_key",
+                    "from": source_key,
+                    "to": target_key,
+                    "column": col["name"],
+                    "ref_column": ref_column,
+                    "confidence": score,
+                    "reason": "Inferred: " + ", ".join(reasons)
+                })
+
+    report = {
+        "naive_candidates": naive,
+        "scored_candidates": scored,
+        "kept": len(edges),
+        "pruned": max(naive - len(edges), 0),
+        "top_k": top_k,
+        "min_confidence": min_confidence
+    }
+    return edges, report
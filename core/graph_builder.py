@@ -1,32 +1,76 @@
 import os
 import json
-from collections import defaultdict
+
+from core.fk_inference import infer_virtual_foreign_keys
+from core.graph_store import GraphStore, store_path_for
+from core.join_index import JoinPathIndex, join_index_path_for
+from core.instrumentation import instrumentation, traced
+from core.schema_loader import schema_path_for, read_schema_file
 
 class GraphBuilder:
-    def __init__(self, base_path: str, db_name: str):
+    """
+    virtual_top_k / virtual_min_confidence: πόσες virtual FK ακμές κρατούνται ανά
+    στήλη και με ποιο ελάχιστο score (βλ. core.fk_inference).
+    Ο graph αποθηκεύεται στο <db>_graph/ (core.graph_store). Με export_json γράφεται
+    και το <db>_graph.json για συμβατότητα.
+    join_max_hops / join_max_targets / join_min_confidence: όρια του index μονοπατιών
+    join (<db>_join_paths/, βλ. core.join_index).
+    """
+    def __init__(self, base_path: str, db_name: str, virtual_top_k: int = 2, virtual_min_confidence: float = 0.5,
+                 export_json: bool = True, join_max_hops: int = 3, join_max_targets: int = 64,
+                 join_min_confidence: float = 0.1):
         self.base_path = base_path
         self.db_name = db_name
+        self.virtual_top_k = virtual_top_k
+        self.virtual_min_confidence = virtual_min_confidence
+        self.export_json = export_json
+        self.join_max_hops = join_max_hops
+        self.join_max_targets = join_max_targets
+        self.join_min_confidence = join_min_confidence
 
         # Φάκελος databases/<DB_NAME>
         self.db_folder = os.path.join(base_path, "databases", db_name)
         os.makedirs(self.db_folder, exist_ok=True)
 
-        self.schema_file = os.path.join(self.db_folder, f"{db_name}.json")
+        self.schema_file = schema_path_for(self.db_folder, db_name)
         self.graph_file = os.path.join(self.db_folder, f"{db_name}_graph.json")
+        self.store_path = store_path_for(self.db_folder, db_name)
+        self.join_index_path = join_index_path_for(self.db_folder, db_name)
+        self.stats_file = os.path.join(self.db_folder, f"{db_name}_stats.json")
 
         if not os.path.exists(self.schema_file):
             raise FileNotFoundError(f"Schema JSON not found: {self.schema_file}")
 
-        # --- Load schema ---
-        with open(self.schema_file, "r", encoding="utf-8") as f:
-            self.schema = json.load(f)
+        # --- Load schema (<db>.json ή <db>.ndjson) ---
+        self.schema = read_schema_file(self.schema_file)
+
+    def exists(self) -> bool:
+        return os.path.exists(self.store_path) or os.path.exists(self.graph_file)
+
+    def is_built(self) -> bool:
+        """Graph store και join path index υπάρχουν: το build() δεν έχει τίποτα να φτιάξει."""
+        return os.path.exists(self.store_path) and os.path.exists(self.join_index_path)
+
+    def load(self) -> dict:
+        # Το store είναι η κύρια μορφή, το JSON μένει για παλιούς φακέλους
+        if os.path.exists(self.store_path):
+            return GraphStore.load(self.store_path).to_graph()
+        with open(self.graph_file, "r", encoding="utf-8") as f:
+            return json.load(f)
 
-    def build(self) -> dict:
-        # Αν υπάρχει ήδη graph.json, φορτώνει και skip
-        if os.path.exists(self.graph_file):
-            print(f"Graph JSON already exists at {self.graph_file}, loading from file...")
-            with open(self.graph_file, "r", encoding="utf-8") as f:
-                return json.load(f)
+    @traced("graph.build")
+    def build(self, force: bool = False) -> dict:
+        # Αν υπάρχει ήδη graph, φορτώνει και skip. force: ξαναφτιάχνει graph store, join
+        # index και JSON από το <db>.json (π.χ. μετά από νέα εξαγωγή του σχήματος)
+        if self.exists() and not force:
+            instrumentation.current().set(loaded=True)
+            print(f"Graph already exists at {self.db_folder}, loading from file...")
+            graph = self.load()
+            if not os.path.exists(self.store_path):
+                GraphStore.from_graph(graph).save(self.store_path)
+            if not os.path.exists(self.join_index_path):
+                self._build_join_index(GraphStore.load(self.store_path))
+            return graph
 
         graph = {
             "database": self.db_name,
@@ -53,10 +97,59 @@ class GraphBuilder:
 
         self._add_real_foreign_keys(graph, tables)
         self._add_virtual_foreign_keys(graph, tables)
+        instrumentation.current().set(tables=len(tables), edges=len(graph["edges"]),
+                                      virtual_edges=len(graph["virtual_edges"]))
 
         self._save(graph)
         return graph
 
+    @traced("graph.patch")
+    def patch(self, changed_keys, removed_keys) -> dict:
+        """
+        Incremental refresh: ξαναφτιάχνει μόνο τους κόμβους των πινάκων που άλλαξαν
+        και τις ακμές που τους αγγίζουν, πάνω στο υπάρχον <db>_graph.json.
+        """
+        graph = self.load()
+
+        affected = set(changed_keys) | set(removed_keys)
+        tables = self._collect_tables()
+
+        def untouched(edge):
+            return edge["from"] not in affected and edge["to"] not in affected
+
+        # Στήλες που έχαναν ακμή προς πίνακα που άλλαξε: ξαναβαθμολογούνται, ώστε να
+        # μπει ο επόμενος υποψήφιος όπως σε ένα πλήρες build()
+        rescored = {(e["from"], e["column"]) for e in graph["virtual_edges"]
+                    if not untouched(e) and e["from"] not in affected}
+
+        graph["edges"] = [e for e in graph["edges"] if untouched(e)]
+        graph["virtual_edges"] = [e for e in graph["virtual_edges"] if untouched(e)]
+        for key in removed_keys:
+            graph["nodes"].pop(key, None)
+        for node in graph["nodes"].values():
+            node["outgoing_edges"] = [e for e in node["outgoing_edges"] if untouched(e)]
+            node["incoming_edges"] = [e for e in node["incoming_edges"] if untouched(e)]
+
+        for table_key in changed_keys:
+            if table_key not in tables:
+                continue
+            table = tables[table_key]
+            graph["nodes"][table_key] = {
+                "schema": table["schema"],
+                "table": table["table"],
+                "columns": table["columns"],
+                "primary_key": table["primary_key"],
+                "outgoing_edges": [],
+                "incoming_edges": []
+            }
+
+        only = {k for k in changed_keys if k in tables}
+        self._add_real_foreign_keys(graph, tables, only=only)
+        self._add_virtual_foreign_keys(graph, tables, only=only, columns=rescored)
+
+        self._save(graph, affected=affected)
+        return graph
+
     def _collect_tables(self):
         tables = {}
 
@@ -68,14 +161,18 @@ class GraphBuilder:
                     "table": table_name,
                     "columns": table["columns"],
                     "primary_key": table.get("primary_key", []),
-                    "foreign_keys": table.get("foreign_keys", [])
+                    "foreign_keys": table.get("foreign_keys", []),
+                    "indexes": table.get("indexes", [])
                 }
         return tables
 
-    def _add_real_foreign_keys(self, graph, tables):
+    def _add_real_foreign_keys(self, graph, tables, only=None):
+        # only: αν δοθεί, προστίθενται μόνο ακμές που αγγίζουν αυτούς τους πίνακες
         for source_key, table in tables.items():
             for fk in table["foreign_keys"]:
                 target_key = f"{fk['ref_schema']}.{fk['ref_table']}"
+                if only is not None and source_key not in only and target_key not in only:
+                    continue
 
                 edge = {
                     "type": "foreign_key",
@@ -91,44 +188,63 @@ class GraphBuilder:
                 graph["nodes"][source_key]["outgoing_edges"].append(edge)
                 graph["nodes"][target_key]["incoming_edges"].append(edge)
 
-    def _add_virtual_foreign_keys(self, graph, tables):
-        from collections import defaultdict
-        column_index = defaultdict(list)
+    @traced("graph.virtual_fks")
+    def _add_virtual_foreign_keys(self, graph, tables, only=None, columns=()):
+        # Τα stats (αν υπάρχουν από προηγούμενο run) επιτρέπουν έλεγχο εύρους τιμών
+        stats = None
+        if os.path.exists(self.stats_file):
+            with open(self.stats_file, "r", encoding="utf-8") as f:
+                stats = json.load(f)
 
-        # index columns by name
-        for table_key, table in tables.items():
-            for col in table["columns"]:
-                column_index[col["name"].lower()].append((table_key, col))
+        edges, report = infer_virtual_foreign_keys(
+            tables, stats=stats, top_k=self.virtual_top_k,
+            min_confidence=self.virtual_min_confidence, only=only, columns=columns
+        )
+        if only is not None:
+            # Οι στήλες που ξαναβαθμολογήθηκαν αντικαθιστούν όλες τις παλιές ακμές τους
+            sources = {(edge["from"], edge["column"]) for edge in edges}
 
-        for source_key, table in tables.items():
-            for col in table["columns"]:
-                col_name = col["name"].lower()
+            def kept(edge):
+                return edge["type"] != "virtual_foreign_key" or (edge["from"], edge["column"]) not in sources
 
-                if not col_name.endswith("id"):
-                    continue
+            graph["virtual_edges"] = [e for e in graph["virtual_edges"] if kept(e)]
+            for node in graph["nodes"].values():
+                node["outgoing_edges"] = [e for e in node["outgoing_edges"] if kept(e)]
+                node["incoming_edges"] = [e for e in node["incoming_edges"] if kept(e)]
+        for edge in edges:
+            graph["virtual_edges"].append(edge)
+            graph["nodes"][edge["from"]]["outgoing_edges"].append(edge)
+            graph["nodes"][edge["to"]]["incoming_edges"].append(edge)
 
-                if col_name not in column_index:
-                    continue
+        # Στο patch προστίθενται μόνο οι ακμές των πινάκων που άλλαξαν: μετράμε το σύνολο
+        report["kept"] = len(graph["virtual_edges"])
+        report["pruned"] = max(report["naive_candidates"] - report["kept"], 0)
+        graph["metadata"]["virtual_fk_inference"] = report
+        print(f"Virtual FKs: kept {report['kept']}, pruned {report['pruned']} of {report['naive_candidates']} name-match candidates")
+
+    @traced("graph.join_index")
+    def _build_join_index(self, store, old_store=None, affected=None):
+        if old_store is not None and os.path.exists(self.join_index_path):
+            index = JoinPathIndex.load(self.join_index_path, mmap=False).patch(old_store, store, affected)
+        else:
+            index = JoinPathIndex.build(store, max_hops=self.join_max_hops, max_targets=self.join_max_targets,
+                                        min_confidence=self.join_min_confidence)
+        index.save(self.join_index_path)
+
+    def _save(self, graph: dict, affected=None):
+        # affected: πίνακες του patch, ώστε το join index να ενημερωθεί incremental
+        old_store = None
+        if affected is not None and os.path.exists(self.store_path):
+            old_store = GraphStore.load(self.store_path, mmap=False)
+        store = GraphStore.from_graph(graph)
+        store.save(self.store_path)
+        self._build_join_index(store, old_store, affected)
+        if not self.export_json:
+            # Παλιό JSON export δεν ενημερώνεται πια: αφαιρείται για να μη διαβαστεί
+            if os.path.exists(self.graph_file):
+                os.remove(self.graph_file)
+            return
 
-                for target_key, target_col in column_index[col_name]:
-                    if target_key == source_key:
-                        continue
-
-                    edge = {
-                        "type": "virtual_foreign_key",
-                        "from": source_key,
-                        "to": target_key,
-                        "column": col["name"],
-                        "ref_column": target_col["name"],
-                        "confidence": 0.6,
-                        "reason": "Column name match heuristic (*ID)"
-                    }
-
-                    graph["virtual_edges"].append(edge)
-                    graph["nodes"][source_key]["outgoing_edges"].append(edge)
-                    graph["nodes"][target_key]["incoming_edges"].append(edge)
-
-    def _save(self, graph: dict):
         # Custom encoder για safety
         def default(o):
             from datetime import date, datetime
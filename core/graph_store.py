@@ -0,0 +1,344 @@
+# ----------------------------- core/graph_store.py -----------------------------
+import os
+import json
+import shutil
+import hashlib
+import threading
+from collections import OrderedDict, deque
+
+import numpy as np
+
+EDGE_TYPES = ["foreign_key", "virtual_foreign_key"]
+
+# Αρχεία .npy του store (όλα memory-mappable)
+ARRAYS = (
+    "string_offsets", "string_data",
+    "node_schema", "col_ptr", "col_name", "col_type", "col_max_length", "col_nullable",
+    "pk_ptr", "pk_col",
+    "edge_from", "edge_to", "edge_column", "edge_ref_column", "edge_confidence", "edge_type", "edge_reason",
+    "out_ptr", "out_edge", "in_ptr", "in_edge"
+)
+
+
+def store_path_for(db_folder: str, db_name: str) -> str:
+    return os.path.join(db_folder, f"{db_name}_graph")
+
+
+class _Strings:
+    """Interning: κάθε διαφορετικό string αποθηκεύεται μία φορά, οι πίνακες κρατούν int ids."""
+    def __init__(self):
+        self.ids = {}
+        self.values = []
+
+    def __call__(self, value) -> int:
+        value = "" if value is None else str(value)
+        if value not in self.ids:
+            self.ids[value] = len(self.values)
+            self.values.append(value)
+        return self.ids[value]
+
+
+def _csr(keys, n):
+    # ptr[i]:ptr[i+1] = θέσεις στο order των ακμών με keys == i
+    order = np.argsort(keys, kind="stable").astype(np.int32)
+    ptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys, minlength=n), out=ptr[1:])
+    return ptr, order
+
+
+class GraphStore:
+    """
+    Ο graph σε μορφή CSR: κόμβοι με integer ids (σε ταξινομημένη σειρά ονομάτων),
+    ακμές σε NumPy arrays με interned ονόματα στηλών και adjacency indexes
+    out_ptr/out_edge, in_ptr/in_edge. Κάθε ακμή αποθηκεύεται μία φορά.
+
+    Ο φάκελος <db>_graph/ περιέχει ένα .npy ανά array και το meta.json. Το load()
+    τα κάνει memory-map, οπότε φορτώνονται μόνο οι σελίδες που διαβάζονται.
+    to_graph() δίνει πίσω το dict του <db>_graph.json.
+
+    Τα strings αποκωδικοποιούνται μία φορά στο άνοιγμα (ονόματα κόμβων -> ids σε dict)
+    και το get() κρατά τους τελευταίους node_cache_size κόμβους σε LRU. Όπως και με το
+    graph["nodes"] του JSON, οι κόμβοι που επιστρέφει το get() δεν πρέπει να αλλάζουν.
+    """
+    node_cache_size = 4096
+
+    def __init__(self, arrays: dict, meta: dict):
+        self.arrays = arrays
+        self.meta = meta
+        self.node_count = int(meta["node_count"])
+        self.edge_count = int(meta["edge_count"])
+        # Απλά ndarray views πάνω στο mmap: το indexing του np.memmap έχει μεγάλο overhead
+        for name in ARRAYS:
+            setattr(self, name, np.asarray(arrays[name]).view(np.ndarray))
+        data = self.string_data.tobytes()
+        offsets = self.string_offsets.tolist()
+        self._strings = [data[start:end].decode("utf-8") for start, end in zip(offsets, offsets[1:])]
+        # string id == node id για τους κόμβους (βλ. from_graph)
+        self._node_ids = {name: i for i, name in enumerate(self._strings[:self.node_count])}
+        self._nodes = OrderedDict()
+        self._nodes_lock = threading.Lock()
+
+    # ---------------- build / save / load ----------------
+    @classmethod
+    def from_graph(cls, graph: dict) -> "GraphStore":
+        keys = sorted(graph["nodes"])
+        node_ids = {key: i for i, key in enumerate(keys)}
+        strings = _Strings()
+        # Τα ονόματα των κόμβων είναι τα πρώτα strings: string id == node id
+        for key in keys:
+            strings(key)
+
+        node_schema, col_ptr, pk_ptr = [], [0], [0]
+        col_name, col_type, col_max_length, col_nullable, pk_col = [], [], [], [], []
+        for key in keys:
+            node = graph["nodes"][key]
+            node_schema.append(strings(node.get("schema", key.split(".", 1)[0])))
+            for col in node.get("columns", []):
+                col_name.append(strings(col["name"]))
+                col_type.append(strings(col.get("type")))
+                col_max_length.append(-1 if col.get("max_length") is None else int(col["max_length"]))
+                col_nullable.append(-1 if col.get("nullable") is None else int(bool(col["nullable"])))
+            col_ptr.append(len(col_name))
+            pk_col.extend(strings(c) for c in node.get("primary_key", []))
+            pk_ptr.append(len(pk_col))
+
+        edges = graph.get("edges", []) + graph.get("virtual_edges", [])
+        edge_from = np.array([node_ids[e["from"]] for e in edges], dtype=np.int32)
+        edge_to = np.array([node_ids[e["to"]] for e in edges], dtype=np.int32)
+        out_ptr, out_edge = _csr(edge_from, len(keys))
+        in_ptr, in_edge = _csr(edge_to, len(keys))
+
+        edge_column = [strings(e["column"]) for e in edges]
+        edge_ref_column = [strings(e["ref_column"]) for e in edges]
+        edge_reason = [strings(e.get("reason")) for e in edges]
+
+        encoded = [s.encode("utf-8") for s in strings.values]
+        string_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=string_offsets[1:])
+
+        arrays = {
+            "string_offsets": string_offsets,
+            "string_data": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+            "node_schema": np.array(node_schema, dtype=np.int32),
+            "col_ptr": np.array(col_ptr, dtype=np.int64),
+            "col_name": np.array(col_name, dtype=np.int32),
+            "col_type": np.array(col_type, dtype=np.int32),
+            "col_max_length": np.array(col_max_length, dtype=np.int32),
+            "col_nullable": np.array(col_nullable, dtype=np.int8),
+            "pk_ptr": np.array(pk_ptr, dtype=np.int64),
+            "pk_col": np.array(pk_col, dtype=np.int32),
+            "edge_from": edge_from,
+            "edge_to": edge_to,
+            "edge_column": np.array(edge_column, dtype=np.int32),
+            "edge_ref_column": np.array(edge_ref_column, dtype=np.int32),
+            "edge_confidence": np.array([e.get("confidence", 1.0) for e in edges], dtype=np.float32),
+            "edge_type": np.array([EDGE_TYPES.index(e["type"]) for e in edges], dtype=np.int8),
+            "edge_reason": np.array(edge_reason, dtype=np.int32),
+            "out_ptr": out_ptr, "out_edge": out_edge,
+            "in_ptr": in_ptr, "in_edge": in_edge
+        }
+        meta = {
+            "database": graph.get("database"),
+            "metadata": graph.get("metadata", {}),
+            "node_count": len(keys),
+            "edge_count": len(edges),
+            "real_edge_count": len(graph.get("edges", [])),
+            "edge_types": EDGE_TYPES
+        }
+        return cls(arrays, meta)
+
+    def save(self, path: str):
+        h = hashlib.sha256()
+        tmp = path + ".tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        for name in ARRAYS:
+            array = np.ascontiguousarray(self.arrays[name])
+            np.save(os.path.join(tmp, f"{name}.npy"), array)
+            h.update(name.encode("utf-8"))
+            h.update(array.tobytes())
+        # checksum: αλλάζει μαζί με τον graph (βλ. core.fingerprint)
+        meta = dict(self.meta, checksum=h.hexdigest())
+        with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False, default=str)
+
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp, path)
+        self.meta = meta
+        print(f"Graph store saved at: {path}")
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "GraphStore":
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        arrays = {
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r" if mmap else None)
+            for name in ARRAYS
+        }
+        return cls(arrays, meta)
+
+    # ---------------- lookups ----------------
+    def string(self, sid: int) -> str:
+        return self._strings[sid]
+
+    def node_name(self, node_id: int) -> str:
+        return self._strings[node_id]
+
+    def node_id(self, key: str):
+        """Το id του κόμβου (None αν δεν υπάρχει)."""
+        return self._node_ids.get(key)
+
+    def __contains__(self, key) -> bool:
+        return key in self._node_ids
+
+    def __len__(self) -> int:
+        return self.node_count
+
+    def keys(self):
+        return iter(self._strings[:self.node_count])
+
+    def items(self):
+        return ((self.node_name(i), self._node(i)) for i in range(self.node_count))
+
+    def edge(self, edge_id: int) -> dict:
+        strings = self._strings
+        return {
+            "type": EDGE_TYPES[int(self.edge_type[edge_id])],
+            "from": strings[int(self.edge_from[edge_id])],
+            "to": strings[int(self.edge_to[edge_id])],
+            "column": strings[int(self.edge_column[edge_id])],
+            "ref_column": strings[int(self.edge_ref_column[edge_id])],
+            "confidence": round(float(self.edge_confidence[edge_id]), 4),
+            "reason": strings[int(self.edge_reason[edge_id])]
+        }
+
+    def _edges(self, edge_ids) -> list:
+        """Όπως το edge() για πολλές ακμές, με ένα tolist() ανά array."""
+        strings = self._strings
+        return [
+            {"type": EDGE_TYPES[t], "from": strings[a], "to": strings[b], "column": strings[c],
+             "ref_column": strings[r], "confidence": round(confidence, 4), "reason": strings[reason]}
+            for t, a, b, c, r, confidence, reason in zip(
+                self.edge_type.take(edge_ids).tolist(), self.edge_from.take(edge_ids).tolist(),
+                self.edge_to.take(edge_ids).tolist(), self.edge_column.take(edge_ids).tolist(),
+                self.edge_ref_column.take(edge_ids).tolist(), self.edge_confidence.take(edge_ids).tolist(),
+                self.edge_reason.take(edge_ids).tolist())
+        ]
+
+    def _edge_ids(self, node_id: int, direction: str):
+        if direction == "out":
+            return self.out_edge[self.out_ptr[node_id]:self.out_ptr[node_id + 1]]
+        return self.in_edge[self.in_ptr[node_id]:self.in_ptr[node_id + 1]]
+
+    def _node(self, node_id: int) -> dict:
+        strings = self._strings
+        key = strings[node_id]
+        schema = strings[int(self.node_schema[node_id])]
+        start, end = self.col_ptr[node_id:node_id + 2].tolist()
+        columns = []
+        for name, col_type, max_length, nullable in zip(
+            self.col_name[start:end].tolist(), self.col_type[start:end].tolist(),
+            self.col_max_length[start:end].tolist(), self.col_nullable[start:end].tolist()
+        ):
+            columns.append({
+                "name": strings[name],
+                "type": strings[col_type],
+                "max_length": None if max_length < 0 else max_length,
+                "nullable": None if nullable < 0 else bool(nullable)
+            })
+        out_ids = self._edge_ids(node_id, "out")
+        edges = self._edges(np.concatenate((out_ids, self._edge_ids(node_id, "in"))))
+        return {
+            "schema": schema,
+            "table": key[len(schema) + 1:],
+            "columns": columns,
+            "primary_key": [strings[s] for s in self.pk_col[self.pk_ptr[node_id]:self.pk_ptr[node_id + 1]].tolist()],
+            "outgoing_edges": edges[:len(out_ids)],
+            "incoming_edges": edges[len(out_ids):]
+        }
+
+    def get(self, key, default=None):
+        """Ο κόμβος στη μορφή του graph JSON (όπως graph["nodes"].get(key))."""
+        node = self._nodes.get(key)
+        if node is not None:
+            try:
+                self._nodes.move_to_end(key)
+            except KeyError:  # βγήκε από την cache σε άλλο thread στο μεταξύ
+                pass
+            return node
+        node_id = self._node_ids.get(key)
+        if node_id is None:
+            return default
+        node = self._node(node_id)
+        with self._nodes_lock:
+            self._nodes[key] = node
+            if len(self._nodes) > self.node_cache_size:
+                self._nodes.popitem(last=False)
+        return node
+
+    def neighbors(self, key: str, direction: str = "both", min_confidence: float = 0.0):
+        """[(γειτονικός πίνακας, ακμή)] για direction "out", "in" ή "both"."""
+        node_id = self.node_id(key)
+        if node_id is None:
+            return []
+        result = []
+        for d in (("out", "in") if direction == "both" else (direction,)):
+            for e in self._edge_ids(node_id, d):
+                if self.edge_confidence[e] < min_confidence:
+                    continue
+                other = self.edge_to[e] if d == "out" else self.edge_from[e]
+                result.append((self.node_name(int(other)), self.edge(int(e))))
+        return result
+
+    def shortest_join_path(self, source: str, target: str, max_hops: int = 4, min_confidence: float = 0.0):
+        """
+        Το μικρότερο μονοπάτι join (BFS, οι ακμές χωρίς κατεύθυνση) ως λίστα ακμών.
+        [] αν source == target, None αν δεν υπάρχει μονοπάτι μέσα σε max_hops.
+        """
+        start, goal = self.node_id(source), self.node_id(target)
+        if start is None or goal is None:
+            return None
+        if start == goal:
+            return []
+
+        parent = {start: None}
+        queue = deque([(start, 0)])
+        while queue:
+            node, depth = queue.popleft()
+            if depth >= max_hops:
+                continue
+            for d in ("out", "in"):
+                for e in self._edge_ids(node, d):
+                    if self.edge_confidence[e] < min_confidence:
+                        continue
+                    other = int(self.edge_to[e] if d == "out" else self.edge_from[e])
+                    if other in parent:
+                        continue
+                    parent[other] = (node, int(e))
+                    if other == goal:
+                        path = []
+                        while parent[other] is not None:
+                            other, edge_id = parent[other]
+                            path.append(self.edge(edge_id))
+                        return path[::-1]
+                    queue.append((other, depth + 1))
+        return None
+
+    # ---------------- JSON export ----------------
+    def to_graph(self) -> dict:
+        """Το dict του <db>_graph.json (οι ακμές μοιράζονται μεταξύ edges και nodes)."""
+        edges = [self.edge(e) for e in range(self.edge_count)]
+        nodes = {}
+        for node_id in range(self.node_count):
+            node = self._node(node_id)
+            node["outgoing_edges"] = [edges[int(e)] for e in self._edge_ids(node_id, "out")]
+            node["incoming_edges"] = [edges[int(e)] for e in self._edge_ids(node_id, "in")]
+            nodes[self.node_name(node_id)] = node
+        real = int(self.meta.get("real_edge_count", self.edge_count))
+        return {
+            "database": self.meta.get("database"),
+            "nodes": nodes,
+            "edges": edges[:real],
+            "virtual_edges": edges[real:],
+            "metadata": self.meta.get("metadata", {})
+        }
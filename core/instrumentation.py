@@ -0,0 +1,366 @@
+# ----------------------------- core/instrumentation.py -----------------------------
+"""
+Spans και metrics για όλα τα στάδια (schema, graph, stats, chunks, query, LLM).
+
+    with instrumentation.span("stats.table", table="dbo.Orders") as span:
+        span.count("sql_roundtrips")          # αθροίζεται ανά όνομα span
+        span.observe("ttft_ms", 41.2)         # p50/p95 ανά όνομα span
+        span.set(rows=1200)                   # μόνο στη γραμμή του JSON lines
+
+Τα spans φωλιάζουν μέσω contextvars (και μέσα σε asyncio tasks). Όταν το
+instrumentation είναι κλειστό το span() επιστρέφει ένα κοινό no-op αντικείμενο, οπότε
+το κόστος στα hot paths είναι ένας έλεγχος. Ενεργοποιείται και κλείνει με configure()
+την ώρα που τρέχει το πρόγραμμα. Κάθε span που τελειώνει γράφεται ως γραμμή JSON
+(jsonl_path) και μετράει στα metrics (metrics() / prometheus()).
+
+@hot_path(name): με profiling ενεργό η συνάρτηση τρέχει κάτω από cProfile και τα
+αποτελέσματα μαζεύονται ανά όνομα (dump_profiles() -> <name>.pstats, για pstats/snakeviz).
+Τα hot paths είναι κανονικές συναρτήσεις με το ίδιο όνομα, οπότε φαίνονται και σε
+py-spy record/dump πάνω στο process χωρίς καμία αλλαγή.
+"""
+import os
+import json
+import time
+import itertools
+import threading
+import functools
+import contextlib
+import contextvars
+from collections import deque
+
+# Buckets (δευτερόλεπτα) του histogram διάρκειας στο Prometheus export
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0, 120.0)
+
+
+def percentile(values, q):
+    """Όπως το numpy.percentile (γραμμική παρεμβολή), χωρίς numpy: το main.py το εισάγει στο startup."""
+    ordered = sorted(values)
+    pos = (len(ordered) - 1) * q / 100
+    low = int(pos)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (pos - low)
+
+
+_current = contextvars.ContextVar("instrumentation_span", default=None)
+_ids = itertools.count(1)
+
+
+class Span:
+    __slots__ = ("owner", "name", "span_id", "trace_id", "parent_id", "attrs", "counters",
+                 "observations", "started", "wall_started", "duration", "_token")
+
+    def __init__(self, owner, name, parent, attrs):
+        self.owner = owner
+        self.name = name
+        self.span_id = next(_ids)
+        self.trace_id = parent.trace_id if parent is not None else self.span_id
+        self.parent_id = parent.span_id if parent is not None else None
+        self.attrs = attrs
+        self.counters = {}
+        self.observations = {}
+        self.wall_started = time.time()
+        self.started = time.perf_counter()
+        self.duration = None
+        self._token = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe(self, name, value):
+        self.observations[name] = value
+
+    def end(self):
+        if self.duration is None:
+            self.duration = time.perf_counter() - self.started
+            self.owner._finish(self)
+
+    def __enter__(self):
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _current.reset(self._token)
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        self.end()
+        return False
+
+
+class _NoopSpan:
+    """Ό,τι επιστρέφει το span() όταν το instrumentation είναι κλειστό."""
+    __slots__ = ()
+
+    def set(self, **attrs):
+        pass
+
+    def count(self, name, n=1):
+        pass
+
+    def observe(self, name, value):
+        pass
+
+    def end(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Instrumentation:
+    """
+    enabled: αν καταγράφονται spans. jsonl_path: αρχείο όπου γράφεται μία γραμμή ανά span
+    (None = μόνο metrics στη μνήμη). profiling: cProfile στα @hot_path.
+    window: πόσες τελευταίες τιμές κρατούνται ανά όνομα για τα p50/p95.
+    """
+    def __init__(self, enabled: bool = False, jsonl_path: str = None, profiling: bool = False, window: int = 2048):
+        self.enabled = False
+        self.profiling = False
+        self.window = window
+        self._lock = threading.Lock()
+        self._jsonl = None
+        self._jsonl_path = None
+        self._metrics = {}
+        self._profiles = {}
+        self._profiler_busy = threading.Lock()
+        self.configure(enabled=enabled, jsonl_path=jsonl_path, profiling=profiling)
+
+    def configure(self, enabled: bool = None, jsonl_path=..., profiling: bool = None):
+        """Αλλαγή ρυθμίσεων ενώ τρέχει το πρόγραμμα· ό,τι είναι None/... μένει ως έχει."""
+        with self._lock:
+            if jsonl_path is not ... and jsonl_path != self._jsonl_path:
+                if self._jsonl is not None:
+                    self._jsonl.close()
+                    self._jsonl = None
+                self._jsonl_path = jsonl_path
+                if jsonl_path:
+                    os.makedirs(os.path.dirname(os.path.abspath(jsonl_path)), exist_ok=True)
+                    self._jsonl = open(jsonl_path, "a", encoding="utf-8", buffering=1)
+            if enabled is not None:
+                self.enabled = bool(enabled)
+            if profiling is not None:
+                self.profiling = bool(profiling)
+
+    def status(self) -> dict:
+        return {"enabled": self.enabled, "profiling": self.profiling, "jsonl_path": self._jsonl_path}
+
+    # ---------------------------------------------------------------- spans
+    def span(self, name: str, parent=None, **attrs):
+        """Context manager· parent: ρητός γονέας (π.χ. span που κρατά ένας generator), αλλιώς το τρέχον."""
+        if not self.enabled:
+            return NOOP_SPAN
+        if parent is None:
+            parent = _current.get()
+        elif parent is NOOP_SPAN:
+            parent = None
+        return Span(self, name, parent, attrs)
+
+    def start_span(self, name: str, parent=None, **attrs):
+        """Όπως το span() αλλά χωρίς να γίνει τρέχον: για generators, τελειώνει με end()."""
+        return self.span(name, parent=parent, **attrs)
+
+    @contextlib.contextmanager
+    def activate(self, span):
+        """Κάνει το span τρέχον χωρίς να το τελειώσει (μέσα σε generator, χωρίς yield μέσα στο block)."""
+        if span is NOOP_SPAN or not self.enabled:
+            yield span
+            return
+        token = _current.set(span)
+        try:
+            yield span
+        finally:
+            _current.reset(token)
+
+    def current(self):
+        span = _current.get()
+        return span if span is not None and self.enabled else NOOP_SPAN
+
+    def count(self, name, n=1):
+        """Μετρητής στο τρέχον span (π.χ. sql_roundtrips από βαθιά μέσα στον profiler)."""
+        if self.enabled:
+            span = _current.get()
+            if span is not None:
+                span.count(name, n)
+
+    def _finish(self, span: Span):
+        with self._lock:
+            metric = self._metrics.get(span.name)
+            if metric is None:
+                metric = self._metrics[span.name] = {
+                    "count": 0, "sum": 0.0, "buckets": [0] * len(DURATION_BUCKETS),
+                    "recent": deque(maxlen=self.window), "counters": {}, "observations": {}
+                }
+            metric["count"] += 1
+            metric["sum"] += span.duration
+            metric["recent"].append(span.duration)
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if span.duration <= bound:
+                    metric["buckets"][i] += 1
+            for name, value in span.counters.items():
+                metric["counters"][name] = metric["counters"].get(name, 0) + value
+            for name, value in span.observations.items():
+                metric["observations"].setdefault(name, deque(maxlen=self.window)).append(value)
+
+            if self._jsonl is not None:
+                record = {
+                    "ts": round(span.wall_started, 6), "trace": span.trace_id, "span": span.span_id,
+                    "parent": span.parent_id, "name": span.name, "duration_ms": round(span.duration * 1000, 3),
+                    **span.attrs, **span.counters, **span.observations
+                }
+                self._jsonl.write(json.dumps(record, default=str) + "\n")
+
+    # -------------------------------------------------------------- metrics
+    def metrics(self) -> dict:
+        """{name: {count, total_s, p50_ms, p95_ms, <counter>, <observation>_p50, ...}}"""
+        with self._lock:
+            snapshot = {name: (m["count"], m["sum"], list(m["recent"]), dict(m["counters"]),
+                               {k: list(v) for k, v in m["observations"].items()})
+                        for name, m in self._metrics.items()}
+        result = {}
+        for name, (count, total, recent, counters, observations) in sorted(snapshot.items()):
+            entry = {"count": count, "total_s": round(total, 4),
+                     "p50_ms": round(percentile(recent, 50) * 1000, 3),
+                     "p95_ms": round(percentile(recent, 95) * 1000, 3)}
+            entry.update(counters)
+            for key, values in observations.items():
+                entry[f"{key}_p50"] = round(percentile(values, 50), 3)
+                entry[f"{key}_p95"] = round(percentile(values, 95), 3)
+            result[name] = entry
+        return result
+
+    def prometheus(self, prefix: str = "aidb") -> str:
+        """Τα metrics σε Prometheus text format (histogram διάρκειας, counters, summaries)."""
+        with self._lock:
+            snapshot = {name: (m["count"], m["sum"], list(m["buckets"]), dict(m["counters"]),
+                               {k: list(v) for k, v in m["observations"].items()})
+                        for name, m in self._metrics.items()}
+        lines = [f"# HELP {prefix}_span_duration_seconds Duration of instrumented spans",
+                 f"# TYPE {prefix}_span_duration_seconds histogram"]
+        counter_lines, summary_lines = {}, {}
+        for name, (count, total, buckets, counters, observations) in sorted(snapshot.items()):
+            label = f'span="{name}"'
+            for bound, value in zip(DURATION_BUCKETS, buckets):
+                lines.append(f'{prefix}_span_duration_seconds_bucket{{{label},le="{bound}"}} {value}')
+            lines.append(f'{prefix}_span_duration_seconds_bucket{{{label},le="+Inf"}} {count}')
+            lines.append(f"{prefix}_span_duration_seconds_sum{{{label}}} {total:.6f}")
+            lines.append(f"{prefix}_span_duration_seconds_count{{{label}}} {count}")
+            for key, value in sorted(counters.items()):
+                counter_lines.setdefault(f"{prefix}_{key}_total", []).append(f"{{{label}}} {value}")
+            for key, values in sorted(observations.items()):
+                metric = f"{prefix}_{key}"
+                for q in (0.5, 0.95):
+                    summary_lines.setdefault(metric, []).append(
+                        f'{{{label},quantile="{q}"}} {percentile(values, q * 100):.6g}')
+                summary_lines[metric].append(f"_count{{{label}}} {len(values)}")
+        for metric, samples in sorted(counter_lines.items()):
+            lines.append(f"# TYPE {metric} counter")
+            lines.extend(f"{metric}{sample}" for sample in samples)
+        for metric, samples in sorted(summary_lines.items()):
+            lines.append(f"# TYPE {metric} summary")
+            lines.extend(f"{metric}{sample}" for sample in samples)
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._metrics.clear()
+            self._profiles.clear()
+
+    # ------------------------------------------------------------ profiling
+    def _profiled(self, name, fn, args, kwargs):
+        # Ένας profiler τη φορά (το cProfile δεν φωλιάζει): τα υπόλοιπα τρέχουν χωρίς profile
+        if not self._profiler_busy.acquire(blocking=False):
+            return fn(*args, **kwargs)
+        import cProfile
+        import pstats
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                profile.disable()
+        finally:
+            self._profiler_busy.release()
+            with self._lock:
+                if name in self._profiles:
+                    self._profiles[name].add(profile)
+                else:
+                    self._profiles[name] = pstats.Stats(profile)
+
+    def profile_report(self, name: str, top: int = 20) -> str:
+        """Οι top συναρτήσεις κατά cumulative time για ένα hot path."""
+        import io
+        with self._lock:
+            stats = self._profiles.get(name)
+            if stats is None:
+                return ""
+            out = io.StringIO()
+            stats.stream = out
+            stats.sort_stats("cumulative").print_stats(top)
+        return out.getvalue()
+
+    def dump_profiles(self, folder: str) -> list:
+        """<folder>/<name>.pstats για κάθε hot path που έτρεξε με profiling."""
+        paths = []
+        with self._lock:
+            if self._profiles:
+                os.makedirs(folder, exist_ok=True)
+            for name, stats in self._profiles.items():
+                path = os.path.join(folder, f"{name}.pstats")
+                stats.dump_stats(path)
+                paths.append(path)
+        return paths
+
+    def close(self):
+        self.configure(jsonl_path=None)
+
+
+# Ένα instrumentation ανά process, όπως το logging: τα modules το εισάγουν απευθείας
+instrumentation = Instrumentation()
+
+
+def traced(name: str):
+    """Decorator: όλη η συνάρτηση σε ένα span (attributes με instrumentation.current().set(...))."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not instrumentation.enabled:
+                return fn(*args, **kwargs)
+            with instrumentation.span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def hot_path(name: str):
+    """Decorator για hot paths: cProfile μόνο όταν instrumentation.profiling είναι ενεργό."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not instrumentation.profiling:
+                return fn(*args, **kwargs)
+            return instrumentation._profiled(name, fn, args, kwargs)
+        return wrapper
+    return decorator
+
+
+def configure_from_env(folder: str = None):
+    """
+    INSTRUMENTATION=on|off, INSTRUMENTATION_LOG=<path> (προεπιλογή <folder>/spans.jsonl όταν
+    είναι ενεργό), INSTRUMENTATION_PROFILE=on|off.
+    """
+    enabled = os.getenv("INSTRUMENTATION", "off").lower() in {"on", "1", "true", "yes"}
+    profiling = os.getenv("INSTRUMENTATION_PROFILE", "off").lower() in {"on", "1", "true", "yes"}
+    jsonl_path = os.getenv("INSTRUMENTATION_LOG") or None
+    if enabled and jsonl_path is None and folder is not None:
+        jsonl_path = os.path.join(folder, "spans.jsonl")
+    instrumentation.configure(enabled=enabled, jsonl_path=jsonl_path if enabled else None, profiling=profiling)
+    return instrumentation
@@ -0,0 +1,230 @@
+# ----------------------------- core/join_index.py -----------------------------
+import os
+import json
+import math
+import heapq
+import shutil
+
+import numpy as np
+
+from core.graph_store import GraphStore
+
+ARRAYS = ("src_ptr", "dst", "prev", "confidence", "hops")
+
+
+def join_index_path_for(db_folder: str, db_name: str) -> str:
+    return os.path.join(db_folder, f"{db_name}_join_paths")
+
+
+def _adjacency(store: GraphStore):
+    """adj[u] = [(v, confidence)] χωρίς κατεύθυνση, με την καλύτερη ακμή ανά ζεύγος."""
+    best = {}
+    for u, v, conf in zip(store.edge_from.tolist(), store.edge_to.tolist(), store.edge_confidence.tolist()):
+        if u == v or conf <= 0:
+            continue
+        pair = (u, v) if u < v else (v, u)
+        if conf > best.get(pair, 0.0):
+            best[pair] = conf
+    adj = [[] for _ in range(store.node_count)]
+    for (u, v), conf in best.items():
+        adj[u].append((v, conf))
+        adj[v].append((u, conf))
+    return adj
+
+
+def _reachable(adj, starts, max_hops):
+    # Κόμβοι σε απόσταση <= max_hops από κάποιον από τους starts
+    seen = set(starts)
+    frontier = list(starts)
+    for _ in range(max_hops):
+        frontier = [v for u in frontier for v, _ in adj[u] if v not in seen and not seen.add(v)]
+    return seen
+
+
+class JoinPathIndex:
+    """
+    Προϋπολογισμένα μονοπάτια join: για κάθε πίνακα οι max_targets πιο "σίγουροι"
+    πίνακες σε απόσταση έως max_hops, με κόστος ακμής -log(confidence) πάνω στις FK
+    και virtual FK ακμές (χωρίς κατεύθυνση) και ελάχιστο confidence μονοπατιού
+    min_confidence.
+
+    Οι γραμμές είναι ταξινομημένες ανά (src, dst) με src_ptr σε μορφή CSR, οπότε το
+    lookup είναι ένα slice + αναζήτηση σε το πολύ max_targets τιμές. Κάθε γραμμή
+    κρατά τον προηγούμενο κόμβο του μονοπατιού: το path() το ξαναχτίζει προς τα πίσω
+    με τις ακμές του GraphStore. Αποθηκεύεται στο <db>_join_paths/ (memory-mapped).
+    """
+    def __init__(self, arrays: dict, meta: dict):
+        self.meta = meta
+        self.max_hops = int(meta["max_hops"])
+        self.max_targets = int(meta["max_targets"])
+        self.min_confidence = float(meta["min_confidence"])
+        for name in ARRAYS:
+            setattr(self, name, np.asarray(arrays[name]).view(np.ndarray))
+
+    @property
+    def size(self) -> int:
+        return len(self.dst)
+
+    # ---------------- build ----------------
+    @staticmethod
+    def _paths_from(adj, source, max_hops, max_targets, min_confidence):
+        """[(dst, prev, confidence, hops)] των max_targets καλύτερων προορισμών."""
+        max_cost = -math.log(min_confidence) if min_confidence > 0 else math.inf
+        settled = {source}
+        best = {source: 0.0}
+        heap = [(0.0, 0, source, -1)]
+        rows = []
+        while heap and len(rows) < max_targets:
+            cost, hops, node, prev = heapq.heappop(heap)
+            if node != source:
+                if node in settled:
+                    continue
+                settled.add(node)
+                rows.append((node, prev, math.exp(-cost), hops))
+            if hops >= max_hops:
+                continue
+            for other, conf in adj[node]:
+                new_cost = cost - math.log(conf)
+                if other in settled or new_cost > max_cost or new_cost >= best.get(other, math.inf):
+                    continue
+                best[other] = new_cost
+                heapq.heappush(heap, (new_cost, hops + 1, other, node))
+        return rows
+
+    @classmethod
+    def _from_rows(cls, n, rows_by_source, meta):
+        src_ptr = np.zeros(n + 1, dtype=np.int64)
+        dst, prev, confidence, hops = [], [], [], []
+        for source in range(n):
+            for row in sorted(rows_by_source.get(source, [])):
+                dst.append(row[0])
+                prev.append(row[1])
+                confidence.append(row[2])
+                hops.append(row[3])
+            src_ptr[source + 1] = len(dst)
+        arrays = {
+            "src_ptr": src_ptr,
+            "dst": np.array(dst, dtype=np.int32),
+            "prev": np.array(prev, dtype=np.int32),
+            "confidence": np.array(confidence, dtype=np.float32),
+            "hops": np.array(hops, dtype=np.int8)
+        }
+        return cls(arrays, dict(meta, node_count=n, size=len(dst)))
+
+    @classmethod
+    def build(cls, store: GraphStore, max_hops: int = 3, max_targets: int = 64, min_confidence: float = 0.1):
+        adj = _adjacency(store)
+        rows = {
+            source: cls._paths_from(adj, source, max_hops, max_targets, min_confidence)
+            for source in range(store.node_count)
+        }
+        meta = {"max_hops": max_hops, "max_targets": max_targets, "min_confidence": min_confidence}
+        return cls._from_rows(store.node_count, rows, meta)
+
+    def patch(self, old_store: GraphStore, store: GraphStore, affected_keys):
+        """
+        Νέο index για τον store μετά από incremental refresh. Ξαναϋπολογίζονται μόνο οι
+        πηγές σε απόσταση <= max_hops από πίνακα που άλλαξε (στον νέο graph) ή που είχαν
+        τέτοιον πίνακα στο παλιό index. Οι υπόλοιπες γραμμές μεταφέρονται στα νέα ids.
+        """
+        old_to_new = np.array([
+            -1 if (i := store.node_id(old_store.node_name(n))) is None else i
+            for n in range(old_store.node_count)
+        ] + [-1], dtype=np.int64)  # το -1 του prev αντιστοιχίζεται στο τελευταίο στοιχείο
+
+        affected_old = [i for i in (old_store.node_id(k) for k in affected_keys) if i is not None]
+        affected_new = [i for i in (store.node_id(k) for k in affected_keys) if i is not None]
+
+        adj = _adjacency(store)
+        recompute = _reachable(adj, affected_new, self.max_hops)
+        sources = np.repeat(np.arange(len(self.src_ptr) - 1), np.diff(self.src_ptr))
+        hit = np.isin(self.dst, affected_old)
+        recompute.update(int(s) for s in old_to_new[np.unique(sources[hit])] if s >= 0)
+
+        rows = {}
+        new_src = old_to_new[sources]
+        keep = (new_src >= 0) & ~np.isin(new_src, list(recompute))
+        for s, d, p, c, h in zip(new_src[keep].tolist(), old_to_new[self.dst[keep]].tolist(),
+                                 old_to_new[self.prev[keep]].tolist(), self.confidence[keep].tolist(),
+                                 self.hops[keep].tolist()):
+            rows.setdefault(s, []).append((d, p, c, h))
+        for source in recompute:
+            rows[source] = self._paths_from(adj, source, self.max_hops, self.max_targets, self.min_confidence)
+
+        meta = {"max_hops": self.max_hops, "max_targets": self.max_targets, "min_confidence": self.min_confidence}
+        print(f"Join paths: recomputed {len(recompute)} of {store.node_count} sources")
+        return self._from_rows(store.node_count, rows, meta)
+
+    # ---------------- save / load ----------------
+    def save(self, path: str):
+        tmp = path + ".tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        for name in ARRAYS:
+            np.save(os.path.join(tmp, f"{name}.npy"), getattr(self, name))
+        with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(self.meta, f)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp, path)
+        print(f"Join path index ({self.size} paths) saved at: {path}")
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "JoinPathIndex":
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r" if mmap else None) for name in ARRAYS}
+        return cls(arrays, meta)
+
+    # ---------------- lookups ----------------
+    def _row(self, source: int, target: int):
+        start, end = self.src_ptr[source:source + 2].tolist()
+        i = start + int(np.searchsorted(self.dst[start:end], target))
+        return i if i < end and self.dst[i] == target else None
+
+    def lookup(self, source: int, target: int):
+        """(confidence, hops) του μονοπατιού source -> target (node ids) ή None."""
+        i = self._row(source, target)
+        return None if i is None else (float(self.confidence[i]), int(self.hops[i]))
+
+    def path(self, store: GraphStore, source: str, target: str):
+        """
+        Οι ακμές του μονοπατιού από source σε target, ή None αν δεν είναι στο index.
+        Το μονοπάτι είναι συμμετρικό: αν λείπει το (source, target) δοκιμάζεται το αντίστροφο.
+        """
+        s, t = store.node_id(source), store.node_id(target)
+        if s is None or t is None:
+            return None
+        if s == t:
+            return []
+        if self._row(s, t) is None:
+            reverse = self._row(t, s) is not None and self._walk(store, t, s)
+            return reverse[::-1] if reverse else None
+        return self._walk(store, s, t)
+
+    def _walk(self, store, s, t):
+        edges = []
+        node = t
+        while node != s:
+            i = self._row(s, node)
+            if i is None:
+                return None
+            prev = int(self.prev[i])
+            edges.append(self._best_edge(store, prev, node))
+            node = prev
+        return edges[::-1]
+
+    @staticmethod
+    def _best_edge(store, u, v):
+        # Η ακμή u - v με το μεγαλύτερο confidence (όπως στο _adjacency)
+        candidates = [e for e in store.out_edge[store.out_ptr[u]:store.out_ptr[u + 1]].tolist() if store.edge_to[e] == v]
+        candidates += [e for e in store.in_edge[store.in_ptr[u]:store.in_ptr[u + 1]].tolist() if store.edge_from[e] == v]
+        return store.edge(max(candidates, key=lambda e: store.edge_confidence[e]))
+
+
+def join_hint(source: str, edges) -> dict:
+    """{"join_path": "A -> B -> C", "on": ["A.x = B.y", ...]} για το prompt context."""
+    tables, on = [source], []
+    for edge in edges:
+        on.append(f"{edge['from']}.{edge['column']} = {edge['to']}.{edge['ref_column']}")
+        tables.append(edge["to"] if edge["from"] == tables[-1] else edge["from"])
+    return {"join_path": " -> ".join(tables), "on": on}
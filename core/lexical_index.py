@@ -0,0 +1,192 @@
+# ----------------------------- core/lexical_index.py -----------------------------
+import os
+import re
+import json
+import math
+import shutil
+from collections import Counter
+
+import numpy as np
+
+ARRAYS = ("term_ptr", "docs", "tf", "doc_len", "doc_table")
+# Πρόθεμα των όρων για ολόκληρα identifiers ("=orderdate", "=sales.customers"), ώστε να
+# ξεχωρίζουν από τα sub-words ("order", "date")
+EXACT = "="
+
+_WORD = re.compile(r"[A-Za-z_][A-Za-z0-9_]*(?:\.[A-Za-z_][A-Za-z0-9_]*)*|\d+")
+_SUBWORD = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+# Λέξη της ερώτησης που μοιάζει με identifier: schema.table, snake_case, ψηφία ή camelCase
+_IDENTIFIER = re.compile(r"^\D.*(?:[._\d]|[^.][A-Z])|^_")
+
+
+def lexical_index_path_for(db_folder: str) -> str:
+    return os.path.join(db_folder, "lexical_index")
+
+
+def _stem(word: str) -> str:
+    # Μόνο ο πληθυντικός: "Customers" ταιριάζει με "Customer", "Categories" με "Category"
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def identifier_terms(identifier: str, exact: bool = True):
+    """
+    Όροι ενός identifier: ολόκληρος ("=sales.customers" και "=customers" για schema.table)
+    και τα sub-words του από camelCase / snake_case ("sales", "customer").
+    """
+    name = identifier.lower()
+    terms = []
+    if exact:
+        terms.append(EXACT + name)
+        if "." in name:
+            terms.append(EXACT + name.rsplit(".", 1)[1])
+    for part in re.split(r"[._]", identifier):
+        terms.extend(_stem(word.lower()) for word in _SUBWORD.findall(part))
+    return terms
+
+
+def query_terms(text: str):
+    """
+    Οι όροι μιας ερώτησης: sub-words κάθε λέξης, και ολόκληρη μόνο όταν μοιάζει με
+    identifier ("OrderDate", "Sales.Customers", όχι "orders").
+    """
+    return [term for word in _WORD.findall(text)
+            for term in identifier_terms(word, exact=bool(_IDENTIFIER.search(word)))]
+
+
+def chunk_terms(chunk):
+    """Όροι ενός chunk: πίνακες και στήλες των entries του."""
+    terms = []
+    for entry in chunk:
+        if entry.get("table"):
+            terms.extend(identifier_terms(entry["table"]))
+        for column in entry.get("columns", []):
+            terms.extend(identifier_terms(column))
+    return terms
+
+
+class LexicalIndex:
+    """
+    BM25 inverted index πάνω στα identifiers των chunks: ονόματα πινάκων και στηλών,
+    ολόκληρα και σπασμένα σε sub-words. Το doc i είναι η γραμμή i του chunk store.
+
+    Οι postings είναι σε μορφή CSR (term_ptr -> docs, tf), το doc_table δίνει τον πίνακα
+    κάθε doc (-1 για chunks με πολλούς πίνακες) και το meta.json το λεξιλόγιο και τα
+    ονόματα των πινάκων. Αποθηκεύεται στο lexical_index/ (memory-mapped).
+    """
+    def __init__(self, arrays: dict, meta: dict):
+        self.meta = meta
+        self.k1 = float(meta["k1"])
+        self.b = float(meta["b"])
+        self.avg_len = float(meta["avg_len"]) or 1.0
+        self.tables = meta["tables"]
+        self.term_ids = {term: i for i, term in enumerate(meta["terms"])}
+        for name in ARRAYS:
+            setattr(self, name, np.asarray(arrays[name]).view(np.ndarray))
+
+    @property
+    def doc_count(self) -> int:
+        return len(self.doc_len)
+
+    # ---------------- build ----------------
+    @classmethod
+    def build(cls, chunks, k1: float = 1.2, b: float = 0.75) -> "LexicalIndex":
+        """chunks: όλα τα chunks με τη σειρά του chunk store."""
+        tables, table_ids = [], {}
+        postings = {}
+        doc_len, doc_table = [], []
+        for doc, chunk in enumerate(chunks):
+            counts = Counter(chunk_terms(chunk))
+            for term, count in counts.items():
+                postings.setdefault(term, []).append((doc, count))
+            doc_len.append(sum(counts.values()))
+            keys = {entry.get("table") for entry in chunk}
+            if len(keys) == 1 and None not in keys:
+                key = keys.pop()
+                if key not in table_ids:
+                    table_ids[key] = len(tables)
+                    tables.append(key)
+                doc_table.append(table_ids[key])
+            else:
+                doc_table.append(-1)
+
+        terms = sorted(postings)
+        term_ptr = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum([len(postings[t]) for t in terms], out=term_ptr[1:])
+        docs = [doc for t in terms for doc, _ in postings[t]]
+        tf = [count for t in terms for _, count in postings[t]]
+        arrays = {
+            "term_ptr": term_ptr,
+            "docs": np.array(docs, dtype=np.int32),
+            "tf": np.array(tf, dtype=np.float32),
+            "doc_len": np.array(doc_len, dtype=np.float32),
+            "doc_table": np.array(doc_table, dtype=np.int32)
+        }
+        meta = {"k1": k1, "b": b, "avg_len": float(np.mean(doc_len)) if doc_len else 0.0,
+                "terms": terms, "tables": tables}
+        return cls(arrays, meta)
+
+    # ---------------- save / load ----------------
+    def save(self, path: str):
+        tmp = path + ".tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        for name in ARRAYS:
+            np.save(os.path.join(tmp, f"{name}.npy"), getattr(self, name))
+        with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(self.meta, f)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp, path)
+        print(f"Lexical index ({len(self.term_ids)} terms, {self.doc_count} chunks) saved at: {path}")
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "LexicalIndex":
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r" if mmap else None) for name in ARRAYS}
+        return cls(arrays, meta)
+
+    # ---------------- search ----------------
+    def table_of(self, doc: int):
+        """Ο πίνακας του doc, None για chunk με πολλούς πίνακες."""
+        i = int(self.doc_table[doc])
+        return self.tables[i] if i >= 0 else None
+
+    def search(self, text: str, k: int, max_tables: int = 3, docs=()):
+        """
+        (hits, exact): hits [(bm25 / max bm25, doc)] για τους k καλύτερους και για όσα από
+        τα docs ταίριαξαν. exact οι πίνακες που δείχνουν τα ολόκληρα identifiers της
+        ερώτησης. Identifiers σε περισσότερους από max_tables πίνακες (π.χ. μια κοινή
+        στήλη ModifiedDate) ή σε chunks με πολλούς πίνακες δεν μετράνε.
+        """
+        rows, weights, exact = [], [], set()
+        n = self.doc_count
+        for term in set(query_terms(text)):
+            t = self.term_ids.get(term)
+            if t is None:
+                continue
+            start, end = self.term_ptr[t:t + 2].tolist()
+            postings = self.docs[start:end]
+            tf = self.tf[start:end]
+            idf = math.log(1 + (n - (end - start) + 0.5) / ((end - start) + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * self.doc_len[postings] / self.avg_len)
+            rows.append(postings)
+            weights.append(idf * tf * (self.k1 + 1) / (tf + norm))
+            if term.startswith(EXACT):
+                table_ids = np.unique(self.doc_table[postings])
+                if len(table_ids) <= max_tables and table_ids[0] >= 0:
+                    exact.update(self.tables[i] for i in table_ids.tolist())
+        if not rows:
+            return [], set()
+
+        matched, inverse = np.unique(np.concatenate(rows), return_inverse=True)
+        totals = np.bincount(inverse, weights=np.concatenate(weights))
+        picked = np.argsort(-totals, kind="stable")[:k]
+        if len(docs):
+            extra = np.flatnonzero(np.isin(matched, docs))
+            picked = np.concatenate([picked, extra[~np.isin(extra, picked)]])
+        best = float(totals.max())
+        return [(float(totals[i]) / best, int(matched[i])) for i in picked], exact
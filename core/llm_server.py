@@ -0,0 +1,357 @@
+# ----------------------------- core/llm_server.py -----------------------------
+"""
+Long-lived LLM server: κρατά το μοντέλο φορτωμένο και το KV cache του σταθερού
+prompt prefix, ώστε κάθε ερώτηση να αξιολογεί μόνο το context και την ερώτηση.
+
+    python -m core.llm_server --model models/mistral-7b-instruct-v0.1.Q4_K_M.gguf --port 8765
+    python -m core.llm_server --stub --port 8765      # χωρίς μοντέλο, για tests
+
+Το main.py το χρησιμοποιεί όταν οριστεί LLM_SERVER_URL=http://127.0.0.1:8765 στο .env.
+"""
+import os
+import re
+import json
+import time
+import argparse
+import threading
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from core.prompts import SQL_PROMPT_PREFIX, context_window
+from core.sql_grammar import GrammarMatcher, llm_grammar
+
+DEFAULT_MODEL = os.path.join("models", "mistral-7b-instruct-v0.1.Q4_K_M.gguf")
+
+
+def parallel_slots(llm) -> int:
+    """
+    Πόσες παραγωγές δέχεται ταυτόχρονα το llm. Το llama_cpp.Llama δεν είναι thread-safe
+    και το LLMService (άρα και το RemoteLLM) εξυπηρετεί μία τη φορά: 1 αν το llm δεν
+    δηλώνει parallel_slots.
+    """
+    return max(1, int(getattr(llm, "parallel_slots", 1) or 1))
+
+
+class StubLLM:
+    """
+    Ντετερμινιστικό μοντέλο με το ίδιο interface με το llama_cpp.Llama (llm(prompt, ...)).
+    Tokens = λέξεις. Όπως το llama.cpp, αξιολογεί μόνο τα tokens μετά το κοινό prefix
+    με το προηγούμενο prompt, με κόστος prompt_token_ms ανά token.
+    ramble_tokens: λέξεις που "φλυαρεί" μετά το SQL, όπως κάνουν τα instruct μοντέλα.
+    preamble: κείμενο πριν από το SQL ("Here is the SQL query:").
+    hallucinate_every: κάθε τόση απάντηση ο πίνακας γράφεται με όνομα που δεν υπάρχει.
+
+    Με grammar= (GBNF κείμενο) τα tokens που δεν τηρούν το grammar απορρίπτονται ή
+    κόβονται, όπως θα διάλεγε ο constrained sampler, και η παραγωγή σταματά όταν το
+    grammar ολοκληρωθεί.
+
+    Δεν έχει κοινό state ανάμεσα στις παραγωγές πέρα από το prefix, οπότε δέχεται
+    πολλές ταυτόχρονα (parallel_slots), σαν server με πολλά slots.
+    """
+    parallel_slots = 64
+
+    def __init__(self, prompt_token_ms: float = 0.5, gen_token_ms: float = 2.0, ramble_tokens: int = 0,
+                 n_ctx: int = 2048, preamble: str = "", hallucinate_every: int = 0):
+        self.prompt_token_ms = prompt_token_ms
+        self.gen_token_ms = gen_token_ms
+        self.ramble_tokens = ramble_tokens
+        self.n_ctx = n_ctx
+        self.preamble = preamble
+        self.hallucinate_every = hallucinate_every
+        self.calls = 0
+        self._last_tokens = []
+        self._matchers = {}
+
+    def tokenize(self, text, add_bos: bool = False):
+        if isinstance(text, bytes):
+            text = text.decode("utf-8")
+        return text.split()
+
+    def _answer(self, prompt: str) -> str:
+        # Πρώτη γραμμή πίνακα του context: schema.Table(col, ...)
+        tables = re.findall(r"^([\w.\[\]]+)\(", prompt, re.MULTILINE)
+        if not tables:
+            return "SELECT 1;"
+        table = tables[0]
+        if self.hallucinate_every and self.calls % self.hallucinate_every == 0:
+            table += "_v2"
+        return f"SELECT * FROM {table} t;"
+
+    def _constrain(self, completion, grammar):
+        matcher = self._matchers.get(grammar)
+        if matcher is None:
+            matcher = self._matchers[grammar] = GrammarMatcher(grammar)
+        text, kept = "", []
+        for i, token in enumerate(completion):
+            piece = (" " if text else "") + token
+            if not matcher.viable(text + piece):
+                # Κομμένο token μόνο αν το επόμενο ταιριάζει μετά από αυτό (s0.Orders_v2 -> s0.Orders),
+                # αλλιώς το token απορρίπτεται (πρόλογος, φλυαρία)
+                following = " " + completion[i + 1] if i + 1 < len(completion) else ""
+                while piece and not (matcher.viable(text + piece) and matcher.viable(text + piece + following)):
+                    piece = piece[:-1]
+            if piece.strip():
+                text += piece
+                kept.append(piece.strip())
+            if matcher.complete(text):
+                break
+        return kept
+
+    def __call__(self, prompt: str, max_tokens: int = 1024, stop=None, stream: bool = False, grammar=None, **kwargs):
+        self.calls += 1
+        tokens = self.tokenize(prompt)
+        cached = 0
+        for a, b in zip(tokens, self._last_tokens):
+            if a != b:
+                break
+            cached += 1
+        time.sleep((len(tokens) - cached) * self.prompt_token_ms / 1000)
+        self._last_tokens = tokens
+
+        completion = self.tokenize(self.preamble) + self.tokenize(self._answer(prompt))
+        completion += (["\nThis", "query", "returns", "the", "requested", "rows."] * self.ramble_tokens)[:self.ramble_tokens]
+        if grammar:
+            completion = self._constrain(completion, grammar)
+        completion = completion[:max_tokens]
+        if stream:
+            return self._stream(completion)
+        time.sleep(len(completion) * self.gen_token_ms / 1000)
+        return {
+            "choices": [{"text": " ".join(completion), "finish_reason": "stop"}],
+            "usage": {
+                "prompt_tokens": len(tokens),
+                "completion_tokens": len(completion),
+                "cached_prompt_tokens": cached
+            }
+        }
+
+    def _stream(self, completion):
+        for i, token in enumerate(completion):
+            time.sleep(self.gen_token_ms / 1000)
+            last = i == len(completion) - 1
+            yield {"choices": [{"text": (" " if i else "") + token, "finish_reason": "stop" if last else None}]}
+
+
+class LLMService:
+    """Το μοντέλο + ένα lock: το llama.cpp context δεν είναι thread-safe."""
+    def __init__(self, llm, warm_prefix: str = SQL_PROMPT_PREFIX):
+        self.llm = llm
+        self.lock = threading.Lock()
+        if warm_prefix:
+            self.warm(warm_prefix)
+
+    def warm(self, prefix: str):
+        # Αξιολογεί το prefix μία φορά: με LlamaRAMCache το state του μένει στη μνήμη
+        with self.lock:
+            self.llm(prefix, max_tokens=1)
+
+    def _options(self, grammar):
+        # Το GBNF έρχεται ως κείμενο, το LlamaGrammar του μένει σε cache (core.sql_grammar.llm_grammar)
+        return {"grammar": llm_grammar(self.llm, grammar)} if grammar else {}
+
+    def complete(self, prompt: str, max_tokens: int = 1024, stop=None, grammar: str = None) -> dict:
+        start = time.perf_counter()
+        options = self._options(grammar)
+        with self.lock:
+            waited = time.perf_counter() - start
+            result = self.llm(prompt, max_tokens=max_tokens, stop=stop, **options)
+        result = dict(result)
+        result["timings"] = {
+            "queue_ms": round(waited * 1000, 3),
+            "total_ms": round((time.perf_counter() - start) * 1000, 3)
+        }
+        return result
+
+    def tokenize(self, text: str):
+        # Μόνο το λεξιλόγιο του μοντέλου: χωρίς το lock, ώστε να μην περιμένει την παραγωγή
+        return self.llm.tokenize(text.encode("utf-8"), add_bos=False)
+
+    def stream(self, prompt: str, max_tokens: int = 1024, stop=None, grammar: str = None):
+        # Το grammar μεταγλωττίζεται πριν ξεκινήσει το stream, ώστε ένα λάθος του να γίνει 400
+        return self._stream(prompt, max_tokens, stop, self._options(grammar))
+
+    def _stream(self, prompt, max_tokens, stop, options):
+        # Το lock κρατιέται μέχρι να κλείσει το stream (τέλος ή αποσύνδεση του client)
+        with self.lock:
+            chunks = self.llm(prompt, max_tokens=max_tokens, stop=stop, stream=True, **options)
+            try:
+                yield from chunks
+            finally:
+                close = getattr(chunks, "close", None)
+                if close is not None:
+                    close()
+
+
+def load_llama(model_path: str, n_ctx: int = 2048, n_gpu_layers: int = 10, cache_mb: int = 1024):
+    from llama_cpp import Llama, LlamaRAMCache
+
+    llm = Llama(model_path=model_path, n_ctx=n_ctx, n_gpu_layers=n_gpu_layers, verbose=False)
+    # States ανά prompt prefix: το κοινό prefix φορτώνεται από τη μνήμη αντί να ξαναϋπολογιστεί
+    llm.set_cache(LlamaRAMCache(capacity_bytes=cache_mb * 1024 * 1024))
+    return llm
+
+
+def make_handler(service: LLMService):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _stream(self, chunks):
+            # Ένα JSON chunk ανά γραμμή (NDJSON), το body τελειώνει με το κλείσιμο της σύνδεσης
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.end_headers()
+            try:
+                for chunk in chunks:
+                    self.wfile.write((json.dumps(chunk) + "\n").encode("utf-8"))
+                    self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # ο client σταμάτησε να διαβάζει, π.χ. στο τέλος του SQL statement
+            finally:
+                chunks.close()
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send(200, {"status": "ok", "n_ctx": context_window(service.llm)})
+            else:
+                self._send(404, {"error": "not found"})
+
+        def do_POST(self):
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                self._send(400, {"error": "invalid JSON body"})
+                return
+
+            if self.path == "/v1/completions":
+                if "prompt" not in request:
+                    self._send(400, {"error": "missing prompt"})
+                    return
+                options = {"max_tokens": int(request.get("max_tokens", 1024)), "stop": request.get("stop"),
+                           "grammar": request.get("grammar")}
+                try:
+                    if request.get("stream"):
+                        self._stream(service.stream(request["prompt"], **options))
+                        return
+                    result = service.complete(request["prompt"], **options)
+                except ValueError as exc:
+                    self._send(400, {"error": f"invalid grammar: {exc}"})
+                    return
+                self._send(200, result)
+            elif self.path == "/v1/tokenize":
+                self._send(200, {"tokens": list(service.tokenize(str(request.get("text", ""))))})
+            elif self.path == "/v1/warm":
+                service.warm(request.get("prefix", SQL_PROMPT_PREFIX))
+                self._send(200, {"status": "ok"})
+            else:
+                self._send(404, {"error": "not found"})
+
+        def log_message(self, format, *args):
+            pass  # silent, όπως και το υπόλοιπο pipeline
+
+    return Handler
+
+
+def serve(service: LLMService, host: str = "127.0.0.1", port: int = 8765):
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    return server
+
+
+class RemoteLLM:
+    """
+    Client του LLM server με το ίδιο interface με το llama_cpp.Llama, ώστε το
+    QueryAI να δουλεύει χωρίς αλλαγές: llm(prompt, max_tokens=...) -> dict.
+    """
+    def __init__(self, url: str, timeout: float = 600):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self._n_ctx = None
+
+    def _post(self, path, payload):
+        request = urllib.request.Request(
+            self.url + path,
+            data=json.dumps(payload).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST"
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.loads(response.read())
+
+    def __call__(self, prompt: str, max_tokens: int = 1024, stop=None, stream: bool = False, grammar: str = None,
+                 **kwargs):
+        payload = {"prompt": prompt, "max_tokens": max_tokens, "stop": stop}
+        if grammar:
+            payload["grammar"] = grammar
+        if stream:
+            return self._stream(dict(payload, stream=True))
+        return self._post("/v1/completions", payload)
+
+    def _stream(self, payload):
+        request = urllib.request.Request(
+            self.url + "/v1/completions",
+            data=json.dumps(payload).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST"
+        )
+        # Με close() του generator κλείνει η σύνδεση και ο server σταματά την παραγωγή
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            for line in response:
+                if line.strip():
+                    yield json.loads(line)
+
+    def warm(self, prefix: str = SQL_PROMPT_PREFIX):
+        return self._post("/v1/warm", {"prefix": prefix})
+
+    def tokenize(self, text, add_bos: bool = False):
+        if isinstance(text, bytes):
+            text = text.decode("utf-8")
+        return self._post("/v1/tokenize", {"text": text})["tokens"]
+
+    def n_ctx(self) -> int:
+        if self._n_ctx is None:
+            with urllib.request.urlopen(self.url + "/health", timeout=5) as response:
+                self._n_ctx = int(json.loads(response.read()).get("n_ctx") or 2048)
+        return self._n_ctx
+
+    def health(self) -> bool:
+        try:
+            with urllib.request.urlopen(self.url + "/health", timeout=5) as response:
+                return response.status == 200
+        except OSError:
+            return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Persistent LLM server for QueryAI")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--n-ctx", type=int, default=2048)
+    parser.add_argument("--n-gpu-layers", type=int, default=10)
+    parser.add_argument("--cache-mb", type=int, default=1024, help="Μέγεθος του KV-state cache")
+    parser.add_argument("--stub", action="store_true", help="StubLLM αντί για το GGUF μοντέλο")
+    args = parser.parse_args()
+
+    if args.stub:
+        llm = StubLLM()
+    else:
+        llm = load_llama(args.model, n_ctx=args.n_ctx, n_gpu_layers=args.n_gpu_layers, cache_mb=args.cache_mb)
+
+    server = serve(LLMService(llm), args.host, args.port)
+    print(f"✅ LLM server listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# ----------------------------- core/prompts.py -----------------------------
+# Το σταθερό μέρος του prompt μπαίνει πρώτο, ώστε ο LLM server να κρατά το
+# KV cache του prefix και να αξιολογεί μόνο το context και την ερώτηση.
+
+SQL_PROMPT_PREFIX = """
+You generate SQL queries only.
+
+Rules:
+- Use only the tables that are necessary
+- Use table aliases
+- Do NOT explain anything
+- Output SQL only
+- Schema lines are table(column, ...): PK marks the primary key, col -> table.col a foreign key
+- A "-- value" line gives the column that holds a value named in the question
+"""
+
+# Αν το μοντέλο συνεχίσει με νέα "ερώτηση", η απάντηση έχει ήδη τελειώσει
+SQL_STOP_SEQUENCES = ["User question:", "Database schema context:"]
+
+
+def build_sql_prompt(context_text: str, user_query: str) -> str:
+    return f"""{SQL_PROMPT_PREFIX}
+Database schema context:
+{context_text}
+
+User question:
+{user_query}
+
+SQL:
+"""
+
+
+def estimate_tokens(text: str) -> int:
+    # ~3 χαρακτήρες ανά token για JSON με identifiers (συντηρητικά για το budget)
+    return len(text) // 3 + 1
+
+
+def token_counter(llm):
+    """text -> πλήθος tokens με τον tokenizer του μοντέλου (llama.cpp API), αλλιώς estimate_tokens."""
+    tokenize = getattr(llm, "tokenize", None)
+    if tokenize is None:
+        return estimate_tokens
+    return lambda text: len(tokenize(text.encode("utf-8"), add_bos=False))
+
+
+def context_window(llm, default: int = 2048) -> int:
+    """n_ctx του μοντέλου: Llama.n_ctx(), RemoteLLM.n_ctx() ή το n_ctx του StubLLM."""
+    n_ctx = getattr(llm, "n_ctx", None)
+    if callable(n_ctx):
+        n_ctx = n_ctx()
+    return int(n_ctx or default)
+
+
+def render_table(entry: dict) -> str:
+    """
+    Μία γραμμή ανά πίνακα, σαν συμπτυγμένο DDL:
+    s0.Orders(OrderID PK, CustomerID -> s0.Customer.CustomerID, OrderDate)
+    """
+    primary_key = set(entry.get("primary_key", []))
+    joins = {}
+    for join in entry.get("joins", []):
+        column, target = join.split(" -> ", 1)
+        joins.setdefault(column, []).append(target)
+    columns = []
+    for column in entry.get("columns", []):
+        text = f"{column} PK" if column in primary_key else column
+        for target in joins.get(column, []):
+            text += f" -> {target}"
+        columns.append(text)
+    return f"{entry['table']}({', '.join(columns)})"
+
+
+def render_join_hint(hint: dict) -> str:
+    """-- join A -> B -> C ON A.x = B.y AND B.z = C.w"""
+    return f"-- join {hint['join_path']} ON {' AND '.join(hint['on'])}"
+
+
+def render_value_hint(phrase: str, matches) -> str:
+    """-- value 'germany': Sales.Customers.Country = 'Germany' (έως 3 στήλες, με σειρά συχνότητας)"""
+    targets = []
+    for table, column, _, value in matches:
+        literal = value.replace("'", "''")
+        targets.append(f"{table}.{column} = '{literal}'")
+    return f"-- value '{phrase}': {', '.join(targets)}"
+
+
+def statement_end(text: str):
+    """
+    Θέση αμέσως μετά το ; που κλείνει το πρώτο SQL statement, ή None.
+    Αγνοεί ; μέσα σε strings, [identifiers], "identifiers" και σχόλια.
+    """
+    i, n = 0, len(text)
+    while i < n:
+        ch = text[i]
+        if ch == ";":
+            return i + 1
+        if ch in "'\"[":
+            close = "]" if ch == "[" else ch
+            end = text.find(close, i + 1)
+            if end < 0:
+                return None
+            i = end + 1
+            continue
+        if text.startswith("--", i):
+            end = text.find("\n", i)
+            if end < 0:
+                return None
+            i = end + 1
+            continue
+        if text.startswith("/*", i):
+            end = text.find("*/", i + 2)
+            if end < 0:
+                return None
+            i = end + 2
+            continue
+        i += 1
+    return None
@@ -1,98 +1,642 @@
 # ----------------------------- core/query_ai.py (silent & minimal) -----------------------------
 import os
 import json
+import time
+from collections import OrderedDict
+
 import numpy as np
-from sentence_transformers import SentenceTransformer
-import pickle
+
+from core.prompts import (build_sql_prompt, statement_end, SQL_STOP_SEQUENCES, token_counter, context_window,
+                          render_table, render_join_hint, render_value_hint)
+from core.vector_index import normalize, read_index, load_ids, tune_index, is_exact
+from core.fingerprint import schema_fingerprint
+from core.chunk_store import ChunkStore, chunk_store_path_for
+from core.graph_store import GraphStore, store_path_for
+from core.join_index import JoinPathIndex, join_index_path_for, join_hint
+from core.lexical_index import LexicalIndex, lexical_index_path_for
+from core.value_index import ValueIndex, value_index_path_for
+from core.result_cache import SemanticCache
+from core.schema_loader import iter_schema_file, schema_path_for
+from core.sql_grammar import build_sql_grammar, llm_grammar
+from core.instrumentation import instrumentation, traced, hot_path
 
 class QueryAI:
     """
     Query AI: παίρνει φυσική γλώσσα ερώτημα, κάνει similarity search στα chunks,
     και δημιουργεί SQL query χρησιμοποιώντας το preloaded LLM.
+
+    Οι top_k πιο σχετικοί πίνακες επεκτείνονται κατά expand_hops βήματα στον graph
+    (outgoing/incoming edges) ώστε να μπουν και οι πίνακες του join, και όλα μαζί
+    χωρούν σε context_tokens tokens. Για πίνακες χωρίς άμεση ακμή μπαίνουν έως
+    max_join_hints μονοπάτια join από το <db>_join_paths/ index.
+
+    Το context γράφεται μία γραμμή ανά πίνακα (core.prompts.render_table) και τα tokens
+    μετρώνται με τον tokenizer του LLM: το prompt χωρά πάντα στο n_ctx μαζί με τα
+    max_tokens της απάντησης. Το last_usage κρατά τα tokens της τελευταίας ερώτησης.
+
+    Με quantized ή ANN index ζητούνται top_k * rescore υποψήφιοι, που βαθμολογούνται
+    ξανά με τα embeddings του chunk store: ακριβώς με float32, με ακρίβεια float16 με
+    float16. Ένα int8 chunk store είναι κι αυτό quantized, οπότε τότε δεν γίνεται
+    rescoring και μένουν τα scores του index.
+
+    sql_grammar="context" περιορίζει την παραγωγή με GBNF grammar (core.sql_grammar) σε
+    ένα SELECT πάνω στους πίνακες και τις στήλες του context, "schema" σε όλο το <db>.json.
+
+    Hybrid retrieval: το BM25 του lexical_index/ (ονόματα πινάκων/στηλών και sub-words)
+    μπαίνει στο score με βάρος lexical_weight (0 = μόνο vectors). Αν η ερώτηση γράφει
+    ολόκληρα identifiers που δείχνουν έως top_k πίνακες, το lexical αποτέλεσμα αρκεί και
+    η ερώτηση δεν περνά από το embedding model.
+
+    Τιμές της ερώτησης ("Anna", "Germany") βρίσκονται στο value_index/ (τιμές από τα
+    stats): ο πίνακας της πιο συχνής στήλης κάθε τιμής μπαίνει στο context με τη στήλη
+    του, και μια γραμμή "-- value" δίνει έως max_value_columns στήλες με το literal.
     """
-    def __init__(self, base_path: str, db_name: str, top_k: int = 3, model_name: str = None, llm=None, embed_model="all-MiniLM-L6-v2"):
+    def __init__(self, base_path: str, db_name: str, top_k: int = 3, model_name: str = None, llm=None, embed_model="all-MiniLM-L6-v2",
+                 nprobe: int = 16, ef_search: int = 64, result_cache_path="default", cache_threshold: float = 0.92,
+                 cache_ttl_seconds: float = 7 * 24 * 3600, context_tokens: int = 700, expand_hops: int = 1,
+                 max_columns: int = 40, max_join_hints: int = 3, rescore: int = 4, n_ctx: int = None,
+                 sql_grammar: str = "off", lexical_weight: float = 0.3, max_value_columns: int = 3):
         self.base_path = base_path
         self.db_name = db_name
         self.db_folder = os.path.join(base_path, "databases", db_name)
         self.top_k = top_k
+        self.context_tokens = context_tokens
+        self.expand_hops = expand_hops
+        self.max_columns = max_columns
+        self.max_join_hints = max_join_hints
+        self.rescore = rescore
+        self.lexical_weight = lexical_weight
+        self.max_value_columns = max_value_columns
+        if sql_grammar not in ("off", "context", "schema"):
+            raise ValueError(f"sql_grammar must be off, context or schema, not {sql_grammar!r}")
+        self.grammar_mode = sql_grammar
+        self._schema_grammar = None
         self.llm = llm
-        self.embed_model = SentenceTransformer(embed_model)
+        # embed_model: όνομα μοντέλου ή ήδη φορτωμένο SentenceTransformer (όπως στο MultiJSONChunker)
+        if isinstance(embed_model, str):
+            from sentence_transformers import SentenceTransformer
+            self.embed_model = SentenceTransformer(embed_model)
+        else:
+            self.embed_model = embed_model
 
         if self.llm is None:
-            raise RuntimeError("LLM instance not provided. Pass llm= preloaded Llama object.")
+            raise RuntimeError("LLM instance not provided. Pass llm= preloaded Llama object or RemoteLLM.")
+        self.n_ctx = n_ctx or context_window(llm)
+        self._count = token_counter(llm)
+        self._token_counts = OrderedDict()
+        self.last_usage = None
 
-        # Load chunks & embeddings silently
-        self.chunks_data = {}
-        self.embeddings_data = {}
+        # Chunk store: embeddings και payloads memory-mapped, τα chunks αποκωδικοποιούνται
+        # μόνο για τα αποτελέσματα της αναζήτησης
+        self.chunk_store = None
+        store_dir = chunk_store_path_for(self.db_folder)
+        if os.path.exists(store_dir):
+            self.chunk_store = ChunkStore.load(store_dir)
+            self._check_chunk_store(embed_model)
 
-        for name in ["graph", "schema", "stats"]:
-            chunks_file = os.path.join(self.db_folder, f"{name}_chunks.pkl")
-            embeddings_file = os.path.join(self.db_folder, f"{name}_chunks_embeddings.npy")
+        # BM25 πάνω στα identifiers: ένα doc ανά γραμμή του chunk store
+        self.lexical_index = None
+        lexical_path = lexical_index_path_for(self.db_folder)
+        if self.chunk_store is not None and os.path.exists(lexical_path):
+            lexical_index = LexicalIndex.load(lexical_path)
+            if lexical_index.doc_count == len(self.chunk_store):
+                self.lexical_index = lexical_index
 
-            if os.path.exists(chunks_file) and os.path.exists(embeddings_file):
-                with open(chunks_file, "rb") as f:
-                    self.chunks_data[name] = pickle.load(f)
-                self.embeddings_data[name] = np.load(embeddings_file)
-            else:
-                continue  # skip quietly
+        # Τιμή -> (πίνακας, στήλη) από τα stats
+        self.value_index = None
+        value_path = value_index_path_for(self.db_folder)
+        if os.path.exists(value_path):
+            self.value_index = ValueIndex.load(value_path)
+
+        # Graph για την επέκταση του context στους πίνακες του join: το memory-mapped
+        # store δίνει κόμβους on demand, αλλιώς ολόκληρο το <db>_graph.json
+        self.graph_nodes = {}
+        graph_file = os.path.join(self.db_folder, f"{db_name}_graph.json")
+        store_path = store_path_for(self.db_folder, db_name)
+        self.join_index = None
+        if os.path.exists(store_path):
+            self.graph_nodes = GraphStore.load(store_path)
+            join_path = join_index_path_for(self.db_folder, db_name)
+            if os.path.exists(join_path):
+                self.join_index = JoinPathIndex.load(join_path)
+        elif os.path.exists(graph_file):
+            with open(graph_file, "r", encoding="utf-8") as f:
+                self.graph_nodes = json.load(f).get("nodes", {})
+
+        # FAISS index (memory-mapped) + id -> (source, chunk_idx)
+        self.index = None
+        self.index_ids = []
+        self.index_exact = True
+        index_path = os.path.join(self.db_folder, "faiss_index.idx")
+        if os.path.exists(index_path):
+            index = read_index(index_path)
+            ids = load_ids(index_path) or self._default_ids()
+            store = self.chunk_store
+            if store is not None and index.ntotal == len(ids) and all(i < store.count(n) for n, i in ids):
+                self.index = tune_index(index, nprobe=nprobe, ef_search=ef_search)
+                self.index_ids = ids
+                self.index_exact = is_exact(index)
+                # Rescoring από int8 vectors δεν δίνει ακριβή scores, μόνο άλλο quantization
+                if store.header.get("dtype") == "int8":
+                    self.rescore = 1
+
+        # Cache ερώτηση -> SQL, ακυρώνεται όταν αλλάξει το σχήμα ή ο graph της βάσης
+        if result_cache_path == "default":
+            result_cache_path = os.path.join(base_path, "cache", "results.sqlite")
+        self.result_cache = None
+        if result_cache_path:
+            self.result_cache = SemanticCache(
+                result_cache_path, db_name, schema_fingerprint(self.db_folder, db_name),
+                threshold=cache_threshold, ttl_seconds=cache_ttl_seconds
+            )
+
+    def _default_ids(self):
+        # Index χωρίς ids αρχείο: η σειρά των γραμμών του chunk store (graph, schema, stats)
+        return self.chunk_store.ids() if self.chunk_store is not None else []
+
+    def _check_chunk_store(self, embed_model):
+        header = self.chunk_store.header
+        dim = self.embed_model.get_sentence_embedding_dimension()
+        if header["count"] and header["dim"] != dim:
+            raise ValueError(f"Chunk store has {header['dim']}-d embeddings, embedding model produces {dim}-d")
+        model_name = embed_model if isinstance(embed_model, str) else getattr(embed_model, "model_name", type(embed_model).__name__)
+        if header["model"] != model_name:
+            print(f"⚠️ Chunk store was embedded with {header['model']}, querying with {model_name}")
+        if header["fingerprint"] != schema_fingerprint(self.db_folder, self.db_name):
+            print("⚠️ Chunk store is older than the schema/graph: re-run MultiJSONChunker")
+
+    def _chunk(self, name, chunk_idx):
+        return self.chunk_store.chunk(name, chunk_idx)
+
+    @staticmethod
+    def _minimal(chunk):
+        return [{
+            "table": entry.get("table"),
+            "columns": entry.get("columns", []),
+            "primary_key": entry.get("primary_key", []),
+            "importance_score": entry.get("importance_score", 0)
+        } for entry in chunk]
+
+    @traced("query.embed")
+    def embed_query(self, query: str):
+        return normalize(self.embed_model.encode(query, convert_to_numpy=True))
 
-    def similarity_search(self, query: str):
+    def _search(self, query_vec, k):
+        """[(score, source, chunk_idx)] ταξινομημένα κατά score."""
+        return self.search_batch(query_vec, k)[0]
+
+    @traced("query.search")
+    def search_batch(self, query_vecs, k):
+        """
+        Όπως το _search για πολλές ερωτήσεις (n, dim): μία κλήση index.search για όλες.
+        """
+        query_vecs = np.asarray(query_vecs, dtype=np.float32)
+        query_vecs = query_vecs.reshape(-1, query_vecs.shape[-1])
+        instrumentation.current().set(queries=len(query_vecs), k=k)
+        if self.index is not None:
+            if self.index_exact or self.rescore <= 1:
+                scores, ids = self.index.search(query_vecs, k)
+                return [[(float(score), *self.index_ids[idx]) for score, idx in zip(row_scores, row_ids) if idx >= 0]
+                        for row_scores, row_ids in zip(scores, ids)]
+
+            # Πρώτο πέρασμα στο quantized index, ακριβή scores μόνο για τους υποψήφιους
+            _, ids = self.index.search(query_vecs, k * self.rescore)
+            results = []
+            for query_vec, row_ids in zip(query_vecs, ids):
+                candidates = [self.index_ids[idx] for idx in row_ids if idx >= 0]
+                if not candidates:
+                    results.append([])
+                    continue
+                rows = [self.chunk_store.row(name, i) for name, i in candidates]
+                exact = self.chunk_store.vectors_at(rows) @ query_vec
+                order = np.argsort(-exact)[:k]
+                results.append([(float(exact[j]), *candidates[j]) for j in order])
+            return results
+
+        # Fallback: brute force πάνω στα normalized embeddings του chunk store
+        if self.chunk_store is None or len(self.chunk_store) == 0:
+            return [[] for _ in query_vecs]
+        results = []
+        for query_vec in query_vecs:
+            sims = self.chunk_store.scores(query_vec)
+            top = np.argpartition(-sims, min(k, len(sims)) - 1)[:k]
+            results.append([(float(sims[row]), *self.chunk_store.locate(int(row))) for row in top[np.argsort(-sims[top])]])
+        return results
+
+    @traced("query.lexical")
+    def lexical_search(self, query: str, k: int, also=()):
+        """
+        (hits, decisive): hits [(bm25 / max bm25, source, chunk_idx)] από το lexical index,
+        οι k καλύτεροι και όσα από τα also [(source, chunk_idx)] ταίριαξαν.
+        decisive: τα identifiers της ερώτησης ("OrderDate", "Sales.Customers") δείχνουν
+        1..top_k πίνακες, οπότε τα hits αρκούν χωρίς embedding. Τα chunks αυτών των
+        πινάκων μπαίνουν πρώτα.
+        """
+        if self.lexical_index is None or not self.lexical_weight:
+            return [], False
+        docs = [self.chunk_store.row(name, idx) for name, idx in also]
+        found, exact = self.lexical_index.search(query, k, max_tables=self.top_k, docs=docs)
+        decisive = 0 < len(exact) <= self.top_k
+        if decisive:
+            found.sort(key=lambda hit: self.lexical_index.table_of(hit[1]) not in exact)
+        hits = [(score, *self.chunk_store.locate(doc)) for score, doc in found]
+        instrumentation.current().set(hits=len(hits), decisive=decisive)
+        return hits, decisive
+
+    def fuse(self, query: str, vector_hits, query_vec, k):
         """
-        Top-k chunks με cosine similarity.
+        (1 - lexical_weight) * cosine + lexical_weight * BM25 πάνω στην ένωση των vector
+        hits και των k καλύτερων lexical hits. Όσα βρήκε μόνο το lexical παίρνουν cosine
+        από τον chunk store.
         """
-        query_vec = self.embed_model.encode(query, convert_to_numpy=True)
-        top_chunks = []
+        lexical_hits, _ = self.lexical_search(query, k, [(name, idx) for _, name, idx in vector_hits])
+        if not lexical_hits:
+            return vector_hits
+        dense = {(name, idx): score for score, name, idx in vector_hits}
+        lexical = {(name, idx): score for score, name, idx in lexical_hits}
+        missing = [key for key in lexical if key not in dense]
+        if missing:
+            rows = [self.chunk_store.row(name, idx) for name, idx in missing]
+            sims = self.chunk_store.vectors_at(rows) @ np.asarray(query_vec, dtype=np.float32).reshape(-1)
+            dense.update(zip(missing, sims.tolist()))
+        w = self.lexical_weight
+        fused = [((1 - w) * score + w * lexical.get(key, 0.0), *key) for key, score in dense.items()]
+        return sorted(fused, key=lambda hit: -hit[0])[:k]
+
+    def hybrid_search(self, query: str, k: int, query_vec=None):
+        """
+        (hits, query_vec): lexical + vector hits, ή μόνο τα lexical όταν είναι decisive
+        (τότε query_vec μένει όπως δόθηκε, πιθανώς None).
+        """
+        lexical_hits, decisive = self.lexical_search(query, k)
+        if decisive:
+            return lexical_hits, query_vec
+        if query_vec is None:
+            query_vec = self.embed_query(query)
+        return self.fuse(query, self._search(query_vec, k), query_vec, k), query_vec
+
+    def similarity_search(self, query: str, query_vec=None):
+        """
+        Top-k chunks με hybrid (BM25 + cosine) score.
+        """
+        hits, _ = self.hybrid_search(query, self.top_k, query_vec)
+
+        return [{
+            "source": name,
+            "score": score,
+            "chunk": self._minimal(self._chunk(name, chunk_idx))
+        } for score, name, chunk_idx in hits]
+
+    @traced("query.values")
+    def match_values(self, query: str):
+        """[(φράση, [(table, column, count, τιμή)])]: οι τιμές της ερώτησης που υπάρχουν στη βάση."""
+        if self.value_index is None or not self.max_value_columns:
+            return []
+        matches = self.value_index.lookup(query, self.max_value_columns)
+        instrumentation.current().set(values=len(matches))
+        return matches
 
-        for name, embeddings in self.embeddings_data.items():
-            if len(embeddings) == 0:
+    def count_tokens(self, line: str) -> int:
+        """Tokens μιας γραμμής του context (+1 για την αλλαγή γραμμής), με cache ανά γραμμή."""
+        count = self._token_counts.get(line)
+        if count is None:
+            count = self._count(line) + 1
+            self._token_counts[line] = count
+            if len(self._token_counts) > 4096:
+                self._token_counts.popitem(last=False)
+        return count
+
+    @traced("query.retrieve")
+    @hot_path("query.retrieve")
+    def retrieve_tables(self, query: str, query_vec=None, hits=None, budget: int = None, values=None):
+        """
+        Οι top_k πιο σχετικοί πίνακες + οι πίνακες των τιμών της ερώτησης + οι γείτονές
+        τους στον graph, σε σειρά προτεραιότητας και μέσα σε budget tokens (προεπιλογή
+        context_tokens).
+        hits: το αποτέλεσμα του hybrid_search(query, top_k * 3) αν έχει ήδη γίνει.
+        values: το αποτέλεσμα του match_values(query) αν έχει ήδη γίνει.
+        """
+        if budget is None:
+            budget = self.context_tokens
+        if hits is None:
+            hits, _ = self.hybrid_search(query, self.top_k * 3, query_vec)
+
+        # Κάθε πίνακας έχει chunks σε graph, schema και stats: κρατάμε top_k διαφορετικούς
+        seeds = {}
+        hit_columns = {}
+        for score, name, chunk_idx in hits:
+            for entry in self._chunk(name, chunk_idx):
+                key = entry.get("table")
+                if key not in seeds and len(seeds) >= self.top_k:
+                    continue
+                seeds.setdefault(key, score)
+                hit_columns.setdefault(key, []).extend(entry.get("columns", []))
+
+        # Η πιο συχνή στήλη κάθε τιμής: ο πίνακάς της μπαίνει με το score του καλύτερου hit
+        if values is None:
+            values = self.match_values(query)
+        top_score = max(seeds.values(), default=1.0)
+        for _, matches in values:
+            table, column = matches[0][:2]
+            seeds.setdefault(table, top_score)
+            hit_columns.setdefault(table, []).insert(0, column)
+
+        scores = dict(seeds)
+        frontier = list(seeds)
+        for _ in range(self.expand_hops):
+            next_frontier = []
+            for key in frontier:
+                node = self.graph_nodes.get(key)
+                if node is None:
+                    continue
+                for edge in node["outgoing_edges"] + node["incoming_edges"]:
+                    other = edge["to"] if edge["from"] == key else edge["from"]
+                    score = scores[key] * edge.get("confidence", 1.0) * 0.5
+                    if other not in scores or score > scores[other]:
+                        if other not in seeds:
+                            scores[other] = score
+                            next_frontier.append(other)
+            frontier = next_frontier
+
+        ordered = sorted(scores, key=lambda k: (k not in seeds, -scores[k]))
+        candidates = set(ordered)
+
+        # Greedy με σειρά score: όποιος πίνακας δεν χωρά παραλείπεται, οι επόμενοι δοκιμάζονται
+        packed, used = [], 0
+        for key in ordered:
+            entry = self._table_entry(key, hit_columns.get(key, []), candidates)
+            cost = self.count_tokens(render_table(entry))
+            if used + cost > budget:
                 continue
-            sims = embeddings @ query_vec / (np.linalg.norm(embeddings, axis=1) * np.linalg.norm(query_vec) + 1e-10)
-            top_indices = sims.argsort()[-self.top_k:][::-1]
-
-            for idx in top_indices:
-                chunk = self.chunks_data[name][idx]
-                minimal_chunk = [{
-                    "table": entry.get("table"),
-                    "columns": entry.get("columns", []),
-                    "primary_key": entry.get("primary_key", []),
-                    "importance_score": entry.get("importance_score", 0)
-                } for entry in chunk]
-                top_chunks.append({
-                    "source": name,
-                    "score": float(sims[idx]),
-                    "chunk": minimal_chunk
-                })
-
-        return sorted(top_chunks, key=lambda x: x["score"], reverse=True)[:self.top_k]
+            packed.append(entry)
+            used += cost
+        instrumentation.current().set(candidates=len(ordered), packed=len(packed))
+
+        # Joins μόνο προς πίνακες που χώρεσαν στο context
+        included = {entry["table"] for entry in packed}
+        for entry in packed:
+            if "joins" in entry:
+                entry["joins"] = [j for j in entry["joins"] if j.split(" -> ")[1].rsplit(".", 1)[0] in included]
+                if not entry["joins"]:
+                    del entry["joins"]
+        return packed
+
+    def join_hints(self, keys):
+        """
+        Μονοπάτια join (2+ βήματα) από το index για ζεύγη των keys, με σειρά confidence.
+        """
+        if self.join_index is None or not self.max_join_hints:
+            return []
+        store = self.graph_nodes
+        ids = {key: store.node_id(key) for key in keys}
+        found = []
+        for i, a in enumerate(keys):
+            for b in keys[i + 1:]:
+                if ids[a] is None or ids[b] is None:
+                    continue
+                hit = self.join_index.lookup(ids[a], ids[b]) or self.join_index.lookup(ids[b], ids[a])
+                if hit is not None and hit[1] >= 2:
+                    found.append((hit[0], a, b))
+
+        hints = []
+        for _, a, b in sorted(found, key=lambda f: -f[0])[:self.max_join_hints]:
+            edges = self.join_index.path(store, a, b)
+            if edges:
+                hints.append(join_hint(a, edges))
+        return hints
+
+    def _table_entry(self, key, hit_columns, candidates):
+        node = self.graph_nodes.get(key)
+        if node is None:
+            return {"table": key, "columns": list(dict.fromkeys(hit_columns))}
+
+        primary_key = node.get("primary_key", [])
+        joins, join_columns = [], []
+        for edge in node["outgoing_edges"]:
+            if edge["to"] in candidates and edge["to"] != key:
+                joins.append(f"{edge['column']} -> {edge['to']}.{edge['ref_column']}")
+                join_columns.append(edge["column"])
+        for edge in node["incoming_edges"]:
+            if edge["from"] in candidates:
+                join_columns.append(edge["ref_column"])
+
+        columns = [c["name"] for c in node.get("columns", [])]
+        if len(columns) > self.max_columns:
+            # Φαρδιοί πίνακες: PK, στήλες join, στήλες που ταίριαξαν και μετά με τη σειρά
+            keep = list(dict.fromkeys(primary_key + join_columns + hit_columns + columns))
+            columns = [c for c in columns if c in set(keep[:self.max_columns])]
+
+        entry = {"table": key, "columns": columns, "primary_key": primary_key}
+        if joins:
+            entry["joins"] = list(dict.fromkeys(joins))
+        return entry
 
     def generate_sql(self, user_query: str):
         """
         Παίρνει φυσικό query, βρίσκει top chunks και ζητάει από το LLM να φτιάξει SQL query.
         """
-        top_chunks = self.similarity_search(user_query)
+        return "".join(self.stream_sql(user_query)).strip()
 
-        context_text = ""
-        for c in top_chunks:
-            context_text += f"Source: {c['source']}\n{json.dumps(c['chunk'], indent=2)}\n\n"
+    def stream_sql(self, user_query: str, max_tokens: int = 1024, query_vec=None):
+        """
+        Όπως το generate_sql, αλλά επιστρέφει τα κομμάτια του SQL όπως τα παράγει το LLM.
+        Η παραγωγή σταματά στο ; που κλείνει το statement. query_vec: το embedding της
+        ερώτησης αν υπάρχει ήδη (π.χ. από το routing του DatabaseRegistry).
+        """
+        self.last_usage = None
+        # Generator: το span της ερώτησης γίνεται τρέχον μόνο σε blocks χωρίς yield
+        span = instrumentation.start_span("query", database=self.db_name)
+        try:
+            cache = self.result_cache
+            if cache is not None:
+                with instrumentation.activate(span):
+                    cached = cache.get_exact(user_query)
+                if cached is not None:
+                    span.set(cached="exact")
+                    yield cached
+                    return
+
+            # Decisive lexical hits: ούτε embedding ούτε semantic lookup. Αλλιώς το ίδιο
+            # embedding για το semantic lookup και για το similarity search
+            k = self.top_k * 3
+            with instrumentation.activate(span):
+                hits, decisive = self.lexical_search(user_query, k)
+                cached = None
+                if not decisive:
+                    if query_vec is None:
+                        query_vec = self.embed_query(user_query)
+                    cached = cache.get_similar(user_query, query_vec) if cache is not None else None
+            if cached is not None:
+                span.set(cached="similar")
+                yield cached
+                return
+
+            with instrumentation.activate(span):
+                if not decisive:
+                    hits = self.fuse(user_query, self._search(query_vec, k), query_vec, k)
+                span.set(lexical=decisive)
+                prompt, self.last_usage, grammar = self.build_prompt(user_query, query_vec, hits, max_tokens=max_tokens)
+            text = ""
+            pieces = self.generate(prompt, max_tokens, grammar=grammar, parent=span)
+            try:
+                for piece in pieces:
+                    text += piece
+                    yield piece
+            finally:
+                pieces.close()
+
+            sql_query = text.strip()
+            if cache is not None and sql_query:
+                cache.put(user_query, sql_query, query_vec)
+        finally:
+            span.end()
+
+    @traced("query.prompt")
+    def build_prompt(self, user_query: str, query_vec=None, hits=None, max_tokens: int = 1024):
+        """
+        (prompt, usage, grammar): πίνακες του retrieve_tables, τιμές και join hints μέσα στο budget
+        min(context_tokens, n_ctx - max_tokens - tokens του prompt χωρίς context). grammar: το
+        GBNF για τους πίνακες του prompt (None με sql_grammar="off"), για το generate().
+        """
+        limit = self.n_ctx - max_tokens
+        base_tokens = self._count(build_sql_prompt("", user_query))
+        budget = max(0, min(self.context_tokens, limit - base_tokens))
 
-        prompt = f"""
-You generate SQL queries only.
+        values = self.match_values(user_query)
+        tables = self.retrieve_tables(user_query, query_vec, hits, budget=budget, values=values)
+        lines = [render_table(entry) for entry in tables]
+        used = sum(self.count_tokens(line) for line in lines)
+        included = {entry["table"] for entry in tables}
+        for phrase, matches in values:
+            matches = [m for m in matches if m[0] in included]
+            if not matches:
+                continue
+            line = render_value_hint(phrase, matches)
+            cost = self.count_tokens(line)
+            if used + cost <= budget:
+                lines.append(line)
+                used += cost
+        # Οι πρώτοι top_k πίνακες είναι αυτοί που ταίριαξαν στην αναζήτηση
+        for hint in self.join_hints([entry["table"] for entry in tables[:self.top_k]]):
+            line = render_join_hint(hint)
+            cost = self.count_tokens(line)
+            if used + cost <= budget:
+                lines.append(line)
+                used += cost
+
+        prompt = build_sql_prompt("\n".join(lines), user_query)
+        prompt_tokens = self._count(prompt)
+        # Το άθροισμα ανά γραμμή είναι εκτίμηση: αν το ολόκληρο prompt δεν χωρά, βγαίνουν γραμμές από το τέλος
+        while prompt_tokens > limit and lines:
+            lines.pop()
+            prompt = build_sql_prompt("\n".join(lines), user_query)
+            prompt_tokens = self._count(prompt)
 
-Database schema context:
-{context_text}
+        grammar = None
+        if self.grammar_mode != "off":
+            # Οι πίνακες του prompt: οι γραμμές πινάκων είναι πρώτες, μετά τα join hints με τους ενδιάμεσους πίνακες
+            in_prompt = [entry["table"] for entry in tables[:sum(1 for line in lines if not line.startswith("-- "))]]
+            for line in lines:
+                if line.startswith("-- join "):
+                    in_prompt.extend(line[len("-- join "):].split(" ON ", 1)[0].split(" -> "))
+            grammar = self.sql_grammar(list(dict.fromkeys(in_prompt)), {entry["table"]: entry for entry in tables})
 
-User question:
-{user_query}
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "context_tokens": prompt_tokens - base_tokens,
+            "budget": budget,
+            "tables": sum(1 for line in lines if not line.startswith("-- ")),
+            "value_hints": sum(1 for line in lines if line.startswith("-- value")),
+            "join_hints": sum(1 for line in lines if line.startswith("-- join")),
+            "n_ctx": self.n_ctx,
+            "max_tokens": max_tokens
+        }
+        if grammar:
+            usage["grammar_bytes"] = len(grammar)
+        span = instrumentation.current()
+        span.set(tables=usage["tables"], join_hints=usage["join_hints"], budget=budget)
+        span.count("prompt_tokens", prompt_tokens)
+        span.observe("prompt_tokens", prompt_tokens)
+        return prompt, usage, grammar
+
+    @traced("query.grammar")
+    def sql_grammar(self, keys, entries=None):
+        """
+        GBNF για ένα SELECT πάνω στους πίνακες keys (με όλες τις στήλες τους από τον graph,
+        αλλιώς του entries[key]), ή για όλο το <db>.json με sql_grammar="schema".
+        None με sql_grammar="off".
+        """
+        span = instrumentation.current()
+        if self.grammar_mode == "off":
+            return None
+        if self.grammar_mode == "schema":
+            if self._schema_grammar is None:
+                schema_file = schema_path_for(self.db_folder, self.db_name)
+                if not os.path.exists(schema_file):
+                    return None
+                _, schema_tables = iter_schema_file(schema_file)
+                self._schema_grammar = build_sql_grammar(
+                    (f"{sch}.{tbl}", [c["name"] for c in info.get("columns", [])]) for sch, tbl, info in schema_tables
+                )
+                span.set(compiled=True)
+            return self._schema_grammar
 
-Rules:
-- Use only the tables that are necessary
-- Use table aliases
-- Do NOT explain anything
-- Output SQL only
+        tables = []
+        for key in keys:
+            node = self.graph_nodes.get(key)
+            if node is not None:
+                tables.append((key, [c["name"] for c in node.get("columns", [])]))
+            else:
+                tables.append((key, (entries or {}).get(key, {}).get("columns", [])))
+        span.set(tables=len(tables))
+        return build_sql_grammar(tables)
 
-SQL:
-"""
+    def generate(self, prompt: str, max_tokens: int = 1024, grammar=None, parent=None):
+        """
+        Τα κομμάτια του SQL από το LLM, μέχρι το ; που κλείνει το statement.
+        Με grammar (το τρίτο στοιχείο του build_prompt) το LLM παράγει μόνο SQL που το τηρεί.
+        Στο span llm.generate: time-to-first-token, tokens (κομμάτια του stream) και tokens/sec.
+        """
+        span = instrumentation.start_span("llm.generate", parent=parent, database=self.db_name)
+        started = time.perf_counter()
+        first = None
+        tokens = 0
+        options = {}
+        if grammar:
+            options["grammar"] = llm_grammar(self.llm, grammar)
+            span.set(grammar=self.grammar_mode)
+        result = self.llm(prompt, max_tokens=max_tokens, stop=SQL_STOP_SEQUENCES, stream=True, **options)
+        # LLM χωρίς streaming: ολόκληρη η απάντηση ως ένα κομμάτι
+        chunks = [result] if isinstance(result, dict) else result
+        text = ""
+        try:
+            for chunk in chunks:
+                tokens += 1
+                if first is None:
+                    first = time.perf_counter()
+                piece = chunk["choices"][0]["text"] if "choices" in chunk else str(chunk)
+                if not text:
+                    piece = piece.lstrip()
+                end = statement_end(text + piece)
+                if end is not None:
+                    piece = piece[:end - len(text)]
+                text += piece
+                if piece:
+                    yield piece
+                if end is not None:
+                    break
+        finally:
+            close = getattr(chunks, "close", None)
+            if close is not None:
+                close()  # το llama.cpp σταματά να παράγει tokens
+            if first is not None:
+                span.observe("ttft_ms", round((first - started) * 1000, 3))
+                decode = time.perf_counter() - first
+                if tokens > 1 and decode > 0:
+                    span.observe("tokens_per_second", round((tokens - 1) / decode, 2))
+            span.count("completion_tokens", tokens)
+            span.end()
 
-        result = self.llm(prompt, max_tokens=1024)
-        sql_query = result["choices"][0]["text"].strip() if "choices" in result else str(result).strip()
-        return sql_query
+    def close(self):
+        if self.result_cache is not None:
+            self.result_cache.close()
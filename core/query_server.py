@@ -0,0 +1,510 @@
+# ----------------------------- core/query_server.py -----------------------------
+"""
+Asyncio query server μπροστά από τον DatabaseRegistry, για πολλούς χρήστες στο ίδιο μηχάνημα.
+
+- Οι ερωτήσεις που φτάνουν μαζί (έως max_batch ή μέσα σε batch_wait_ms) γίνονται
+  embedding με μία κλήση encode και αναζήτηση με μία index.search ανά βάση.
+- Οι παραγωγές του LLM τρέχουν έως llm_concurrency ταυτόχρονα, round-robin ανά client,
+  ώστε όποιος στείλει πολλές ερωτήσεις να μην καθυστερεί τους υπόλοιπους. Το
+  llm_concurrency περιορίζεται στα parallel_slots του LLM: 1 για llama.cpp στο ίδιο
+  process (όχι thread-safe) και για RemoteLLM (το LLMService παράγει μία τη φορά).
+- Πάνω από queue_depth ερωτήσεις σε εξέλιξη οι νέες απορρίπτονται (HTTP 503).
+- /stats: p50/p95 latency ανά στάδιο, tokens του prompt και throughput.
+- /metrics: τα spans του core.instrumentation σε Prometheus text format. Με
+  POST /v1/instrumentation {"enabled": true, "profiling": false} ανοίγει/κλείνει χωρίς restart.
+
+    python -m core.query_server --port 8766 --llm-url http://127.0.0.1:8765
+    python -m core.query_server --port 8766 --stub      # StubLLM, για tests
+
+    POST /v1/sql {"question": "...", "database": "SalesDB", "client": "maria", "stream": true}
+"""
+import os
+import json
+import time
+import asyncio
+import argparse
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from core.registry import DatabaseRegistry
+from core.vector_index import normalize
+from core.llm_server import StubLLM, RemoteLLM, load_llama, parallel_slots, DEFAULT_MODEL
+from core.instrumentation import instrumentation, traced
+
+STAGES = ("queue", "prepare", "llm_wait", "llm", "total")
+
+
+class ServerBusy(RuntimeError):
+    pass
+
+
+class SQLRequest:
+    def __init__(self, question: str, db_name: str, client: str, max_tokens: int):
+        self.question = question
+        self.db_name = db_name
+        self.client = client
+        self.max_tokens = max_tokens
+        self.query_ai = None
+        self.query_vec = None
+        self.prompt = None
+        self.usage = None
+        self.grammar = None
+        self.error = None
+        self.sql = None
+        self.cached = False
+        self.cancelled = False
+        self.out = asyncio.Queue()
+        self.times = {"submitted": time.perf_counter()}
+
+
+class QueryServer:
+    def __init__(self, registry: DatabaseRegistry, max_batch: int = 16, batch_wait_ms: float = 5.0,
+                 llm_concurrency: int = 1, queue_depth: int = 64, window: int = 1000):
+        self.registry = registry
+        self.max_batch = max(1, max_batch)
+        self.batch_wait = batch_wait_ms / 1000
+        self.llm_concurrency = max(1, min(llm_concurrency, parallel_slots(registry.llm)))
+        if self.llm_concurrency < llm_concurrency:
+            print(f"⚠️ llm_concurrency={llm_concurrency} limited to {self.llm_concurrency}: "
+                  f"{type(registry.llm).__name__} runs one generation at a time")
+        self.queue_depth = queue_depth
+        # Ένα thread για embedding, αναζήτηση και result cache (το sqlite connection δεν
+        # μοιράζεται μεταξύ threads), llm_concurrency threads για το LLM
+        self._prepare_pool = ThreadPoolExecutor(1, thread_name_prefix="prepare")
+        self._llm_pool = ThreadPoolExecutor(self.llm_concurrency, thread_name_prefix="llm")
+        self._latencies = {stage: deque(maxlen=window) for stage in STAGES}
+        self._finished = deque(maxlen=window)
+        self._prompt_tokens = deque(maxlen=window)
+        self.counters = {"completed": 0, "cached": 0, "rejected": 0, "errors": 0, "batches": 0, "batched": 0}
+        self._in_flight = 0
+        self._tasks = []
+
+    async def start(self):
+        self._incoming = asyncio.Queue()
+        # Ουρά LLM ανά client, σε σειρά round-robin
+        self._waiting = OrderedDict()
+        self._work = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._batcher()), asyncio.create_task(self._scheduler())]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._prepare_pool.shutdown(wait=True)
+        self._llm_pool.shutdown(wait=True)
+
+    # ------------------------------------------------------------------ API
+    def submit_nowait(self, question: str, db_name: str = None, client: str = "default",
+                      max_tokens: int = 1024) -> SQLRequest:
+        if self._in_flight >= self.queue_depth:
+            self.counters["rejected"] += 1
+            raise ServerBusy(f"Query queue is full ({self.queue_depth} in flight)")
+        self._in_flight += 1
+        request = SQLRequest(question, db_name, client, max_tokens)
+        self._incoming.put_nowait(request)
+        return request
+
+    async def pieces(self, request: SQLRequest):
+        """Τα κομμάτια του SQL όπως παράγονται. Αν ο καταναλωτής σταματήσει, σταματά και το LLM."""
+        try:
+            while True:
+                item = await request.out.get()
+                if item is None:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            request.cancelled = True
+
+    async def stream(self, question: str, db_name: str = None, client: str = "default", max_tokens: int = 1024):
+        request = self.submit_nowait(question, db_name, client, max_tokens)
+        async for piece in self.pieces(request):
+            yield piece
+
+    async def generate_sql(self, question: str, db_name: str = None, client: str = "default",
+                           max_tokens: int = 1024) -> dict:
+        request = self.submit_nowait(question, db_name, client, max_tokens)
+        sql = "".join([piece async for piece in self.pieces(request)]).strip()
+        return {"database": request.db_name, "sql": sql, "cached": request.cached, "timings": self._timings(request),
+                "usage": request.usage}
+
+    # ------------------------------------------------------------ batching
+    async def _batcher(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._incoming.get()]
+            deadline = loop.time() + self.batch_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._incoming.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            now = time.perf_counter()
+            for request in batch:
+                request.times["batched"] = now
+            self.counters["batches"] += 1
+            self.counters["batched"] += len(batch)
+            try:
+                await loop.run_in_executor(self._prepare_pool, self._prepare, batch)
+            except Exception as exc:
+                for request in batch:
+                    if request.prompt is None and not request.cached:
+                        request.error = request.error or exc
+
+            for request in batch:
+                request.times["prepared"] = time.perf_counter()
+                if request.error is not None:
+                    self._fail(request, request.error)
+                elif request.cached:
+                    request.out.put_nowait(request.sql)
+                    self._finish(request)
+                elif request.prompt is not None:
+                    self._waiting.setdefault(request.client, deque()).append(request)
+                    self._work.set()
+
+    @traced("server.prepare")
+    def _prepare(self, batch):
+        """Στο prepare thread: routing, result cache, ένα encode και μία αναζήτηση ανά βάση."""
+        instrumentation.current().set(batch=len(batch))
+        registry = self.registry
+        pending = []
+        for request in batch:
+            try:
+                if request.db_name is None:
+                    request.db_name, request.question = registry.split(request.question)
+                if request.db_name is not None:
+                    request.query_ai = registry.acquire(request.db_name)
+                cache = request.query_ai.result_cache if request.query_ai is not None else None
+                cached = cache.get_exact(request.question) if cache is not None else None
+            except Exception as exc:
+                request.error = exc
+                continue
+            if cached is not None:
+                request.sql, request.cached = cached, True
+            else:
+                pending.append(request)
+        if not pending:
+            return
+
+        with instrumentation.span("server.embed_batch", texts=len(pending)):
+            vectors = normalize(registry.embed_model.encode([r.question for r in pending], convert_to_numpy=True))
+        by_db = {}
+        for request, vector in zip(pending, vectors):
+            request.query_vec = vector[None, :]
+            try:
+                if request.db_name is None:
+                    request.db_name, _ = registry.route(request.question, request.query_vec)
+                    request.query_ai = registry.acquire(request.db_name)
+            except Exception as exc:
+                request.error = exc
+                continue
+            # Ανά QueryAI: μετά από eviction η ίδια βάση μπορεί να έχει και νέο instance
+            by_db.setdefault(request.query_ai, []).append(request)
+
+        for query_ai, requests in by_db.items():
+            try:
+                misses = []
+                for request in requests:
+                    cached = None
+                    if query_ai.result_cache is not None:
+                        cached = query_ai.result_cache.get_similar(request.question, request.query_vec)
+                    if cached is not None:
+                        request.sql, request.cached = cached, True
+                    else:
+                        misses.append(request)
+                if misses:
+                    k = query_ai.top_k * 3
+                    hits = query_ai.search_batch(np.vstack([r.query_vec for r in misses]), k)
+                    for request, request_hits in zip(misses, hits):
+                        # Τα embeddings έγιναν ήδη στο batch: το lexical index μπαίνει μόνο στο score
+                        request_hits = query_ai.fuse(request.question, request_hits, request.query_vec, k)
+                        request.prompt, request.usage, request.grammar = query_ai.build_prompt(
+                            request.question, request.query_vec, request_hits, request.max_tokens)
+            except Exception as exc:
+                for request in requests:
+                    if request.prompt is None and not request.cached:
+                        request.error = exc
+
+    # ---------------------------------------------------------- generation
+    async def _scheduler(self):
+        slots = asyncio.Semaphore(self.llm_concurrency)
+        while True:
+            await self._work.wait()
+            if not self._waiting:
+                self._work.clear()
+                continue
+            await slots.acquire()
+            # Round-robin: ο πρώτος client δίνει μία ερώτηση και πάει στο τέλος
+            client, queue = next(iter(self._waiting.items()))
+            request = queue.popleft()
+            del self._waiting[client]
+            if queue:
+                self._waiting[client] = queue
+            asyncio.create_task(self._run(request, slots))
+
+    async def _run(self, request, slots):
+        loop = asyncio.get_running_loop()
+        request.times["llm_start"] = time.perf_counter()
+        try:
+            if not request.cancelled:
+                await loop.run_in_executor(self._llm_pool, self._generate, request, loop)
+        except Exception as exc:
+            self._fail(request, exc)
+            return
+        finally:
+            slots.release()
+
+        query_ai = request.query_ai
+        if request.sql and not request.cancelled and query_ai.result_cache is not None:
+            # Το put κρατά το QueryAI μέχρι να γραφτεί η απάντηση στο result cache
+            request.query_ai = None
+            loop.run_in_executor(self._prepare_pool, self._cache_put, query_ai, request)
+        self._finish(request)
+
+    def _cache_put(self, query_ai, request):
+        try:
+            query_ai.result_cache.put(request.question, request.sql, request.query_vec)
+        finally:
+            self.registry.release(query_ai)
+
+    def _generate(self, request, loop):
+        text = ""
+        pieces = request.query_ai.generate(request.prompt, request.max_tokens, grammar=request.grammar)
+        try:
+            for piece in pieces:
+                if request.cancelled:
+                    break
+                text += piece
+                loop.call_soon_threadsafe(request.out.put_nowait, piece)
+        finally:
+            pieces.close()
+        request.sql = text.strip()
+
+    # ------------------------------------------------------------- metrics
+    def _release(self, request):
+        if request.query_ai is not None:
+            self.registry.release(request.query_ai)
+            request.query_ai = None
+
+    def _fail(self, request, exc):
+        self._release(request)
+        self.counters["errors"] += 1
+        self._in_flight -= 1
+        request.out.put_nowait(exc)
+
+    def _finish(self, request):
+        self._release(request)
+        now = time.perf_counter()
+        request.times["finished"] = now
+        request.out.put_nowait(None)
+        self._in_flight -= 1
+        self.counters["completed"] += 1
+        self.counters["cached"] += request.cached
+        self._finished.append(now)
+        if request.usage is not None:
+            self._prompt_tokens.append(request.usage["prompt_tokens"])
+        for stage, value in self._timings(request).items():
+            self._latencies[stage].append(value)
+
+    @staticmethod
+    def _timings(request) -> dict:
+        t = request.times
+        end = t.get("finished", time.perf_counter())
+        timings = {
+            "queue": t.get("batched", end) - t["submitted"],
+            "prepare": t.get("prepared", end) - t.get("batched", end),
+            "total": end - t["submitted"]
+        }
+        if "llm_start" in t:
+            timings["llm_wait"] = t["llm_start"] - t["prepared"]
+            timings["llm"] = end - t["llm_start"]
+        return {stage: round(value * 1000, 3) for stage, value in timings.items()}
+
+    def stats(self) -> dict:
+        result = dict(self.counters, in_flight=self._in_flight)
+        result["avg_batch"] = round(self.counters["batched"] / self.counters["batches"], 2) if self.counters["batches"] else 0.0
+        for stage, values in self._latencies.items():
+            if values:
+                result[f"{stage}_p50_ms"] = round(float(np.percentile(values, 50)), 2)
+                result[f"{stage}_p95_ms"] = round(float(np.percentile(values, 95)), 2)
+        if self._prompt_tokens:
+            result["prompt_tokens_p50"] = int(np.percentile(self._prompt_tokens, 50))
+            result["prompt_tokens_p95"] = int(np.percentile(self._prompt_tokens, 95))
+        # Throughput στο παράθυρο των τελευταίων window ερωτήσεων
+        if len(self._finished) > 1 and self._finished[-1] > self._finished[0]:
+            result["throughput_qps"] = round((len(self._finished) - 1) / (self._finished[-1] - self._finished[0]), 2)
+        result["databases"] = self.registry.stats()
+        return result
+
+
+# ------------------------------------------------------------------ HTTP
+async def _read_request(reader):
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    method, path, _ = lines[0].split(" ", 2)
+    headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            key, value = line.split(":", 1)
+            headers[key.strip().lower()] = value.strip()
+    length = int(headers.get("content-length", 0))
+    body = await reader.readexactly(length) if length else b""
+    return method, path, body
+
+
+def _head(status, content_type, length=None):
+    reasons = {200: "OK", 400: "Bad Request", 404: "Not Found", 503: "Service Unavailable"}
+    lines = [f"HTTP/1.1 {status} {reasons.get(status, '')}", f"Content-Type: {content_type}", "Connection: close"]
+    if length is not None:
+        lines.append(f"Content-Length: {length}")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+def make_handler(server: QueryServer):
+    async def send(writer, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        writer.write(_head(status, "application/json", len(body)) + body)
+        await writer.drain()
+
+    async def handle(reader, writer):
+        try:
+            try:
+                method, path, body = await _read_request(reader)
+            except (asyncio.IncompleteReadError, ValueError):
+                return
+
+            if method == "GET" and path == "/health":
+                await send(writer, 200, {"status": "ok"})
+                return
+            if method == "GET" and path == "/stats":
+                await send(writer, 200, server.stats())
+                return
+            if method == "GET" and path == "/metrics":
+                body = instrumentation.prometheus().encode("utf-8")
+                writer.write(_head(200, "text/plain; version=0.0.4", len(body)) + body)
+                await writer.drain()
+                return
+            if path == "/v1/instrumentation" and method in ("GET", "POST"):
+                if method == "POST":
+                    try:
+                        options = json.loads(body or b"{}")
+                        instrumentation.configure(enabled=options.get("enabled"), profiling=options.get("profiling"))
+                    except (ValueError, AttributeError):
+                        await send(writer, 400, {"error": "expected a JSON object with enabled/profiling"})
+                        return
+                await send(writer, 200, {**instrumentation.status(), "spans": instrumentation.metrics()})
+                return
+            if method != "POST" or path != "/v1/sql":
+                await send(writer, 404, {"error": "not found"})
+                return
+
+            try:
+                request = json.loads(body or b"{}")
+                question = request["question"]
+            except (ValueError, KeyError):
+                await send(writer, 400, {"error": "expected a JSON body with a question"})
+                return
+            try:
+                sql_request = server.submit_nowait(question, request.get("database"), str(request.get("client", "default")),
+                                                   int(request.get("max_tokens", 1024)))
+            except ServerBusy as exc:
+                await send(writer, 503, {"error": str(exc)})
+                return
+
+            if not request.get("stream"):
+                try:
+                    sql = "".join([piece async for piece in server.pieces(sql_request)]).strip()
+                except KeyError as exc:
+                    await send(writer, 404, {"error": exc.args[0]})
+                    return
+                await send(writer, 200, {"database": sql_request.db_name, "sql": sql, "cached": sql_request.cached,
+                                         "timings": server._timings(sql_request), "usage": sql_request.usage})
+                return
+
+            # NDJSON όπως ο LLM server: {"text": ...} ανά κομμάτι και στο τέλος {"done": true, ...}
+            writer.write(_head(200, "application/x-ndjson"))
+            pieces = server.pieces(sql_request)
+            try:
+                async for piece in pieces:
+                    writer.write((json.dumps({"text": piece}) + "\n").encode("utf-8"))
+                    await writer.drain()
+                done = {"done": True, "database": sql_request.db_name, "cached": sql_request.cached,
+                        "timings": server._timings(sql_request), "usage": sql_request.usage}
+            except KeyError as exc:
+                done = {"done": True, "error": exc.args[0]}
+            finally:
+                await pieces.aclose()
+            writer.write((json.dumps(done) + "\n").encode("utf-8"))
+            await writer.drain()
+        except (ConnectionResetError, BrokenPipeError):
+            pass  # ο client έκλεισε τη σύνδεση: το pieces() ακυρώνει την παραγωγή
+        finally:
+            writer.close()
+
+    return handle
+
+
+async def serve(server: QueryServer, host: str = "127.0.0.1", port: int = 8766):
+    await server.start()
+    listener = await asyncio.start_server(make_handler(server), host, port)
+    print(f"✅ Query server listening on http://{host}:{port} ({len(server.registry.databases)} databases)")
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        await server.stop()
+        server.registry.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Asyncio query server for QueryAI")
+    parser.add_argument("--base-path", default=os.getcwd())
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--databases", nargs="*", help="Προεπιλογή: όλες με chunk store")
+    parser.add_argument("--max-active", type=int, default=4)
+    parser.add_argument("--max-batch", type=int, default=16)
+    parser.add_argument("--batch-wait-ms", type=float, default=5.0)
+    parser.add_argument("--llm-concurrency", type=int, default=1,
+                        help="Ταυτόχρονες παραγωγές, έως τα parallel_slots του LLM (1 για llama.cpp και --llm-url)")
+    parser.add_argument("--queue-depth", type=int, default=64)
+    parser.add_argument("--llm-url", default=os.getenv("LLM_SERVER_URL"))
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--stub", action="store_true", help="StubLLM αντί για το GGUF μοντέλο")
+    parser.add_argument("--sql-grammar", choices=("off", "context", "schema"), default=os.getenv("SQL_GRAMMAR", "off"),
+                        help="GBNF grammar για το SQL: πίνακες του context ή όλο το σχήμα")
+    parser.add_argument("--instrument", action="store_true", help="Spans και /metrics από την αρχή")
+    parser.add_argument("--spans-log", help="JSON lines αρχείο για τα spans")
+    parser.add_argument("--profile", action="store_true", help="cProfile στα hot paths")
+    args = parser.parse_args()
+    instrumentation.configure(enabled=args.instrument, jsonl_path=args.spans_log, profiling=args.profile)
+
+    if args.stub:
+        llm = StubLLM()
+    elif args.llm_url:
+        llm = RemoteLLM(args.llm_url)
+    else:
+        llm = load_llama(os.path.join(args.base_path, args.model))
+
+    registry = DatabaseRegistry(args.base_path, llm, databases=args.databases, max_active=args.max_active,
+                                sql_grammar=args.sql_grammar)
+    server = QueryServer(registry, max_batch=args.max_batch, batch_wait_ms=args.batch_wait_ms,
+                         llm_concurrency=args.llm_concurrency, queue_depth=args.queue_depth)
+    try:
+        asyncio.run(serve(server, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for path in instrumentation.dump_profiles(os.path.join(args.base_path, "instrumentation", "profiles")):
+            print(f"📈 Profile saved at: {path}")
+
+
+if __name__ == "__main__":
+    main()
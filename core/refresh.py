@@ -0,0 +1,118 @@
+# ----------------------------- core/refresh.py -----------------------------
+import os
+
+from core.schema_loader import SchemaLoader, schema_path_for, iter_schema_file
+from core.graph_builder import GraphBuilder
+from core.stats_collector import StatsCollector
+from core.instrumentation import instrumentation
+
+
+class IncrementalRefresher:
+    """
+    Incremental refresh των schema/graph/stats JSON.
+    Συγκρίνει sys.tables.modify_date και row counts με το <db>_manifest.json και
+    ξαναδιαβάζει μόνο τους πίνακες που άλλαξαν. Τα chunks που δεν άλλαξαν κρατούν
+    τα embeddings τους στο επόμενο MultiJSONChunker.run().
+    """
+    def __init__(self, base_path: str, db_name: str, stats_mode: str = "full",
+                 row_count_tolerance: float = 0.1, export_graph_json: bool = True, **stats_options):
+        self.base_path = base_path
+        self.db_name = db_name
+        self.stats_mode = stats_mode
+        self.row_count_tolerance = row_count_tolerance
+        self.export_graph_json = export_graph_json
+        self.stats_options = stats_options
+
+        self.db_folder = os.path.join(base_path, "databases", db_name)
+        self.schema_file = schema_path_for(self.db_folder, db_name)
+        self.stats_file = os.path.join(self.db_folder, f"{db_name}_stats.json")
+
+    def _row_count_changed(self, old, new):
+        if old is None or new is None:
+            return old != new
+        return abs(new - old) > self.row_count_tolerance * max(old, 1)
+
+    def detect_changes(self, previous: dict, current: dict) -> dict:
+        added = [k for k in current if k not in previous]
+        removed = [k for k in previous if k not in current]
+        altered = [
+            k for k in current
+            if k in previous and (
+                current[k]["modify_date"] != previous[k]["modify_date"]
+                or current[k]["object_id"] != previous[k]["object_id"]
+            )
+        ]
+        data_changed = [
+            k for k in current
+            if k in previous and k not in altered
+            and self._row_count_changed(previous[k]["row_count"], current[k]["row_count"])
+        ]
+        return {"added": added, "altered": altered, "removed": removed, "data_changed": data_changed}
+
+    @staticmethod
+    def manifest_tables(previous: dict, current: dict, profiled) -> dict:
+        """
+        Τα tables του νέου manifest: modify_date και object_id από το catalog για όλους,
+        row_count όμως μόνο για όσους ξαναέγιναν profile. Οι υπόλοιποι κρατούν το
+        row_count του τελευταίου profile, ώστε μικρές αυξήσεις σε κάθε refresh να
+        αθροίζονται μέχρι το row_count_tolerance.
+        """
+        tables = {}
+        for key, version in current.items():
+            tables[key] = dict(version)
+            old = previous.get(key)
+            if key not in profiled and old is not None and old["row_count"] is not None:
+                tables[key]["row_count"] = old["row_count"]
+        return tables
+
+    def refresh(self) -> dict:
+        if not os.path.exists(self.schema_file):
+            # Δεν υπάρχει τίποτα για patch: το κανονικό pipeline θα κάνει πλήρη εξαγωγή
+            return {}
+
+        with instrumentation.span("schema.refresh", database=self.db_name) as span:
+            changes = self._refresh()
+            span.set(**{key: len(keys) for key, keys in changes.items()})
+        return changes
+
+    def _refresh(self) -> dict:
+        loader = SchemaLoader(self.base_path, self.db_name)
+        current = loader.table_versions()
+        manifest = loader.load_manifest()
+
+        if manifest is None:
+            # Χωρίς manifest δεν ξέρουμε τι άλλαξε: όλοι οι πίνακες θεωρούνται αλλαγμένοι
+            _, tables = iter_schema_file(self.schema_file)
+            previous = {
+                f"{sch}.{tbl}": {"object_id": None, "modify_date": None, "row_count": None}
+                for sch, tbl, _ in tables
+            }
+        else:
+            previous = manifest["tables"]
+
+        changes = self.detect_changes(previous, current)
+        schema_changed = changes["added"] + changes["altered"]
+        removed = changes["removed"]
+
+        if schema_changed or removed:
+            changed_tables = loader.extract_tables([current[k]["object_id"] for k in schema_changed])
+            loader.patch_schema(changed_tables, removed)
+            graph_builder = GraphBuilder(self.base_path, self.db_name, export_json=self.export_graph_json)
+            if graph_builder.exists():
+                graph_builder.patch(schema_changed, removed)
+
+        stats_keys = schema_changed + changes["data_changed"]
+        profiled = set()
+        if (stats_keys or removed) and self.stats_mode != "none" and os.path.exists(self.stats_file):
+            StatsCollector(
+                self.base_path, self.db_name, mode=self.stats_mode, **self.stats_options
+            ).refresh_tables(stats_keys, removed)
+            profiled = set(stats_keys)
+
+        loader.save_manifest(self.manifest_tables(previous, current, profiled))
+
+        print(
+            f"Incremental refresh: {len(changes['added'])} added, {len(changes['altered'])} altered, "
+            f"{len(removed)} removed, {len(changes['data_changed'])} with row-count changes"
+        )
+        return changes
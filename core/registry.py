@@ -0,0 +1,216 @@
+# ----------------------------- core/registry.py -----------------------------
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import numpy as np
+
+from core.chunk_store import ChunkStore, chunk_store_path_for
+from core.query_ai import QueryAI
+from core.vector_index import normalize
+
+
+class DatabaseRegistry:
+    """
+    Όλες οι βάσεις του databases/ από ένα process, με ένα embedding model και ένα LLM.
+
+    Το QueryAI κάθε βάσης (FAISS index, chunk store, graph store, result cache)
+    φτιάχνεται την πρώτη φορά που θα χρειαστεί, και πάνω από max_active ενεργές
+    βάσεις βγαίνει η λιγότερο πρόσφατα χρησιμοποιημένη (LRU). Το φόρτωμα γίνεται εκτός
+    του lock: όσοι ζητούν την ίδια βάση στο μεταξύ περιμένουν το ίδιο Future, και οι
+    ερωτήσεις σε ήδη ενεργές βάσεις δεν περιμένουν καθόλου. Από κάθε βάση
+    κρατιέται μόνιμα μόνο το routing.npy του chunk store (έως 256 vectors).
+
+    Routing: "SalesDB: ερώτηση" πάει στη SalesDB, αλλιώς στη βάση με το μεγαλύτερο
+    cosine ανάμεσα στην ερώτηση και το routing δείγμα της.
+    """
+    def __init__(self, base_path: str, llm, embed_model="all-MiniLM-L6-v2", databases=None,
+                 max_active: int = 4, **query_options):
+        self.base_path = base_path
+        self.llm = llm
+        # Ένα SentenceTransformer για όλες τις βάσεις (και για το routing). Το model_name
+        # είναι αυτό που γράφει ο MultiJSONChunker στο header του chunk store
+        if isinstance(embed_model, str):
+            from sentence_transformers import SentenceTransformer
+            name, embed_model = embed_model, SentenceTransformer(embed_model)
+            embed_model.model_name = name
+        self.embed_model = embed_model
+        self.max_active = max(1, max_active)
+        self.query_options = query_options
+
+        self.databases = list(databases) if databases else self.available(base_path)
+        if not self.databases:
+            raise RuntimeError(f" No databases with a chunk store in {os.path.join(base_path, 'databases')}")
+        self._by_lower = {db.lower(): db for db in self.databases}
+
+        self._active = OrderedDict()
+        # Πόσα streams/αιτήματα κρατούν κάθε QueryAI (acquire/release): ένα QueryAI που
+        # βγήκε από τις ενεργές κλείνει όταν το αφήσει και ο τελευταίος
+        self._holds = {}
+        # db_name -> Future του QueryAI που φορτώνεται τώρα
+        self._loading = {}
+        self._lock = threading.Lock()
+        self._routing = None
+        self.counters = {"loads": 0, "evictions": 0, "hits": 0}
+
+    @staticmethod
+    def available(base_path: str):
+        """Οι φάκελοι του databases/ που έχουν chunk store (έχει τρέξει ο MultiJSONChunker)."""
+        root = os.path.join(base_path, "databases")
+        if not os.path.isdir(root):
+            return []
+        return sorted(name for name in os.listdir(root)
+                      if os.path.isdir(chunk_store_path_for(os.path.join(root, name))))
+
+    def get(self, db_name: str) -> QueryAI:
+        """
+        Το QueryAI της βάσης: από τις ενεργές ή φορτώνεται τώρα (με eviction της LRU).
+        Χωρίς hold: όποιος το χρησιμοποιεί ενώ άλλα threads φορτώνουν βάσεις θέλει acquire.
+        """
+        return self._get(db_name)
+
+    def acquire(self, db_name: str) -> QueryAI:
+        """Όπως το get, αλλά το QueryAI δεν κλείνει σε eviction πριν από το release του."""
+        return self._get(db_name, hold=True)
+
+    def release(self, query_ai: QueryAI):
+        with self._lock:
+            holds = self._holds.pop(query_ai, 0) - 1
+            if holds > 0:
+                self._holds[query_ai] = holds
+                return
+            evicted = all(active is not query_ai for active in self._active.values())
+        if evicted:
+            query_ai.close()
+
+    def _hold(self, query_ai: QueryAI, hold: bool):
+        if hold:
+            self._holds[query_ai] = self._holds.get(query_ai, 0) + 1
+
+    def _get(self, db_name: str, hold: bool = False) -> QueryAI:
+        name = self._by_lower.get(db_name.lower())
+        if name is None:
+            raise KeyError(f"Unknown database: {db_name}")
+        db_name = name
+        while True:
+            with self._lock:
+                query_ai = self._active.get(db_name)
+                if query_ai is not None:
+                    self._active.move_to_end(db_name)
+                    self.counters["hits"] += 1
+                    self._hold(query_ai, hold)
+                    return query_ai
+                future = self._loading.get(db_name)
+                if future is None:
+                    future = self._loading[db_name] = Future()
+                    break
+            # Φορτώνεται από άλλο thread: μετά ξανά από τις ενεργές, γιατί στο μεταξύ
+            # μπορεί να βγήκε με eviction (και να έκλεισε)
+            future.result()
+
+        try:
+            query_ai = QueryAI(self.base_path, db_name, llm=self.llm, embed_model=self.embed_model,
+                               **self.query_options)
+        except BaseException as exc:
+            with self._lock:
+                del self._loading[db_name]
+            future.set_exception(exc)
+            raise
+
+        closing = []
+        with self._lock:
+            del self._loading[db_name]
+            self._active[db_name] = query_ai
+            self.counters["loads"] += 1
+            self._hold(query_ai, hold)
+            while len(self._active) > self.max_active:
+                # Όποιο stream κρατά ακόμη το QueryAI που βγαίνει συνεχίζει κανονικά και το
+                # κλείνει με το release του
+                _, evicted = self._active.popitem(last=False)
+                self.counters["evictions"] += 1
+                if evicted not in self._holds:
+                    closing.append(evicted)
+        future.set_result(query_ai)
+        for evicted in closing:
+            evicted.close()
+        return query_ai
+
+    def active(self):
+        return list(self._active)
+
+    def embed_query(self, question: str):
+        return normalize(self.embed_model.encode(question, convert_to_numpy=True))
+
+    def split(self, question: str):
+        """("SalesDB", "ερώτηση") για "SalesDB: ερώτηση", αλλιώς (None, question)."""
+        head, sep, rest = question.partition(":")
+        if sep and head.strip().lower() in self._by_lower:
+            return self._by_lower[head.strip().lower()], rest.strip()
+        return None, question
+
+    def _routing_matrix(self):
+        # (vectors, owner) όλων των βάσεων, χωρίς FAISS index/graph: μόνο το routing.npy
+        if self._routing is None:
+            vectors, owners = [], []
+            for i, db_name in enumerate(self.databases):
+                path = chunk_store_path_for(os.path.join(self.base_path, "databases", db_name))
+                sample = ChunkStore.load(path).routing_vectors()
+                if len(sample):
+                    vectors.append(normalize(sample))
+                    owners.append(np.full(len(sample), i, dtype=np.int32))
+            if vectors:
+                self._routing = (np.vstack(vectors), np.concatenate(owners))
+            else:
+                self._routing = (np.zeros((0, 0), np.float32), np.zeros(0, np.int32))
+        return self._routing
+
+    def route(self, question: str, query_vec=None):
+        """(db_name, score): η βάση με το πιο κοντινό routing vector στην ερώτηση."""
+        if len(self.databases) == 1:
+            return self.databases[0], 1.0
+        if query_vec is None:
+            query_vec = self.embed_query(question)
+        vectors, owners = self._routing_matrix()
+        if len(vectors) == 0 or vectors.shape[1] != query_vec.shape[1]:
+            return self.databases[0], 0.0
+        sims = vectors @ query_vec[0]
+        best = np.full(len(self.databases), -np.inf, dtype=np.float32)
+        np.maximum.at(best, owners, sims)
+        i = int(np.argmax(best))
+        return self.databases[i], float(best[i])
+
+    def resolve(self, question: str, db_name: str = None):
+        """(db_name, ερώτηση χωρίς πρόθεμα, query_vec ή None) για το stream_sql."""
+        if db_name is None:
+            db_name, question = self.split(question)
+        if db_name is not None:
+            return db_name, question, None
+        query_vec = self.embed_query(question) if len(self.databases) > 1 else None
+        db_name, _ = self.route(question, query_vec)
+        return db_name, question, query_vec
+
+    def stream_sql(self, question: str, db_name: str = None, max_tokens: int = 1024):
+        db_name, question, query_vec = self.resolve(question, db_name)
+        query_ai = self.acquire(db_name)
+        try:
+            yield from query_ai.stream_sql(question, max_tokens=max_tokens, query_vec=query_vec)
+        finally:
+            self.release(query_ai)
+
+    def generate_sql(self, question: str, db_name: str = None) -> str:
+        return "".join(self.stream_sql(question, db_name)).strip()
+
+    def stats(self) -> dict:
+        return dict(self.counters, databases=len(self.databases), active=self.active())
+
+    def result_cache_stats(self) -> dict:
+        return {name: query_ai.result_cache.stats() for name, query_ai in self._active.items()
+                if query_ai.result_cache is not None}
+
+    def close(self):
+        with self._lock:
+            for query_ai in self._active.values():
+                query_ai.close()
+            self._active.clear()
+            self._holds.clear()
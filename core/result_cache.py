@@ -0,0 +1,190 @@
+# ----------------------------- core/result_cache.py -----------------------------
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import numpy as np
+
+from core.vector_index import normalize
+
+
+def normalize_query(query: str) -> str:
+    """Πεζά, χωρίς σημεία στίξης και διπλά κενά: "Top  customers?" == "top customers"."""
+    query = re.sub(r"[^\w\s.]", " ", query.lower())
+    query = re.sub(r"(?<!\d)\.|\.(?!\d)", " ", query)
+    return " ".join(query.split())
+
+
+def _numbers(text: str):
+    return sorted(re.findall(r"\d+(?:\.\d+)?", text))
+
+
+class SemanticCache:
+    """
+    Persistent cache ερώτηση -> SQL μπροστά από το generate_sql.
+    - exact hit: hash της normalized ερώτησης
+    - semantic hit: cosine(query embedding) >= threshold με ίδιους αριθμούς
+      ("top 10 customers" δεν απαντιέται από το "top 5 customers")
+    Entries με άλλο schema fingerprint ακυρώνονται, με TTL και LRU όριο πλήθους.
+    """
+    def __init__(self, path: str, db_name: str, fingerprint: str, threshold: float = 0.92,
+                 ttl_seconds: float = 7 * 24 * 3600, max_entries: int = 5000):
+        self.path = path
+        self.db_name = db_name
+        self.fingerprint = fingerprint
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.counters = {"exact_hits": 0, "semantic_hits": 0, "misses": 0}
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT NOT NULL,
+                db_name TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                query TEXT NOT NULL,
+                normalized TEXT NOT NULL,
+                embedding BLOB,
+                sql TEXT NOT NULL,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (db_name, key)
+            )
+        """)
+        # Αλλαγή σχήματος: οι παλιές απαντήσεις μπορεί να αναφέρονται σε πίνακες που δεν υπάρχουν
+        self.conn.execute(
+            "DELETE FROM results WHERE db_name = ? AND (fingerprint != ? OR created < ?)",
+            (db_name, fingerprint, time.time() - ttl_seconds)
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results (db_name, last_used)")
+        self.conn.commit()
+        self._load_vectors()
+
+    def _load_vectors(self):
+        # Μόνο στο άνοιγμα: μετά το put/eviction ενημερώνουν τον πίνακα στη μνήμη
+        rows = self.conn.execute(
+            "SELECT key, normalized, embedding FROM results WHERE db_name = ? AND embedding IS NOT NULL",
+            (self.db_name,)
+        ).fetchall()
+        self._entries = self.conn.execute(
+            "SELECT COUNT(*) FROM results WHERE db_name = ?", (self.db_name,)
+        ).fetchone()[0]
+        self._keys = [r[0] for r in rows]
+        self._numbers = [_numbers(r[1]) for r in rows]
+        self._positions = {key: i for i, key in enumerate(self._keys)}
+        self._matrix = np.vstack([np.frombuffer(r[2], dtype=np.float32) for r in rows]) if rows else None
+
+    def _set_vector(self, key, normalized, vector):
+        i = self._positions.get(key)
+        if i is None:
+            i = len(self._keys)
+            if self._matrix is None:
+                self._matrix = np.zeros((16, len(vector)), dtype=np.float32)
+            elif i == len(self._matrix):
+                # Χωρητικότητα x2, ώστε N puts να κοστίζουν O(N) αντιγραφές συνολικά
+                self._matrix = np.vstack([self._matrix, np.zeros_like(self._matrix)])
+            self._positions[key] = i
+            self._keys.append(key)
+            self._numbers.append(None)
+        self._matrix[i] = vector
+        self._numbers[i] = _numbers(normalized)
+
+    def _drop_vector(self, key):
+        i = self._positions.pop(key, None)
+        if i is None:
+            return
+        # Η τελευταία γραμμή παίρνει τη θέση της γραμμής που φεύγει
+        last = len(self._keys) - 1
+        if i != last:
+            self._matrix[i] = self._matrix[last]
+            self._keys[i], self._numbers[i] = self._keys[last], self._numbers[last]
+            self._positions[self._keys[i]] = i
+        self._keys.pop()
+        self._numbers.pop()
+
+    @staticmethod
+    def key(query: str) -> str:
+        return hashlib.sha256(normalize_query(query).encode("utf-8")).hexdigest()
+
+    def _touch(self, key):
+        now = time.time()
+        row = self.conn.execute(
+            "SELECT sql, created FROM results WHERE db_name = ? AND key = ?", (self.db_name, key)
+        ).fetchone()
+        if row is None or row[1] < now - self.ttl_seconds:
+            return None
+        self.conn.execute(
+            "UPDATE results SET last_used = ?, hits = hits + 1 WHERE db_name = ? AND key = ?",
+            (now, self.db_name, key)
+        )
+        self.conn.commit()
+        return row[0]
+
+    def get_exact(self, query: str):
+        sql = self._touch(self.key(query))
+        if sql is not None:
+            self.counters["exact_hits"] += 1
+        return sql
+
+    def get_similar(self, query: str, query_vec):
+        """query_vec: normalized embedding (1, dim) της ερώτησης."""
+        if self._keys:
+            sims = self._matrix[:len(self._keys)] @ np.asarray(query_vec, dtype=np.float32).reshape(-1)
+            numbers = _numbers(normalize_query(query))
+            for idx in np.argsort(sims)[::-1]:
+                if sims[idx] < self.threshold:
+                    break
+                if self._numbers[idx] != numbers:
+                    continue
+                sql = self._touch(self._keys[idx])
+                if sql is not None:
+                    self.counters["semantic_hits"] += 1
+                    return sql
+        self.counters["misses"] += 1
+        return None
+
+    def put(self, query: str, sql: str, query_vec=None):
+        now = time.time()
+        key, normalized = self.key(query), normalize_query(query)
+        vector = normalize(query_vec).reshape(-1) if query_vec is not None else None
+        exists = self.conn.execute(
+            "SELECT 1 FROM results WHERE db_name = ? AND key = ?", (self.db_name, key)
+        ).fetchone() is not None
+        self.conn.execute(
+            """INSERT OR REPLACE INTO results
+               (key, db_name, fingerprint, query, normalized, embedding, sql, created, last_used, hits)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0)""",
+            (key, self.db_name, self.fingerprint, query, normalized,
+             vector.tobytes() if vector is not None else None, sql, now, now)
+        )
+        if vector is not None:
+            self._set_vector(key, normalized, vector)
+        else:
+            self._drop_vector(key)
+        self._entries += not exists
+
+        # LRU: κρατάμε τα max_entries πιο πρόσφατα χρησιμοποιημένα
+        if self._entries > self.max_entries:
+            evicted = [row[0] for row in self.conn.execute(
+                "SELECT key FROM results WHERE db_name = ? ORDER BY last_used LIMIT ?",
+                (self.db_name, self._entries - self.max_entries)
+            )]
+            self.conn.executemany("DELETE FROM results WHERE db_name = ? AND key = ?",
+                                  [(self.db_name, k) for k in evicted])
+            for k in evicted:
+                self._drop_vector(k)
+            self._entries -= len(evicted)
+        self.conn.commit()
+
+    def stats(self) -> dict:
+        total = sum(self.counters.values())
+        hits = self.counters["exact_hits"] + self.counters["semantic_hits"]
+        entries = self.conn.execute("SELECT COUNT(*) FROM results WHERE db_name = ?", (self.db_name,)).fetchone()[0]
+        return dict(self.counters, entries=entries, hit_rate=round(hits / total, 3) if total else 0.0)
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,91 @@
+# ----------------------------- core/retrieval_eval.py -----------------------------
+"""
+Recall@k των quantized indexes σε σχέση με το exact search, πάνω στα embeddings
+του chunk store μιας βάσης. Τα queries είναι embeddings υπαρκτών chunks με θόρυβο
+(όπως μια ερώτηση για γνωστό πίνακα).
+
+    python -m core.retrieval_eval <DB_NAME> --quantization none sq8 pq --rescore 1 4
+"""
+import os
+import time
+import json
+import argparse
+import numpy as np
+import faiss
+
+from core.chunk_store import ChunkStore, chunk_store_path_for
+from core.vector_index import build_index, normalize, resolve_quantization, tune_index
+
+
+def perturbed_queries(vectors, n_queries, noise=0.5, seed=0):
+    rng = np.random.default_rng(seed)
+    picked = vectors[rng.integers(0, len(vectors), n_queries)]
+    scale = noise / np.sqrt(vectors.shape[1])
+    return normalize(picked + scale * rng.standard_normal(picked.shape).astype(np.float32))
+
+
+def evaluate(vectors, queries, k=10, index_types=("flat",), quantizations=("none", "sq8", "pq"),
+             rescore=(1, 4), nprobe=16, ef_search=64):
+    """
+    vectors: normalized float32 (n, dim). Για κάθε index_type x quantization: bytes ανά
+    vector στο index, recall@k χωρίς και με rescoring (top k*r από το index, ακριβή
+    scores με τα float32 vectors) και latency ανά query.
+    """
+    vectors = normalize(vectors)
+    queries = normalize(queries)
+    truth = np.argsort(-(queries @ vectors.T), axis=1)[:, :k]
+    float_bytes = vectors.shape[1] * 4
+
+    rows = []
+    for index_type in index_types:
+        for quantization in quantizations:
+            start = time.perf_counter()
+            index = tune_index(build_index(vectors, index_type=index_type, quantization=quantization),
+                               nprobe=nprobe, ef_search=ef_search)
+            build_s = time.perf_counter() - start
+            index_bytes = faiss.serialize_index(index).nbytes / len(vectors)
+            row = {
+                "index_type": index_type,
+                "quantization": resolve_quantization(len(vectors), quantization),
+                "bytes_per_vector": round(index_bytes, 1),
+                "compression": round(float_bytes / index_bytes, 1),
+                "build_s": round(build_s, 2)
+            }
+            for r in rescore:
+                start = time.perf_counter()
+                _, ids = index.search(queries, k * r)
+                found = []
+                for q, cand in zip(queries, ids):
+                    cand = cand[cand >= 0]
+                    found.append(cand[np.argsort(-(vectors[cand] @ q))][:k] if r > 1 else cand[:k])
+                ms = (time.perf_counter() - start) / len(queries) * 1000
+                recall = np.mean([len(set(f.tolist()) & set(t.tolist())) / k for f, t in zip(found, truth)])
+                row[f"recall@{k}_rescore{r}"] = round(float(recall), 4)
+                row[f"ms_rescore{r}"] = round(ms, 3)
+            rows.append(row)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("db_name")
+    parser.add_argument("--base-path", default=os.getcwd())
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--index-type", nargs="+", default=["flat"])
+    parser.add_argument("--quantization", nargs="+", default=["none", "sq8", "pq"])
+    parser.add_argument("--rescore", type=int, nargs="+", default=[1, 4])
+    args = parser.parse_args()
+
+    store = ChunkStore.load(chunk_store_path_for(os.path.join(args.base_path, "databases", args.db_name)))
+    vectors = store.vectors()
+    if len(vectors) == 0:
+        raise SystemExit("Chunk store is empty")
+    queries = perturbed_queries(vectors, args.queries)
+    for row in evaluate(vectors, queries, k=min(args.k, len(vectors)), index_types=args.index_type,
+                        quantizations=args.quantization, rescore=args.rescore):
+        print(json.dumps(row))
+
+
+if __name__ == "__main__":
+    main()
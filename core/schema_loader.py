@@ -1,11 +1,146 @@
 import os
 import json
-import pyodbc
+import itertools
 from datetime import datetime, date
 from dotenv import load_dotenv
 
+from core.instrumentation import instrumentation
+
+SCHEMA_FORMATS = ("json", "ndjson")
+
+
+def schema_path_for(db_folder: str, db_name: str) -> str:
+    """<db>.json, ή <db>.ndjson αν το σχήμα γράφτηκε ως NDJSON (SCHEMA_FORMAT=ndjson)."""
+    path = os.path.join(db_folder, f"{db_name}.json")
+    ndjson = os.path.join(db_folder, f"{db_name}.ndjson")
+    if not os.path.exists(path) and os.path.exists(ndjson):
+        return ndjson
+    return path
+
+
+def iter_schema_file(path: str):
+    """
+    (header, tables): tables δίνει (schema, table, info) με τη σειρά του αρχείου.
+    Το NDJSON διαβάζεται γραμμή γραμμή, οπότε στη μνήμη είναι ένας πίνακας τη φορά.
+    """
+    if not path.endswith(".ndjson"):
+        with open(path, "r", encoding="utf-8") as f:
+            schema = json.load(f)
+        tables = schema.pop("schemas", {})
+        return schema, ((sch, tbl, info) for sch, sch_tables in tables.items() for tbl, info in sch_tables.items())
+
+    with open(path, "r", encoding="utf-8") as f:
+        header = json.loads(f.readline())
+
+    def tables():
+        # Το αρχείο ανοίγει μόνο όταν ξεκινήσει η ανάγνωση και κλείνει στο τέλος ή στο close()
+        with open(path, "r", encoding="utf-8") as f:
+            f.readline()
+            for line in f:
+                info = json.loads(line)
+                yield info.pop("schema"), info.pop("table"), info
+
+    return header, tables()
+
+
+def read_schema_file(path: str) -> dict:
+    """Το σχήμα ως {"database", ..., "schemas": {schema: {table: info}}} από .json ή .ndjson."""
+    header, tables = iter_schema_file(path)
+    schema = dict(header, schemas={})
+    for sch, tbl, info in tables:
+        schema["schemas"].setdefault(sch, {})[tbl] = info
+    return schema
+
+
+def _json_default(o):
+    # Custom JSON encoder για datetime (αν τυχόν εμφανιστεί)
+    if isinstance(o, (datetime, date)):
+        return o.isoformat()
+    return str(o)
+
+
+class SchemaWriter:
+    """
+    Γράφει το σχήμα πίνακα-πίνακα, χωρίς να υπάρχει ποτέ ολόκληρο στη μνήμη:
+    fmt="json": compact <db>.json ({"database", ..., "schemas": {...}}), οι πίνακες κάθε
+    schema πρέπει να έρχονται συνεχόμενα. fmt="ndjson": <db>.ndjson με το header στην
+    πρώτη γραμμή και μία γραμμή {"schema", "table", ...} ανά πίνακα.
+    Γράφει σε .tmp και κάνει replace στο close(), και σβήνει το αρχείο της άλλης μορφής.
+    """
+    def __init__(self, db_folder: str, db_name: str, header: dict, fmt: str = "json"):
+        if fmt not in SCHEMA_FORMATS:
+            raise ValueError(f"Unknown schema format: {fmt}")
+        self.fmt = fmt
+        self.path = os.path.join(db_folder, f"{db_name}.{fmt}")
+        self.other_path = os.path.join(db_folder, f"{db_name}.{'json' if fmt == 'ndjson' else 'ndjson'}")
+        self.tables = 0
+        self.columns = 0
+        self._schema = None
+        self._seen = set()
+        self._f = open(self.path + ".tmp", "w", encoding="utf-8")
+        if fmt == "ndjson":
+            self._f.write(json.dumps(header, ensure_ascii=False, default=_json_default) + "\n")
+        else:
+            self._f.write(json.dumps(header, ensure_ascii=False, default=_json_default)[:-1])
+            self._f.write(', "schemas": {' if header else '"schemas": {')
+
+    def write(self, schema_name: str, table_name: str, info: dict):
+        self.tables += 1
+        self.columns += len(info.get("columns", []))
+        if self.fmt == "ndjson":
+            line = json.dumps({"schema": schema_name, "table": table_name, **info}, ensure_ascii=False,
+                              default=_json_default)
+            self._f.write(line + "\n")
+            return
+
+        if schema_name != self._schema:
+            if schema_name in self._seen:
+                raise ValueError(f"Tables of schema {schema_name} are not contiguous")
+            self._seen.add(schema_name)
+            if self._schema is not None:
+                self._f.write("}, ")
+            self._f.write(json.dumps(schema_name, ensure_ascii=False) + ": {")
+            self._schema = schema_name
+            first = True
+        else:
+            first = False
+        if not first:
+            self._f.write(", ")
+        self._f.write(json.dumps(table_name, ensure_ascii=False) + ": "
+                      + json.dumps(info, ensure_ascii=False, default=_json_default))
+
+    def close(self):
+        if self.fmt == "json":
+            self._f.write("}}}" if self._schema is not None else "}}")
+        self._f.close()
+        os.replace(self.path + ".tmp", self.path)
+        if os.path.exists(self.other_path):
+            os.remove(self.other_path)
+
+    def abort(self):
+        self._f.close()
+        os.remove(self.path + ".tmp")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+
 class SchemaLoader:
-    def __init__(self, base_path: str, db_name: str):
+    """
+    Εξαγωγή του σχήματος από το catalog του SQL Server σε streaming: τα queries για
+    columns, PK, FK και indexes τρέχουν σε ξεχωριστούς cursors (MARS), ταξινομημένα κατά
+    (schema_id, object_id), διαβάζονται με fetchmany(array_size) και ενώνονται πίνακα-πίνακα.
+    Κάθε πίνακας γράφεται αμέσως στο αρχείο (fmt "json" ή "ndjson"), οπότε η μνήμη
+    εξαρτάται από τον μεγαλύτερο πίνακα και όχι από όλο το catalog.
+    """
+    def __init__(self, base_path: str, db_name: str, array_size: int = None, fmt: str = None):
         self.base_path = base_path
         self.db_name = db_name
 
@@ -20,13 +155,26 @@ class SchemaLoader:
         self.database = os.getenv("DB_DATABASE")
         self.user = os.getenv("DB_USER")
         self.password = os.getenv("DB_PASSWORD")
+        self.array_size = int(array_size or os.getenv("SCHEMA_ARRAY_SIZE", "5000"))
+        self.fmt = (fmt or os.getenv("SCHEMA_FORMAT", "json")).lower()
+        if self.fmt not in SCHEMA_FORMATS:
+            raise ValueError(f"Unknown schema format: {self.fmt}")
 
         if not all([self.driver, self.server, self.database, self.user, self.password]):
             raise RuntimeError("Λείπουν στοιχεία σύνδεσης από το .env")
 
-        self.conn = self._connect()
+        self._conn = None
+
+    @property
+    def conn(self):
+        # Η σύνδεση ανοίγει μόνο όταν χρειαστεί: με υπάρχον <db>.json δεν ανοίγει καθόλου
+        if self._conn is None:
+            self._conn = self._connect()
+        return self._conn
 
     def _connect(self):
+        import pyodbc
+        # MARS: τα τέσσερα queries του catalog διαβάζονται ταυτόχρονα στην ίδια σύνδεση
         conn_str = (
             f"DRIVER={{{self.driver}}};"
             f"SERVER={self.server};"
@@ -34,135 +182,286 @@ class SchemaLoader:
             f"UID={self.user};"
             f"PWD={self.password};"
             "TrustServerCertificate=yes;"
+            "MARS_Connection=yes;"
         )
         return pyodbc.connect(conn_str)
 
     def load_schema(self) -> dict:
-        schema_file = os.path.join(self.db_folder, f"{self.db_name}.json")
+        """Γράφει το <db>.json (ή <db>.ndjson) αν δεν υπάρχει και επιστρέφει το σχήμα."""
+        return read_schema_file(self.extract_schema()["path"])
+
+    def extract_schema(self) -> dict:
+        """
+        Όπως το load_schema, αλλά επιστρέφει {"path", "format", "tables", "columns"} και
+        όχι το σχήμα, ώστε να μη χρειαστεί να μπει όλο στη μνήμη.
+        """
+        schema_file = schema_path_for(self.db_folder, self.db_name)
 
         if os.path.exists(schema_file):
-            print(f"Schema JSON already exists at {schema_file}, loading from file...")
-            with open(schema_file, "r", encoding="utf-8") as f:
-                return json.load(f)
+            print(f"Schema JSON already exists at {schema_file}")
+            return {"path": schema_file, "format": "ndjson" if schema_file.endswith(".ndjson") else "json"}
 
-        schema = {
+        header = {
             "database": self.database,
             "generated_at": datetime.utcnow().isoformat(),
-            "dialect": "sqlserver",
-            "schemas": {}
+            "dialect": "sqlserver"
         }
+        with instrumentation.span("schema.load", database=self.db_name, format=self.fmt,
+                                  array_size=self.array_size) as span:
+            # Οι εκδόσεις πριν την εξαγωγή: ένας πίνακας που αλλάζει στο μεταξύ φαίνεται
+            # αλλαγμένος στο επόμενο incremental refresh
+            versions = self.table_versions()
+            with SchemaWriter(self.db_folder, self.db_name, header, self.fmt) as writer:
+                for sch, tbl, info in self.iter_tables():
+                    writer.write(sch, tbl, info)
+            span.set(tables=writer.tables, columns=writer.columns)
+            self.save_manifest(versions)
+
+        print(f"Schema ({writer.tables} tables, {writer.columns} columns) saved at: {writer.path}")
+        return {"path": writer.path, "format": self.fmt, "tables": writer.tables, "columns": writer.columns}
 
+    def _query(self, cursor, sql):
+        """execute + fetchall, με round-trips και γραμμές στο τρέχον span."""
+        cursor.execute(sql)
+        rows = cursor.fetchall()
+        instrumentation.count("sql_roundtrips")
+        instrumentation.count("rows_fetched", len(rows))
+        return rows
+
+    def _stream(self, sql):
+        """Οι γραμμές ενός query σε δικό του cursor, fetchmany(array_size) τη φορά."""
         cursor = self.conn.cursor()
+        cursor.arraysize = self.array_size
+        cursor.execute(sql)
+        instrumentation.count("sql_roundtrips")
+        try:
+            while True:
+                rows = cursor.fetchmany(self.array_size)
+                if not rows:
+                    return
+                instrumentation.count("rows_fetched", len(rows))
+                yield from rows
+        finally:
+            cursor.close()
 
-        # Tables & Columns
-        cursor.execute("""
-            SELECT
-                s.name AS schema_name,
-                t.name AS table_name,
-                c.name AS column_name,
-                ty.name AS data_type,
-                c.max_length,
-                c.is_nullable
-            FROM sys.tables t
-            JOIN sys.schemas s ON t.schema_id = s.schema_id
-            JOIN sys.columns c ON t.object_id = c.object_id
-            JOIN sys.types ty ON c.user_type_id = ty.user_type_id
-            ORDER BY s.name, t.name, c.column_id
-        """)
+    def _catalog_queries(self, table_filter: str) -> dict:
+        """
+        Τα queries του catalog, όλα ταξινομημένα κατά (schema_id, object_id) του πίνακα:
+        ακέραιοι, ώστε η σειρά να είναι ίδια με τη σύγκριση στην Python (όχι collation).
+        """
+        return {
+            "columns": f"""
+                SELECT
+                    t.schema_id,
+                    t.object_id,
+                    s.name AS schema_name,
+                    t.name AS table_name,
+                    c.name AS column_name,
+                    ty.name AS data_type,
+                    c.max_length,
+                    c.is_nullable
+                FROM sys.tables t
+                JOIN sys.schemas s ON t.schema_id = s.schema_id
+                JOIN sys.columns c ON t.object_id = c.object_id
+                JOIN sys.types ty ON c.user_type_id = ty.user_type_id
+                WHERE 1 = 1 {table_filter}
+                ORDER BY t.schema_id, t.object_id, c.column_id
+            """,
+            "primary_key": f"""
+                SELECT
+                    t.schema_id,
+                    t.object_id,
+                    c.name AS column_name
+                FROM sys.indexes i
+                JOIN sys.index_columns ic ON i.object_id = ic.object_id AND i.index_id = ic.index_id
+                JOIN sys.columns c ON ic.object_id = c.object_id AND ic.column_id = c.column_id
+                JOIN sys.tables t ON i.object_id = t.object_id
+                WHERE i.is_primary_key = 1 {table_filter}
+                ORDER BY t.schema_id, t.object_id, ic.key_ordinal
+            """,
+            "foreign_keys": f"""
+                SELECT
+                    tp.schema_id,
+                    tp.object_id,
+                    cp.name AS parent_column,
+                    SCHEMA_NAME(tr.schema_id) AS ref_schema,
+                    tr.name AS ref_table,
+                    cr.name AS ref_column
+                FROM sys.foreign_keys fk
+                JOIN sys.foreign_key_columns fkc ON fk.object_id = fkc.constraint_object_id
+                JOIN sys.tables tp ON fkc.parent_object_id = tp.object_id
+                JOIN sys.columns cp ON fkc.parent_object_id = cp.object_id AND fkc.parent_column_id = cp.column_id
+                JOIN sys.tables tr ON fkc.referenced_object_id = tr.object_id
+                JOIN sys.columns cr ON fkc.referenced_object_id = cr.object_id AND fkc.referenced_column_id = cr.column_id
+                WHERE 1 = 1 {table_filter.replace("t.object_id", "tp.object_id")}
+                ORDER BY tp.schema_id, tp.object_id, fk.object_id, fkc.constraint_column_id
+            """,
+            # Indexes (με τις key στήλες τους, ώστε να φαίνονται τα unique keys)
+            "indexes": f"""
+                SELECT
+                    t.schema_id,
+                    t.object_id,
+                    i.name AS index_name,
+                    i.is_unique,
+                    c.name AS column_name
+                FROM sys.indexes i
+                JOIN sys.tables t ON i.object_id = t.object_id
+                LEFT JOIN sys.index_columns ic ON ic.object_id = i.object_id AND ic.index_id = i.index_id
+                    AND ic.is_included_column = 0
+                LEFT JOIN sys.columns c ON c.object_id = ic.object_id AND c.column_id = ic.column_id
+                WHERE i.name IS NOT NULL AND i.is_primary_key = 0 {table_filter}
+                ORDER BY t.schema_id, t.object_id, i.index_id, ic.key_ordinal
+            """
+        }
 
-        for row in cursor.fetchall():
-            sch = row.schema_name
-            tbl = row.table_name
+    def iter_tables(self, object_ids=None):
+        """
+        (schema, table, info) ανά πίνακα, με merge των τεσσάρων ταξινομημένων streams.
+        Με object_ids μόνο για αυτούς τους πίνακες (incremental refresh).
+        """
+        table_filter = ""
+        if object_ids is not None:
+            if not object_ids:
+                return
+            table_filter = "AND t.object_id IN (" + ", ".join(str(int(o)) for o in object_ids) + ")"
 
-            schema["schemas"].setdefault(sch, {})
-            schema["schemas"][sch].setdefault(tbl, {
-                "columns": [],
-                "primary_key": [],
-                "foreign_keys": [],
-                "indexes": [],
-                "constraints": []
-            })
+        streams = {
+            kind: itertools.groupby(self._stream(sql), key=lambda row: (row.schema_id, row.object_id))
+            for kind, sql in self._catalog_queries(table_filter).items()
+        }
+        heads = {kind: next(stream, None) for kind, stream in streams.items()}
+        while heads["columns"] is not None:
+            key = min(head[0] for head in heads.values() if head is not None)
+            groups = {}
+            for kind, head in heads.items():
+                if head is not None and head[0] == key:
+                    groups[kind] = list(head[1])
+                    heads[kind] = next(streams[kind], None)
+            # Κάθε πίνακας έχει στήλες: ό,τι δεν ταιριάζει με το columns stream είναι
+            # πίνακας που δημιουργήθηκε ανάμεσα στα queries και αγνοείται
+            if "columns" in groups:
+                yield self._table_info(groups)
 
-            schema["schemas"][sch][tbl]["columns"].append({
+    @staticmethod
+    def _table_info(groups: dict):
+        columns = groups["columns"]
+        info = {
+            "columns": [{
                 "name": row.column_name,
                 "type": row.data_type,
                 "max_length": row.max_length,
                 "nullable": bool(row.is_nullable)
-            })
-
-        # Primary Keys
-        cursor.execute("""
-            SELECT
-                SCHEMA_NAME(t.schema_id) AS schema_name,
-                t.name AS table_name,
-                c.name AS column_name
-            FROM sys.indexes i
-            JOIN sys.index_columns ic ON i.object_id = ic.object_id AND i.index_id = ic.index_id
-            JOIN sys.columns c ON ic.object_id = c.object_id AND ic.column_id = c.column_id
-            JOIN sys.tables t ON i.object_id = t.object_id
-            WHERE i.is_primary_key = 1
-        """)
-        for row in cursor.fetchall():
-            schema["schemas"][row.schema_name][row.table_name]["primary_key"].append(
-                row.column_name
-            )
-
-        # Foreign Keys
-        cursor.execute("""
-            SELECT
-                SCHEMA_NAME(tp.schema_id) AS parent_schema,
-                tp.name AS parent_table,
-                cp.name AS parent_column,
-                SCHEMA_NAME(tr.schema_id) AS ref_schema,
-                tr.name AS ref_table,
-                cr.name AS ref_column
-            FROM sys.foreign_keys fk
-            JOIN sys.foreign_key_columns fkc ON fk.object_id = fkc.constraint_object_id
-            JOIN sys.tables tp ON fkc.parent_object_id = tp.object_id
-            JOIN sys.columns cp ON fkc.parent_object_id = cp.object_id AND fkc.parent_column_id = cp.column_id
-            JOIN sys.tables tr ON fkc.referenced_object_id = tr.object_id
-            JOIN sys.columns cr ON fkc.referenced_object_id = cr.object_id AND fkc.referenced_column_id = cr.column_id
-        """)
-        for row in cursor.fetchall():
-            schema["schemas"][row.parent_schema][row.parent_table]["foreign_keys"].append({
+            } for row in columns],
+            "primary_key": [row.column_name for row in groups.get("primary_key", [])],
+            "foreign_keys": [{
                 "column": row.parent_column,
                 "ref_schema": row.ref_schema,
                 "ref_table": row.ref_table,
                 "ref_column": row.ref_column
-            })
+            } for row in groups.get("foreign_keys", [])],
+            "indexes": [],
+            "constraints": []
+        }
+        indexes = {}
+        for row in groups.get("indexes", []):
+            if row.index_name not in indexes:
+                indexes[row.index_name] = {"name": row.index_name, "unique": bool(row.is_unique), "columns": []}
+                info["indexes"].append(indexes[row.index_name])
+            if row.column_name is not None:
+                indexes[row.index_name]["columns"].append(row.column_name)
+        return columns[0].schema_name, columns[0].table_name, info
 
-        # Indexes
-        cursor.execute("""
+    def _extract(self, object_ids=None) -> dict:
+        """{schema: {table: info}}: όλο στη μνήμη, μόνο για τους λίγους πίνακες ενός incremental refresh."""
+        schemas = {}
+        for sch, tbl, info in self.iter_tables(object_ids):
+            schemas.setdefault(sch, {})[tbl] = info
+        return schemas
+
+    def extract_tables(self, object_ids) -> dict:
+        """{"schema.table": table_info} μόνο για τους πίνακες που άλλαξαν."""
+        tables = {}
+        for sch, sch_tables in self._extract(object_ids).items():
+            for tbl, info in sch_tables.items():
+                tables[f"{sch}.{tbl}"] = info
+        return tables
+
+    def patch_schema(self, changed_tables: dict, removed_keys) -> dict:
+        """
+        Αντικαθιστά/αφαιρεί μόνο τους πίνακες που άλλαξαν: το υπάρχον αρχείο διαβάζεται
+        και ξαναγράφεται πίνακα-πίνακα, οι νέοι πίνακες μπαίνουν στο τέλος του schema τους.
+        """
+        header, tables = iter_schema_file(schema_path_for(self.db_folder, self.db_name))
+        header["generated_at"] = datetime.utcnow().isoformat()
+        removed = set(removed_keys)
+        added = {}
+        for key, table_info in changed_tables.items():
+            sch, tbl = key.split(".", 1)
+            added.setdefault(sch, {})[tbl] = table_info
+
+        with SchemaWriter(self.db_folder, self.db_name, header, self.fmt) as writer:
+            current = None
+            for sch, tbl, info in tables:
+                if sch != current and current in added:
+                    for new_tbl, new_info in added.pop(current).items():
+                        writer.write(current, new_tbl, new_info)
+                current = sch
+                key = f"{sch}.{tbl}"
+                if key in removed:
+                    continue
+                if key in changed_tables:
+                    info = added[sch].pop(tbl)
+                writer.write(sch, tbl, info)
+            # Πρώτα οι νέοι πίνακες του τελευταίου schema, ώστε το block του να μείνει συνεχές
+            for tbl, info in added.pop(current, {}).items():
+                writer.write(current, tbl, info)
+            for sch, sch_tables in added.items():
+                for tbl, info in sch_tables.items():
+                    writer.write(sch, tbl, info)
+        return {"path": writer.path, "format": self.fmt, "tables": writer.tables, "columns": writer.columns}
+
+    # ---------------- Manifest για incremental refresh ----------------
+    def table_versions(self) -> dict:
+        """{"schema.table": {object_id, modify_date, row_count}} από το catalog (χωρίς σαρώσεις)."""
+        cursor = self.conn.cursor()
+        rows = self._query(cursor, """
             SELECT
-                SCHEMA_NAME(t.schema_id) AS schema_name,
+                s.name AS schema_name,
                 t.name AS table_name,
-                i.name AS index_name,
-                i.is_unique
-            FROM sys.indexes i
-            JOIN sys.tables t ON i.object_id = t.object_id
-            WHERE i.name IS NOT NULL AND i.is_primary_key = 0
+                t.object_id,
+                t.modify_date,
+                SUM(p.row_count) AS row_count
+            FROM sys.tables t
+            JOIN sys.schemas s ON t.schema_id = s.schema_id
+            LEFT JOIN sys.dm_db_partition_stats p
+                ON p.object_id = t.object_id AND p.index_id IN (0, 1)
+            GROUP BY t.object_id, s.name, t.name, t.modify_date
         """)
-        for row in cursor.fetchall():
-            schema["schemas"][row.schema_name][row.table_name]["indexes"].append({
-                "name": row.index_name,
-                "unique": bool(row.is_unique)
-            })
-
-        # Save schema JSON
-        self._save(schema)
-        return schema
-
-    def _save(self, schema: dict):
-        path = os.path.join(self.db_folder, f"{self.db_name}.json")
+        versions = {}
+        for row in rows:
+            versions[f"{row.schema_name}.{row.table_name}"] = {
+                "object_id": row.object_id,
+                "modify_date": row.modify_date.isoformat() if row.modify_date else None,
+                "row_count": int(row.row_count) if row.row_count is not None else None
+            }
+        return versions
 
-        # Custom JSON encoder για datetime (αν τυχόν εμφανιστεί)
-        def default(o):
-            if isinstance(o, (datetime, date)):
-                return o.isoformat()
-            return str(o)
+    def load_manifest(self):
+        path = os.path.join(self.db_folder, f"{self.db_name}_manifest.json")
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
 
+    def save_manifest(self, versions: dict):
+        path = os.path.join(self.db_folder, f"{self.db_name}_manifest.json")
+        manifest = {
+            "database": self.database,
+            "generated_at": datetime.utcnow().isoformat(),
+            "tables": versions
+        }
         with open(path, "w", encoding="utf-8") as f:
-            json.dump(schema, f, indent=2, ensure_ascii=False, default=default)
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
 
     # Βοηθητική μέθοδος για αριθμό πινάκων
     def get_table_count(self):
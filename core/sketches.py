@@ -0,0 +1,92 @@
+# ----------------------------- core/sketches.py -----------------------------
+import math
+import hashlib
+
+
+def _hash64(value) -> int:
+    # Σταθερό hash ανάμεσα σε runs (το hash() της Python είναι randomized για str)
+    data = repr(value).encode("utf-8", "surrogatepass")
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "big")
+
+
+class HyperLogLog:
+    """
+    HyperLogLog sketch για εκτίμηση πλήθους διακριτών τιμών με σταθερή μνήμη
+    (2^p bytes). Σχετικό standard error ≈ 1.04 / sqrt(2^p).
+    """
+    def __init__(self, p: int = 12):
+        if not 4 <= p <= 16:
+            raise ValueError("HyperLogLog precision p must be between 4 and 16")
+        self.p = p
+        self.m = 1 << p
+        self.registers = bytearray(self.m)
+
+    @property
+    def relative_error(self) -> float:
+        return 1.04 / math.sqrt(self.m)
+
+    def add(self, value):
+        h = _hash64(value)
+        idx = h >> (64 - self.p)
+        w = h & ((1 << (64 - self.p)) - 1)
+        rank = (64 - self.p) - w.bit_length() + 1
+        if rank > self.registers[idx]:
+            self.registers[idx] = rank
+
+    def count(self) -> float:
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+
+        # Small-range correction (linear counting)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+        return estimate
+
+
+class SpaceSaving:
+    """
+    Heavy-hitters sketch (Space-Saving) με k counters. Κάθε counter κρατά count
+    και το μέγιστο σφάλμα υπερεκτίμησης (error), άρα count - error <= πραγματικό <= count.
+    """
+    def __init__(self, k: int = 64):
+        self.k = k
+        self.counters = {}
+
+    def add(self, value):
+        key = _HashableValue(value)
+        counters = self.counters
+        if key in counters:
+            counters[key][0] += 1
+        elif len(counters) < self.k:
+            counters[key] = [1, 0]
+        else:
+            victim = min(counters, key=lambda v: counters[v][0])
+            count, _ = counters.pop(victim)
+            counters[key] = [count + 1, count]
+
+    def top(self, n: int):
+        """[(value, count, error)] ταξινομημένα κατά count."""
+        items = list(self.counters.items())
+        try:
+            # Όπως στο full mode: count DESC και μετά τιμή (NULL πρώτα)
+            items.sort(key=lambda kv: (-kv[1][0], kv[0].value is not None, 0 if kv[0].value is None else kv[0].value))
+        except TypeError:
+            items.sort(key=lambda kv: (-kv[1][0], kv[0].key))
+        return [(key.value, count, error) for key, (count, error) in items[:n]]
+
+
+class _HashableValue:
+    # Τιμές του driver (π.χ. bytearray) δεν είναι πάντα hashable
+    __slots__ = ("value", "key")
+
+    def __init__(self, value):
+        self.value = value
+        self.key = (type(value).__name__, repr(value))
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __eq__(self, other):
+        return self.key == other.key
@@ -0,0 +1,343 @@
+# ----------------------------- core/sql_grammar.py -----------------------------
+"""
+GBNF grammar (llama.cpp) για constrained decoding του SQL: ένα SELECT statement μόνο
+με πραγματικά schema.table και ονόματα στηλών, που τελειώνει στο ;. Με το grammar το
+μοντέλο δεν μπορεί να γράψει κείμενο, δεύτερο statement ή πίνακα που δεν υπάρχει,
+και το llama.cpp σταματά μόλις κλείσει το statement.
+
+Τα aliases δεν δένονται σε πίνακα (το GBNF είναι context-free): το o.Col επιτρέπεται
+αν η Col είναι στήλη κάποιου από τους πίνακες του grammar. Τα aliases πινάκων ξεκινούν
+με πεζό, ώστε να μη συμπίπτουν με τα keywords, που είναι κεφαλαία.
+
+Το GrammarMatcher διαβάζει το ίδιο GBNF κείμενο στην Python: έλεγχος του grammar χωρίς
+llama.cpp, έλεγχος ενός SQL και το constrained decoding του StubLLM.
+"""
+import re
+import os
+from collections import OrderedDict
+
+SQL_GRAMMAR_RULES = r'''
+root ::= select ows ";"
+select ::= "SELECT" (sp "DISTINCT")? (sp "TOP" sp number)? sp select-list (sp "FROM" sp from-list (sp join)*)? (sp "WHERE" sp expr)? (sp "GROUP BY" sp expr-list)? (sp "HAVING" sp expr)? (sp "ORDER BY" sp order-list)?
+select-list ::= select-item (ows "," ows select-item)*
+select-item ::= "*" | alias ".*" | expr (sp "AS" sp label | sp alias)?
+from-list ::= from-item (ows "," ows from-item)*
+from-item ::= (table | "(" ows select ows ")") (sp ("AS" sp)? alias)?
+join ::= (("INNER" | ("LEFT" | "RIGHT" | "FULL") (sp "OUTER")?) sp)? "JOIN" sp from-item sp "ON" sp expr | "CROSS JOIN" sp from-item
+order-list ::= order-item (ows "," ows order-item)*
+order-item ::= (expr | label) (sp ("ASC" | "DESC"))?
+expr-list ::= expr (ows "," ows expr)*
+expr ::= conjunction (sp "OR" sp conjunction)*
+conjunction ::= condition (sp "AND" sp condition)*
+condition ::= "NOT" sp condition | "EXISTS" ows "(" ows select ows ")" | value predicate?
+predicate ::= ows compare ows value | sp "IS" sp ("NOT" sp)? "NULL" | sp ("NOT" sp)? ("IN" ows "(" ows (select | expr-list) ows ")" | "BETWEEN" sp value sp "AND" sp value | "LIKE" sp value)
+compare ::= "=" | "<>" | "!=" | "<=" | ">=" | "<" | ">"
+value ::= term (ows arith ows term)*
+arith ::= "+" | "-" | "*" | "/" | "%"
+term ::= literal | column-ref | function | case | cast | date-part | "(" ows (select | expr) ows ")" | "-" term
+column-ref ::= ((table | alias) ".")? column
+function ::= function-name ows "(" ows ("*" | ("DISTINCT" sp)? expr-list)? ows ")" (sp "OVER" ows "(" ows ("PARTITION BY" sp expr-list)? ows ("ORDER BY" sp order-list)? ows ")")?
+function-name ::= "COUNT" | "SUM" | "AVG" | "MIN" | "MAX" | "COALESCE" | "ISNULL" | "NULLIF" | "ABS" | "ROUND" | "FLOOR" | "CEILING" | "UPPER" | "LOWER" | "LEN" | "LTRIM" | "RTRIM" | "TRIM" | "SUBSTRING" | "LEFT" | "RIGHT" | "REPLACE" | "CONCAT" | "YEAR" | "MONTH" | "DAY" | "DATEADD" | "DATEDIFF" | "DATEPART" | "DATENAME" | "EOMONTH" | "GETDATE" | "SYSDATETIME" | "FORMAT" | "ROW_NUMBER" | "RANK" | "DENSE_RANK"
+case ::= "CASE" (sp value)? (sp "WHEN" sp expr sp "THEN" sp expr)+ (sp "ELSE" sp expr)? sp "END"
+cast ::= ("CAST" | "TRY_CAST") ows "(" ows expr sp "AS" sp data-type ows ")" | ("CONVERT" | "TRY_CONVERT") ows "(" ows data-type ows "," ows expr (ows "," ows number)? ows ")"
+data-type ::= ("INT" | "BIGINT" | "SMALLINT" | "TINYINT" | "BIT" | "DECIMAL" | "NUMERIC" | "FLOAT" | "REAL" | "MONEY" | "DATE" | "DATETIME" | "DATETIME2" | "TIME" | "CHAR" | "VARCHAR" | "NCHAR" | "NVARCHAR") (ows "(" ows (number | "MAX") (ows "," ows number)? ows ")")?
+date-part ::= "year" | "quarter" | "month" | "week" | "day" | "hour" | "minute" | "second"
+literal ::= number | "N"? string | "NULL"
+number ::= [0-9]+ ("." [0-9]+)?
+string ::= "'" ([^'] | "''")* "'"
+alias ::= [a-z_] [A-Za-z0-9_]*
+label ::= [A-Za-z_] [A-Za-z0-9_]* | "[" [^\]]+ "]"
+sp ::= " " | "\n" indent
+ows ::= sp?
+indent ::= ("  " ("  " ("  " "  "?)?)?)?
+'''.strip()
+
+_PLAIN_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def _literal(text: str) -> str:
+    escaped = text.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n").replace("\t", "\\t")
+    return f'"{escaped}"'
+
+
+def _alternatives(words) -> str:
+    """
+    Τα words ως radix tree: κάθε κοινό prefix γράφεται μία φορά, ώστε το llama.cpp
+    να κρατά λίγα stacks ανά token αντί για ένα ανά όνομα.
+    """
+    groups = OrderedDict()
+    for word in words:
+        groups.setdefault(word[:1], []).append(word)
+    optional = groups.pop("", None) is not None
+    alternatives = []
+    for group in groups.values():
+        prefix = os.path.commonprefix(group)
+        rest = [word[len(prefix):] for word in group]
+        alternatives.append(_literal(prefix) if len(rest) == 1 else f"{_literal(prefix)} {_alternatives(rest)}")
+    body = " | ".join(alternatives)
+    if optional:
+        return f"({body})?"
+    return f"({body})" if len(alternatives) > 1 else body
+
+
+def _identifier_forms(name: str):
+    # [name] πάντα, name μόνο αν δεν χρειάζεται brackets
+    forms = [f"[{name}]"]
+    if _PLAIN_IDENTIFIER.match(name):
+        forms.append(name)
+    return forms
+
+
+def build_sql_grammar(tables) -> str:
+    """
+    GBNF για ένα SELECT πάνω στους tables: iterable από ("schema.table", [στήλες]).
+    None αν δεν υπάρχει κανένας πίνακας.
+    """
+    table_names, column_names = set(), set()
+    for key, columns in tables:
+        schema, _, table = key.partition(".")
+        for s in _identifier_forms(schema):
+            for t in _identifier_forms(table):
+                table_names.add(f"{s}.{t}")
+        for column in columns:
+            column_names.update(_identifier_forms(column))
+    if not table_names:
+        return None
+    if not column_names:
+        column_names.add("*")
+    return "\n".join([
+        SQL_GRAMMAR_RULES,
+        f"table ::= {_alternatives(sorted(table_names))}",
+        f"column ::= {_alternatives(sorted(column_names))}",
+    ]) + "\n"
+
+
+def llm_grammar(llm, gbnf: str):
+    """
+    Το grammar στη μορφή που δέχεται το llm: LlamaGrammar για το llama_cpp.Llama,
+    το GBNF κείμενο για RemoteLLM/StubLLM (το μεταγλωττίζει ο LLM server).
+    """
+    if type(llm).__module__.split(".")[0] != "llama_cpp":
+        return gbnf
+    compiled = _llama_grammars.get(gbnf)
+    if compiled is None:
+        from llama_cpp import LlamaGrammar
+        compiled = LlamaGrammar.from_string(gbnf, verbose=False)
+        _llama_grammars[gbnf] = compiled
+        if len(_llama_grammars) > 32:
+            _llama_grammars.popitem(last=False)
+    else:
+        _llama_grammars.move_to_end(gbnf)
+    return compiled
+
+
+_llama_grammars = OrderedDict()
+
+
+# ---------------- GBNF στην Python ----------------
+_TOKEN = re.compile(r'''
+    (?P<space>\s+|\#[^\n]*)
+  | (?P<define>::=)
+  | (?P<name>[A-Za-z0-9-]+)
+  | (?P<literal>"(?:\\.|[^"\\])*")
+  | (?P<cls>\[(?:\\.|[^\]\\])*\])
+  | (?P<op>[()|*+?])
+''', re.VERBOSE)
+
+_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "\\": "\\", '"': '"', "]": "]", "[": "[", "-": "-", "^": "^"}
+
+
+def _unescape(body: str):
+    """Τα chars ενός literal ή class, με τα escapes του GBNF (\\n, \\t, \\xHH, \\uHHHH)."""
+    chars, i = [], 0
+    while i < len(body):
+        ch = body[i]
+        if ch == "\\" and i + 1 < len(body):
+            code = body[i + 1]
+            if code in "xuU":
+                width = {"x": 2, "u": 4, "U": 8}[code]
+                chars.append((chr(int(body[i + 2:i + 2 + width], 16)), True))
+                i += 2 + width
+                continue
+            chars.append((_ESCAPES.get(code, code), True))
+            i += 2
+            continue
+        chars.append((ch, False))
+        i += 1
+    return chars
+
+
+def _char_class(text: str):
+    chars = _unescape(text[1:-1])
+    negate = bool(chars) and chars[0] == ("^", False)
+    if negate:
+        chars = chars[1:]
+    ranges, i = [], 0
+    while i < len(chars):
+        lo = chars[i][0]
+        if i + 2 < len(chars) and chars[i + 1] == ("-", False):
+            ranges.append((lo, chars[i + 2][0]))
+            i += 3
+        else:
+            ranges.append((lo, lo))
+            i += 1
+    return ("cls", negate, tuple(ranges))
+
+
+def parse_gbnf(text: str) -> dict:
+    """
+    {rule: node} από GBNF κείμενο. Nodes: ("lit", s), ("cls", negate, ranges), ("ref", name),
+    ("seq", nodes), ("alt", nodes), ("rep", node, min, max). ValueError σε λάθος σύνταξη
+    ή αναφορά σε rule που δεν ορίζεται.
+    """
+    tokens, pos = [], 0
+    while pos < len(text):
+        match = _TOKEN.match(text, pos)
+        if match is None:
+            raise ValueError(f"Invalid grammar text at offset {pos}: {text[pos:pos + 20]!r}")
+        if match.lastgroup != "space":
+            tokens.append((match.lastgroup, match.group()))
+        pos = match.end()
+
+    pos = 0
+
+    def peek(offset=0):
+        return tokens[pos + offset] if pos + offset < len(tokens) else (None, None)
+
+    def rule_start():
+        return peek()[0] == "name" and peek(1)[0] == "define"
+
+    def alternation():
+        nonlocal pos
+        options = [sequence()]
+        while peek() == ("op", "|"):
+            pos += 1
+            options.append(sequence())
+        return options[0] if len(options) == 1 else ("alt", tuple(options))
+
+    def sequence():
+        nonlocal pos
+        items = []
+        while True:
+            kind, value = peek()
+            if kind is None or rule_start() or value in ("|", ")"):
+                break
+            if kind == "literal":
+                node = ("lit", "".join(ch for ch, _ in _unescape(value[1:-1])))
+            elif kind == "cls":
+                node = _char_class(value)
+            elif kind == "name":
+                node = ("ref", value)
+            elif value == "(":
+                pos += 1
+                node = alternation()
+                if peek() != ("op", ")"):
+                    raise ValueError(f"Expected ) at token {pos}")
+            else:
+                raise ValueError(f"Unexpected {value!r} at token {pos}")
+            pos += 1
+            while peek()[1] in ("*", "+", "?"):
+                node = ("rep", node, 0 if peek()[1] != "+" else 1, 1 if peek()[1] == "?" else None)
+                pos += 1
+            items.append(node)
+        return items[0] if len(items) == 1 else ("seq", tuple(items))
+
+    rules = {}
+    while pos < len(tokens):
+        if not rule_start():
+            raise ValueError(f"Expected rule definition at token {pos}: {peek()[1]!r}")
+        name = tokens[pos][1]
+        pos += 2
+        rules[name] = alternation()
+
+    def check(node):
+        if node[0] == "ref" and node[1] not in rules:
+            raise ValueError(f"Undefined rule: {node[1]}")
+        if node[0] in ("seq", "alt"):
+            for child in node[1]:
+                check(child)
+        elif node[0] == "rep":
+            check(node[1])
+
+    if "root" not in rules:
+        raise ValueError("Grammar has no root rule")
+    for node in rules.values():
+        check(node)
+    return rules
+
+
+class GrammarMatcher:
+    """
+    Recognizer για ένα GBNF grammar: complete(text) αν το text ανήκει στη γλώσσα,
+    viable(text) αν μπορεί να συνεχιστεί ώστε να ανήκει (όπως ελέγχει το llama.cpp
+    κάθε token). Οι θέσεις τέλους ανά (rule, θέση) κρατιούνται, οπότε οι ασάφειες
+    του grammar δεν κοστίζουν εκθετικά.
+    """
+    def __init__(self, grammar):
+        self.rules = parse_gbnf(grammar) if isinstance(grammar, str) else grammar
+
+    @classmethod
+    def for_tables(cls, tables):
+        gbnf = build_sql_grammar(tables)
+        return cls(gbnf) if gbnf else None
+
+    def _ends(self, text):
+        self._text = text
+        self._memo = {}
+        self._partial = False
+        try:
+            return self._match(("ref", "root"), 0)
+        finally:
+            self._memo = None
+
+    def complete(self, text: str) -> bool:
+        return len(text) in self._ends(text)
+
+    def viable(self, text: str) -> bool:
+        ends = self._ends(text)
+        return self._partial or len(text) in ends
+
+    def _match(self, node, pos):
+        kind, text = node[0], self._text
+        if kind == "lit":
+            literal = node[1]
+            if text.startswith(literal, pos):
+                return {pos + len(literal)}
+            if literal.startswith(text[pos:]):
+                self._partial = True
+            return set()
+        if kind == "cls":
+            if pos >= len(text):
+                self._partial = True
+                return set()
+            ch = text[pos]
+            inside = any(lo <= ch <= hi for lo, hi in node[2])
+            return {pos + 1} if inside != node[1] else set()
+        if kind == "ref":
+            key = (node[1], pos)
+            ends = self._memo.get(key)
+            if ends is None:
+                self._memo[key] = set()  # φρουρός για αναδρομή χωρίς κατανάλωση
+                ends = self._memo[key] = self._match(self.rules[node[1]], pos)
+            return ends
+        if kind == "seq":
+            positions = {pos}
+            for child in node[1]:
+                positions = set().union(*(self._match(child, p) for p in positions))
+                if not positions:
+                    break
+            return positions
+        if kind == "alt":
+            return set().union(*(self._match(child, pos) for child in node[1]))
+        # rep
+        child, low, high = node[1], node[2], node[3]
+        ends = {pos} if low == 0 else set()
+        frontier, seen, count = {pos}, {pos}, 0
+        while frontier and (high is None or count < high):
+            frontier = set().union(*(self._match(child, p) for p in frontier)) - (seen if count + 1 >= low else set())
+            count += 1
+            if count >= low:
+                ends |= frontier
+            seen |= frontier
+        return ends
+
@@ -1,22 +1,43 @@
 import os
 import json
-import pyodbc
-import datetime
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
 
+from core.connection_pool import ConnectionPool
+from core.stats_profiler import TableProfiler, get_dialect
+from core.instrumentation import instrumentation
+
 class StatsCollector:
-    def __init__(self, base_path: str, db_name: str, mode="full"):
+    def __init__(self, base_path: str, db_name: str, mode="full", dialect="sqlserver", connect=None,
+                 workers: int = 1, table_timeout: float = None, sample_rows: int = 10000,
+                 distinct_limit: int = 0):
         """
-        mode: "full", "light", "none"
+        mode: "full", "approx", "light", "none"
+        dialect: "sqlserver" ή "sqlite" (τοπικό stand-in για benchmarks)
+        connect: προαιρετικό callable που επιστρέφει DB-API connection
+        workers: πόσοι πίνακες γίνονται profile παράλληλα (ένα connection ανά worker)
+        table_timeout: δευτερόλεπτα ανά πίνακα (None = χωρίς όριο)
+        sample_rows: μέγεθος δείγματος ανά πίνακα για mode="approx"
+        distinct_limit: στο mode="full", όλες οι τιμές των κειμενικών στηλών με έως τόσες
+        διακριτές τιμές γράφονται στο "values" της στήλης (0 = μόνο τα top_values)
         """
         self.base_path = base_path
         self.db_name = db_name
         self.mode = mode.lower()
+        self.workers = max(1, int(workers))
+        self.table_timeout = table_timeout
+        self.sample_rows = sample_rows
+        self.distinct_limit = distinct_limit
 
         # Φάκελος databases/<DB_NAME>
         self.db_folder = os.path.join(base_path, "databases", db_name)
         os.makedirs(self.db_folder, exist_ok=True)
 
+        self.dialect = get_dialect(dialect)
+        self.connect = connect
+
         load_dotenv(os.path.join(base_path, ".env"))
 
         self.driver = os.getenv("DB_DRIVER")
@@ -25,12 +46,31 @@ class StatsCollector:
         self.user = os.getenv("DB_USER")
         self.password = os.getenv("DB_PASSWORD")
 
-        if not all([self.driver, self.server, self.database, self.user, self.password]):
+        if connect is None and not all([self.driver, self.server, self.database, self.user, self.password]):
             raise RuntimeError("Λείπουν στοιχεία σύνδεσης από το .env")
 
-        self.conn = self._connect()
+        self._conn = None
+        self._profiler = None
+
+    @property
+    def conn(self):
+        # Όπως στο SchemaLoader: καμία σύνδεση όταν το <db>_stats.json υπάρχει ήδη
+        if self._conn is None:
+            self._conn = self._connect()
+        return self._conn
+
+    @property
+    def profiler(self):
+        if self._profiler is None:
+            self._profiler = TableProfiler(self.conn, self.dialect, timeout=self.table_timeout,
+                                           sample_rows=self.sample_rows, distinct_limit=self.distinct_limit)
+        return self._profiler
 
     def _connect(self):
+        if self.connect is not None:
+            return self.connect()
+
+        import pyodbc
         conn_str = (
             f"DRIVER={{{self.driver}}};"
             f"SERVER={self.server};"
@@ -53,95 +93,101 @@ class StatsCollector:
             with open(stats_file, "r", encoding="utf-8") as f:
                 return json.load(f)
 
-        cursor = self.conn.cursor()
         stats = {}
 
-        # Get all tables
-        cursor.execute("""
-            SELECT s.name AS schema_name, t.name AS table_name
-            FROM sys.tables t
-            JOIN sys.schemas s ON t.schema_id = s.schema_id
-        """)
-        tables = cursor.fetchall()
-
-        for row in tables:
-            schema, table = row.schema_name, row.table_name
-            table_key = f"{schema}.{table}"
-            table_stat = {}
-
-            # Row count always
-            cursor.execute(f"SELECT COUNT(*) FROM [{schema}].[{table}]")
-            table_stat["row_count"] = cursor.fetchone()[0]
-
-            # Column info always
-            cursor.execute(f"""
-                SELECT c.name, t.name AS type_name
-                FROM sys.columns c
-                JOIN sys.types t ON c.user_type_id = t.user_type_id
-                WHERE c.object_id = OBJECT_ID('{schema}.{table}')
-            """)
-            columns = cursor.fetchall()
-            table_stat["column_count"] = len(columns)
-
-            if self.mode == "full":
-                table_stat["columns"] = {}
-                for col_name, col_type in columns:
-                    col_stat = {"type": col_type}
-                    # Unique and null counts
-                    try:
-                        cursor.execute(f"SELECT COUNT(DISTINCT [{col_name}]), SUM(CASE WHEN [{col_name}] IS NULL THEN 1 ELSE 0 END) FROM [{schema}].[{table}]")
-                        unique_count, null_count = cursor.fetchone()
-                        col_stat["unique_count"] = unique_count
-                        col_stat["null_count"] = null_count
-                    except Exception:
-                        col_stat["unique_count"] = col_stat["null_count"] = None
-
-                    # Top 5 values
-                    try:
-                        cursor.execute(f"""
-                            SELECT TOP 5 [{col_name}], COUNT(*) AS cnt
-                            FROM [{schema}].[{table}]
-                            GROUP BY [{col_name}]
-                            ORDER BY cnt DESC
-                        """)
-                        top_vals = []
-                        for v, c in cursor.fetchall():
-                            if isinstance(v, (datetime.date, datetime.datetime)):
-                                v = v.isoformat()
-                            top_vals.append({"value": v, "count": c})
-                        col_stat["top_values"] = top_vals
-                    except Exception:
-                        col_stat["top_values"] = []
-
-                    # Min/max/avg for numeric and date
-                    try:
-                        cursor.execute(f"SELECT MIN([{col_name}]), MAX([{col_name}]), AVG([{col_name}]) FROM [{schema}].[{table}]")
-                        min_val, max_val, avg_val = cursor.fetchone()
-
-                        # Αν datetime ή date -> string
-                        if isinstance(min_val, (datetime.date, datetime.datetime)):
-                            min_val = min_val.isoformat()
-                        if isinstance(max_val, (datetime.date, datetime.datetime)):
-                            max_val = max_val.isoformat()
-                        if isinstance(avg_val, (datetime.date, datetime.datetime)):
-                            avg_val = avg_val.isoformat()
-
-                        col_stat["min"] = min_val
-                        col_stat["max"] = max_val
-                        col_stat["avg"] = avg_val
-                    except Exception:
-                        col_stat["min"] = col_stat["max"] = col_stat["avg"] = None
-
-                    table_stat["columns"][col_name] = col_stat
-
-            # Importance score for light and full
-            table_stat["importance_score"] = table_stat["row_count"] * table_stat["column_count"]
-
-            stats[table_key] = table_stat
+        with instrumentation.span("stats.collect", database=self.db_name, mode=self.mode,
+                                  workers=self.workers) as span:
+            # Όλοι οι πίνακες (με row counts από metadata) και όλες οι στήλες με δύο queries
+            tables = self.profiler.list_tables()
+            columns = self.profiler.list_columns()
+            span.set(tables=len(tables))
+            results = self._profile_tables(tables, columns)
+
+        # Πάντα με τη σειρά του catalog, ώστε το JSON να είναι ίδιο με το serial
+        for schema, table, _ in tables:
+            stats[f"{schema}.{table}"] = results[(schema, table)]
+
+        self._save(stats)
+        return stats
 
+    def refresh_tables(self, table_keys, removed_keys=()):
+        """
+        Incremental refresh: ξανακάνει profile μόνο τους πίνακες table_keys
+        και ενημερώνει το υπάρχον <db>_stats.json.
+        """
+        if self.mode == "none":
+            return {}
+
+        stats_file = os.path.join(self.db_folder, f"{self.db_name}_stats.json")
+        stats = {}
+        if os.path.exists(stats_file):
+            with open(stats_file, "r", encoding="utf-8") as f:
+                stats = json.load(f)
+
+        for key in removed_keys:
+            stats.pop(key, None)
+
+        wanted = set(table_keys)
+        with instrumentation.span("stats.refresh", database=self.db_name, mode=self.mode) as span:
+            tables = [t for t in self.profiler.list_tables() if f"{t[0]}.{t[1]}" in wanted]
+            span.set(tables=len(tables))
+            if tables:
+                results = self._profile_tables(tables, self.profiler.list_columns())
+                for schema, table, _ in tables:
+                    stats[f"{schema}.{table}"] = results[(schema, table)]
+
+        self._save(stats)
+        return stats
+
+    def _profile_tables(self, tables, columns):
+        if self.workers > 1:
+            return self._profile_parallel(tables, columns)
+
+        results = {}
+        for schema, table, row_count in tables:
+            results[(schema, table)] = self.profiler.profile(
+                schema, table, columns.get((schema, table), []),
+                mode=self.mode, row_count=row_count
+            )
+        return results
+
+    def _save(self, stats: dict):
         # Save JSON στο φάκελο της βάσης
+        stats_file = os.path.join(self.db_folder, f"{self.db_name}_stats.json")
         with open(stats_file, "w", encoding="utf-8") as f:
             json.dump(stats, f, indent=2, ensure_ascii=False)
 
         print(f"Stats JSON saved at: {stats_file}")
-        return stats
+
+    def _profile_parallel(self, tables, columns):
+        pool = ConnectionPool(self._connect, self.workers)
+        local = threading.local()
+
+        def profile_table(schema, table, row_count):
+            profiler = getattr(local, "profiler", None)
+            if profiler is None:
+                profiler = local.profiler = TableProfiler(
+                    pool.get(), self.dialect, timeout=self.table_timeout, sample_rows=self.sample_rows,
+                    distinct_limit=self.distinct_limit
+                )
+            return profiler.profile(
+                schema, table, columns.get((schema, table), []),
+                mode=self.mode, row_count=row_count
+            )
+
+        # Οι μεγαλύτεροι πίνακες πρώτοι, για να μη μείνει ένας τεράστιος στο τέλος
+        ordered = sorted(tables, key=lambda t: t[2] or 0, reverse=True)
+
+        results = {}
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                # Κάθε πίνακας με αντίγραφο του context, ώστε τα spans του να είναι κάτω από το stats.collect
+                futures = {
+                    executor.submit(contextvars.copy_context().run, profile_table, schema, table, row_count): (schema, table)
+                    for schema, table, row_count in ordered
+                }
+                for future in as_completed(futures):
+                    results[futures[future]] = future.result()
+        finally:
+            pool.close_all()
+        return results
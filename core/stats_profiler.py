@@ -0,0 +1,624 @@
+# ----------------------------- core/stats_profiler.py -----------------------------
+import math
+import time
+import datetime
+import threading
+from decimal import Decimal
+
+from core.sketches import HyperLogLog, SpaceSaving
+from core.instrumentation import instrumentation, hot_path
+
+# Τύποι του SQL Server όπου τα MIN/MAX/AVG έχουν νόημα (και δεν σκάει το AVG)
+NUMERIC_TYPES = {
+    "tinyint", "smallint", "int", "bigint", "decimal", "numeric",
+    "money", "smallmoney", "float", "real"
+}
+
+# Τύποι που δεν υποστηρίζουν COUNT(DISTINCT) / GROUP BY
+NON_COMPARABLE_TYPES = {"text", "ntext", "image", "xml", "geography", "geometry"}
+
+
+def to_json_value(value):
+    """Μετατρέπει τιμές του driver σε κάτι που γράφεται σε JSON."""
+    if isinstance(value, (datetime.date, datetime.datetime, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return bytes(value).hex()
+    return value
+
+
+class SqlServerDialect:
+    """SQL που χρησιμοποιεί ο profiler στον SQL Server."""
+    name = "sqlserver"
+
+    def quote(self, identifier):
+        return "[" + identifier.replace("]", "]]") + "]"
+
+    def table_ref(self, schema, table):
+        return f"{self.quote(schema)}.{self.quote(table)}"
+
+    def is_numeric(self, type_name):
+        return type_name.lower() in NUMERIC_TYPES
+
+    def is_comparable(self, type_name):
+        return type_name.lower() not in NON_COMPARABLE_TYPES
+
+    def tables_sql(self):
+        # Row counts από metadata: καμία σάρωση πίνακα
+        return """
+            SELECT s.name AS schema_name, t.name AS table_name, SUM(p.row_count) AS row_count
+            FROM sys.tables t
+            JOIN sys.schemas s ON t.schema_id = s.schema_id
+            LEFT JOIN sys.dm_db_partition_stats p
+                ON p.object_id = t.object_id AND p.index_id IN (0, 1)
+            GROUP BY t.object_id, s.name, t.name
+            ORDER BY t.object_id
+        """
+
+    def tables_fallback_sql(self):
+        # Χωρίς VIEW DATABASE STATE δεν διαβάζεται το dm_db_partition_stats
+        return """
+            SELECT s.name AS schema_name, t.name AS table_name, NULL AS row_count
+            FROM sys.tables t
+            JOIN sys.schemas s ON t.schema_id = s.schema_id
+            ORDER BY t.object_id
+        """
+
+    def columns_sql(self):
+        return """
+            SELECT s.name AS schema_name, t.name AS table_name, c.name AS column_name, ty.name AS type_name
+            FROM sys.columns c
+            JOIN sys.tables t ON c.object_id = t.object_id
+            JOIN sys.schemas s ON t.schema_id = s.schema_id
+            JOIN sys.types ty ON c.user_type_id = ty.user_type_id
+            ORDER BY t.object_id, c.column_id
+        """
+
+    def top_values_sql(self, schema, table, columns, top_n):
+        """
+        Ένα batch με ένα SELECT TOP n ανά στήλη: ένα round-trip, τα result sets
+        διαβάζονται με nextset() ώστε κάθε στήλη να κρατά τον δικό της τύπο.
+        """
+        ref = self.table_ref(schema, table)
+        statements = []
+        for col_name in columns:
+            col = self.quote(col_name)
+            statements.append(
+                f"SELECT TOP {int(top_n)} {col}, COUNT(*) AS cnt FROM {ref} GROUP BY {col} ORDER BY cnt DESC, {col};"
+            )
+        return "\n".join(statements)
+
+    def read_top_values(self, cursor, columns):
+        results = {}
+        for i, col_name in enumerate(columns):
+            if i > 0 and not cursor.nextset():
+                raise RuntimeError("Top values batch returned fewer result sets than expected")
+            results[col_name] = [(v, c) for v, c in cursor.fetchall()]
+        return results
+
+    def sample_sql(self, schema, table, columns, sample_rows, row_count):
+        ref = self.table_ref(schema, table)
+        cols = ", ".join(self.quote(c) for c in columns)
+        if not row_count or row_count <= sample_rows:
+            return f"SELECT TOP ({int(sample_rows)}) {cols} FROM {ref}"
+        # Το TOP είναι μόνο όριο ασφαλείας: αν κόψει νωρίς, το δείγμα γέρνει προς τις πρώτες σελίδες
+        percent = 100.0 * sample_rows / row_count
+        return f"SELECT TOP ({2 * int(sample_rows)}) {cols} FROM {ref} TABLESAMPLE SYSTEM ({percent:.6f} PERCENT)"
+
+    def cancel(self, conn, cursor):
+        # Ακυρώνει το statement που τρέχει σε άλλο thread
+        if cursor is not None:
+            cursor.cancel()
+
+
+class SqliteDialect:
+    """Τοπικό stand-in σε SQLite για benchmarks χωρίς SQL Server."""
+    name = "sqlite"
+
+    def quote(self, identifier):
+        return '"' + identifier.replace('"', '""') + '"'
+
+    def table_ref(self, schema, table):
+        return self.quote(table)
+
+    def is_numeric(self, type_name):
+        # Κανόνες affinity της SQLite
+        t = (type_name or "").lower()
+        return any(k in t for k in ("int", "real", "floa", "doub", "dec", "num"))
+
+    def is_comparable(self, type_name):
+        return (type_name or "").lower() != "blob"
+
+    def tables_sql(self):
+        # Η SQLite δεν κρατά row counts στο catalog
+        return """
+            SELECT 'main' AS schema_name, name AS table_name, NULL AS row_count
+            FROM sqlite_master
+            WHERE type = 'table' AND name NOT LIKE 'sqlite_%'
+            ORDER BY rowid
+        """
+
+    def tables_fallback_sql(self):
+        return self.tables_sql()
+
+    def columns_sql(self):
+        return """
+            SELECT 'main' AS schema_name, m.name AS table_name, p.name AS column_name, p.type AS type_name
+            FROM sqlite_master m
+            JOIN pragma_table_info(m.name) p
+            WHERE m.type = 'table' AND m.name NOT LIKE 'sqlite_%'
+            ORDER BY m.rowid, p.cid
+        """
+
+    def top_values_sql(self, schema, table, columns, top_n):
+        # Η SQLite δεν δέχεται πολλά statements σε ένα execute, αλλά είναι
+        # dynamically typed, οπότε ένα UNION ALL αρκεί για ένα round-trip.
+        ref = self.table_ref(schema, table)
+        parts = []
+        for i, col_name in enumerate(columns):
+            col = self.quote(col_name)
+            parts.append(
+                f"SELECT {i} AS col_idx, value, cnt FROM ("
+                f"SELECT {col} AS value, COUNT(*) AS cnt FROM {ref} GROUP BY {col} ORDER BY cnt DESC, {col} LIMIT {int(top_n)})"
+            )
+        return " UNION ALL ".join(parts)
+
+    def read_top_values(self, cursor, columns):
+        results = {col_name: [] for col_name in columns}
+        for col_idx, value, cnt in cursor.fetchall():
+            results[columns[col_idx]].append((value, cnt))
+        return results
+
+    def sample_sql(self, schema, table, columns, sample_rows, row_count):
+        # Χωρίς TABLESAMPLE: τυχαίο φίλτρο γραμμών, με όριο ασφαλείας στο πλήθος
+        ref = self.table_ref(schema, table)
+        cols = ", ".join(self.quote(c) for c in columns)
+        if not row_count or row_count <= sample_rows:
+            return f"SELECT {cols} FROM {ref} LIMIT {int(sample_rows)}"
+        threshold = int(1_000_000 * sample_rows / row_count)
+        return f"SELECT {cols} FROM {ref} WHERE abs(random()) % 1000000 < {threshold} LIMIT {2 * int(sample_rows)}"
+
+    def cancel(self, conn, cursor):
+        # Το interrupt() επιτρέπεται από άλλο thread
+        conn.interrupt()
+
+
+DIALECTS = {
+    "sqlserver": SqlServerDialect,
+    "sqlite": SqliteDialect,
+}
+
+
+def get_dialect(name):
+    try:
+        return DIALECTS[name.lower()]()
+    except KeyError:
+        raise ValueError(f"Unknown SQL dialect: {name}")
+
+
+class TableTimeout(Exception):
+    """Το profiling ενός πίνακα ξεπέρασε το per-table timeout."""
+
+
+class TableProfiler:
+    """
+    Set-based profiling πίνακα: ένα aggregate statement για distinct/null/min/max/avg
+    όλων των στηλών και ένα batch για τα top values, αντί για 3 σαρώσεις ανά στήλη.
+
+    strategy="per_column" κρατά την παλιά συμπεριφορά (3 queries ανά στήλη) και
+    χρησιμοποιείται και ως fallback όταν αποτύχει το batched statement.
+
+    timeout: δευτερόλεπτα ανά πίνακα. Όταν λήξει, το τρέχον statement ακυρώνεται
+    και ο πίνακας γράφεται μόνο με row/column counts και "timed_out": true.
+
+    mode="approx": profile σε δείγμα ~sample_rows γραμμών με HyperLogLog για
+    τα distinct, Space-Saving για τα top values και error bounds (95%) στο JSON.
+
+    distinct_limit: στο mode="full", οι μη αριθμητικές στήλες με έως distinct_limit
+    διακριτές τιμές (και περισσότερες από top_n) παίρνουν όλες τις τιμές τους στο
+    "values", με ένα ακόμη batch ανά πίνακα (για το core.value_index). 0 = όχι.
+    """
+    def __init__(self, conn, dialect, top_n: int = 5, strategy: str = "batched", timeout: float = None,
+                 sample_rows: int = 10000, distinct_limit: int = 0):
+        if strategy not in ("batched", "per_column"):
+            raise ValueError(f"Unknown profiling strategy: {strategy}")
+        self.conn = conn
+        self.dialect = dialect
+        self.top_n = top_n
+        self.strategy = strategy
+        self.timeout = timeout
+        self.sample_rows = sample_rows
+        self.distinct_limit = distinct_limit
+
+        self._deadline = None
+        self._timed_out = False
+        self._active_cursor = None
+
+    # ---------------- Catalog ----------------
+    def list_tables(self):
+        """[(schema, table, row_count ή None)] με τη σειρά του catalog."""
+        cursor = self.conn.cursor()
+        instrumentation.count("sql_roundtrips")
+        try:
+            cursor.execute(self.dialect.tables_sql())
+        except Exception:
+            cursor = self.conn.cursor()
+            instrumentation.count("sql_roundtrips")
+            cursor.execute(self.dialect.tables_fallback_sql())
+        tables = [(s, t, rc) for s, t, rc in cursor.fetchall()]
+        instrumentation.count("rows_fetched", len(tables))
+        return tables
+
+    def list_columns(self):
+        """{(schema, table): [(column, type)]} για όλη τη βάση με ένα query."""
+        cursor = self.conn.cursor()
+        cursor.execute(self.dialect.columns_sql())
+        rows = cursor.fetchall()
+        instrumentation.count("sql_roundtrips")
+        instrumentation.count("rows_fetched", len(rows))
+        columns = {}
+        for schema, table, col_name, type_name in rows:
+            columns.setdefault((schema, table), []).append((col_name, type_name))
+        return columns
+
+    # ---------------- Profiling ----------------
+    @hot_path("stats.table")
+    def profile(self, schema, table, columns, mode="full", row_count=None) -> dict:
+        with instrumentation.span("stats.table", table=f"{schema}.{table}", mode=mode,
+                                  columns=len(columns)) as span:
+            table_stat = self._profile_with_timeout(schema, table, columns, mode, row_count)
+            if table_stat.get("timed_out"):
+                span.set(timed_out=True)
+        return table_stat
+
+    def _profile_with_timeout(self, schema, table, columns, mode, row_count):
+        timer = None
+        self._timed_out = False
+        self._deadline = None
+        if self.timeout:
+            self._deadline = time.monotonic() + self.timeout
+            timer = threading.Timer(self.timeout, self._cancel)
+            timer.daemon = True
+            timer.start()
+
+        try:
+            table_stat = self._profile(schema, table, columns, mode, row_count)
+        except TableTimeout:
+            print(f"⚠️ Stats for {schema}.{table} timed out after {self.timeout}s")
+            table_stat = {
+                "row_count": row_count,
+                "column_count": len(columns),
+                "timed_out": True,
+                "importance_score": (row_count or 0) * len(columns)
+            }
+        finally:
+            if timer is not None:
+                timer.cancel()
+            self._deadline = None
+            self._active_cursor = None
+        return table_stat
+
+    def _profile(self, schema, table, columns, mode, row_count):
+        table_stat = {}
+
+        if mode == "full":
+            if self.strategy == "batched":
+                try:
+                    row_count, col_stats = self._profile_batched(schema, table, columns)
+                except TableTimeout:
+                    raise
+                except Exception:
+                    row_count, col_stats = self._profile_per_column(schema, table, columns)
+            else:
+                row_count, col_stats = self._profile_per_column(schema, table, columns)
+            if self.distinct_limit:
+                self._add_values(schema, table, columns, col_stats)
+            table_stat["row_count"] = row_count
+            table_stat["column_count"] = len(columns)
+            table_stat["columns"] = col_stats
+        elif mode == "approx":
+            if row_count is None:
+                row_count = self._count_rows(schema, table)
+            sample_size, col_stats = self._profile_approx(schema, table, columns, int(row_count))
+            table_stat["row_count"] = int(row_count)
+            table_stat["column_count"] = len(columns)
+            table_stat["columns"] = col_stats
+            table_stat["approx"] = {
+                "sample_rows": sample_size,
+                "sample_fraction": round(sample_size / row_count, 6) if row_count else 1.0,
+                "confidence": 0.95
+            }
+        else:
+            if row_count is None:
+                row_count = self._count_rows(schema, table)
+            table_stat["row_count"] = int(row_count)
+            table_stat["column_count"] = len(columns)
+
+        # Importance score for light and full
+        table_stat["importance_score"] = table_stat["row_count"] * table_stat["column_count"]
+        return table_stat
+
+    def _cancel(self):
+        self._timed_out = True
+        try:
+            self.dialect.cancel(self.conn, self._active_cursor)
+        except Exception:
+            pass
+
+    def _execute(self, cursor, sql):
+        if self._timed_out or (self._deadline is not None and time.monotonic() >= self._deadline):
+            raise TableTimeout(sql)
+        self._active_cursor = cursor
+        instrumentation.count("sql_roundtrips")
+        try:
+            cursor.execute(sql)
+        except Exception:
+            if self._timed_out:
+                raise TableTimeout(sql) from None
+            raise
+        return cursor
+
+    def _count_rows(self, schema, table):
+        cursor = self.conn.cursor()
+        self._execute(cursor, f"SELECT COUNT(*) FROM {self.dialect.table_ref(schema, table)}")
+        return cursor.fetchone()[0]
+
+    def _profile_batched(self, schema, table, columns):
+        d = self.dialect
+        ref = d.table_ref(schema, table)
+
+        # Ένα aggregate για όλες τις στήλες: COUNT(*) έρχεται δωρεάν στην ίδια σάρωση
+        select = ["COUNT(*)"]
+        layout = []
+        for col_name, col_type in columns:
+            col = d.quote(col_name)
+            fields = []
+            if d.is_comparable(col_type):
+                select.append(f"COUNT(DISTINCT {col})")
+                fields.append("unique_count")
+            # Όπως το per-column query: NULL (όχι 0) σε άδειο πίνακα
+            select.append(f"SUM(CASE WHEN {col} IS NULL THEN 1 ELSE 0 END)")
+            fields.append("null_count")
+            if d.is_numeric(col_type):
+                select.extend([f"MIN({col})", f"MAX({col})", f"AVG({col})"])
+                fields.extend(["min", "max", "avg"])
+            layout.append(fields)
+
+        cursor = self.conn.cursor()
+        self._execute(cursor, f"SELECT {', '.join(select)} FROM {ref}")
+        row = list(cursor.fetchone())
+        row_count = row[0]
+        instrumentation.count("rows_fetched")
+
+        top_values = {}
+        comparable = [c for c, t in columns if d.is_comparable(t)]
+        if comparable:
+            self._execute(cursor, d.top_values_sql(schema, table, comparable, self.top_n))
+            top_values = d.read_top_values(cursor, comparable)
+            instrumentation.count("rows_fetched", sum(len(v) for v in top_values.values()))
+
+        col_stats = {}
+        pos = 1
+        for (col_name, col_type), fields in zip(columns, layout):
+            values = dict(zip(fields, row[pos:pos + len(fields)]))
+            pos += len(fields)
+            col_stats[col_name] = {
+                "type": col_type,
+                "unique_count": values.get("unique_count"),
+                "null_count": values.get("null_count"),
+                "top_values": [
+                    {"value": to_json_value(v), "count": c} for v, c in top_values.get(col_name, [])
+                ],
+                "min": to_json_value(values.get("min")),
+                "max": to_json_value(values.get("max")),
+                "avg": to_json_value(values.get("avg")),
+            }
+        return row_count, col_stats
+
+    def _add_values(self, schema, table, columns, col_stats):
+        """Όλες οι τιμές των κειμενικών στηλών με λίγες διακριτές τιμές, σε ένα batch."""
+        d = self.dialect
+        wanted = [
+            c for c, t in columns
+            if d.is_comparable(t) and not d.is_numeric(t)
+            and self.top_n < (col_stats[c].get("unique_count") or 0) <= self.distinct_limit
+        ]
+        if not wanted:
+            return
+        cursor = self.conn.cursor()
+        try:
+            self._execute(cursor, d.top_values_sql(schema, table, wanted, self.distinct_limit))
+            values = d.read_top_values(cursor, wanted)
+        except TableTimeout:
+            raise
+        except Exception:
+            return
+        instrumentation.count("rows_fetched", sum(len(v) for v in values.values()))
+        for col_name in wanted:
+            col_stats[col_name]["values"] = [
+                {"value": to_json_value(v), "count": c} for v, c in values[col_name] if v is not None
+            ]
+
+    def _profile_per_column(self, schema, table, columns):
+        ref = self.dialect.table_ref(schema, table)
+        cursor = self.conn.cursor()
+        row_count = self._count_rows(schema, table)
+
+        col_stats = {}
+        for col_name, col_type in columns:
+            col = self.dialect.quote(col_name)
+            col_stat = {"type": col_type}
+            # Unique and null counts
+            try:
+                self._execute(cursor, f"SELECT COUNT(DISTINCT {col}), SUM(CASE WHEN {col} IS NULL THEN 1 ELSE 0 END) FROM {ref}")
+                unique_count, null_count = cursor.fetchone()
+                col_stat["unique_count"] = unique_count
+                col_stat["null_count"] = null_count
+            except TableTimeout:
+                raise
+            except Exception:
+                col_stat["unique_count"] = col_stat["null_count"] = None
+
+            # Top values
+            try:
+                self._execute(cursor, self.dialect.top_values_sql(schema, table, [col_name], self.top_n))
+                rows = self.dialect.read_top_values(cursor, [col_name])[col_name]
+                col_stat["top_values"] = [{"value": to_json_value(v), "count": c} for v, c in rows]
+            except TableTimeout:
+                raise
+            except Exception:
+                col_stat["top_values"] = []
+
+            # Min/max/avg for numeric
+            if self.dialect.is_numeric(col_type):
+                try:
+                    self._execute(cursor, f"SELECT MIN({col}), MAX({col}), AVG({col}) FROM {ref}")
+                    min_val, max_val, avg_val = cursor.fetchone()
+                    col_stat["min"] = to_json_value(min_val)
+                    col_stat["max"] = to_json_value(max_val)
+                    col_stat["avg"] = to_json_value(avg_val)
+                except TableTimeout:
+                    raise
+                except Exception:
+                    col_stat["min"] = col_stat["max"] = col_stat["avg"] = None
+            else:
+                col_stat["min"] = col_stat["max"] = col_stat["avg"] = None
+
+            col_stats[col_name] = col_stat
+        return row_count, col_stats
+
+    def _profile_approx(self, schema, table, columns, row_count):
+        d = self.dialect
+        names = [c for c, _ in columns]
+        numeric = [d.is_numeric(t) for _, t in columns]
+        n_cols = len(columns)
+
+        hll = [HyperLogLog() for _ in range(n_cols)]
+        # Δεύτερο HLL στις μισές γραμμές: από το d(n/2) -> d(n) βγαίνει ο ρυθμός αύξησης
+        hll_half = [HyperLogLog() for _ in range(n_cols)]
+        heavy = [SpaceSaving(max(64, 10 * self.top_n)) for _ in range(n_cols)]
+        nulls = [0] * n_cols
+        seen = [0] * n_cols
+        mins = [None] * n_cols
+        maxs = [None] * n_cols
+        sums = [0.0] * n_cols
+        sq_sums = [0.0] * n_cols
+
+        cursor = self.conn.cursor()
+        sample_size = 0
+        queries = [d.sample_sql(schema, table, names, self.sample_rows, row_count)]
+        if row_count > self.sample_rows:
+            # Σε μικρούς πίνακες το TABLESAMPLE μπορεί να μη φέρει καμία σελίδα
+            queries.append(d.sample_sql(schema, table, names, self.sample_rows, None))
+
+        for sql in queries:
+            self._execute(cursor, sql)
+            while True:
+                rows = cursor.fetchmany(1000)
+                if not rows:
+                    break
+                instrumentation.count("rows_fetched", len(rows))
+                for row in rows:
+                    sample_size += 1
+                    for i in range(n_cols):
+                        v = row[i]
+                        heavy[i].add(v)
+                        if v is None:
+                            nulls[i] += 1
+                            continue
+                        hll[i].add(v)
+                        if seen[i] % 2 == 0:
+                            hll_half[i].add(v)
+                        seen[i] += 1
+                        if numeric[i]:
+                            x = float(v)
+                            sums[i] += x
+                            sq_sums[i] += x * x
+                            if mins[i] is None or v < mins[i]:
+                                mins[i] = v
+                            if maxs[i] is None or v > maxs[i]:
+                                maxs[i] = v
+            if sample_size:
+                break
+
+        exact = sample_size >= row_count
+        scale = row_count / sample_size if sample_size else 0.0
+        # Finite population correction
+        fpc = math.sqrt(max(0.0, 1 - sample_size / row_count)) if row_count else 0.0
+        z = 1.96
+
+        col_stats = {}
+        for i, (col_name, col_type) in enumerate(columns):
+            n_null = nulls[i]
+            n_values = sample_size - n_null
+
+            # --- Distinct ---
+            d_full = hll[i].count() if n_values else 0.0
+            rse = hll[i].relative_error
+            if exact or not n_values:
+                unique = min(d_full, n_values)
+                unique_err = z * rse * unique
+            else:
+                # Με D ισοπίθανες τιμές, d(n) = D(1 - e^(-n/D)) άρα d(n)/d(n/2) = 1 + e^(-n/2D).
+                # Λόγος ~2: key-like στήλη, λόγος ~1: οι τιμές έχουν ήδη κορεστεί στο δείγμα.
+                cap = max(d_full, row_count - n_null * scale)
+                ratio = d_full / hll_half[i].count()
+                estimate = -n_values / (2 * math.log(ratio - 1)) if 1.0 < ratio < 2.0 else None
+                if estimate is None or not d_full < estimate < cap:
+                    # Στα άκρα (κορεσμένη ή key-like στήλη) μένει μόνο το σφάλμα του HLL
+                    unique = d_full if ratio <= 1.0 or (estimate is not None and estimate <= d_full) else cap
+                    unique_err = z * rse * unique
+                else:
+                    unique = estimate
+                    ratio_err = math.sqrt(2) * rse * ratio / ((ratio - 1) * abs(math.log(ratio - 1)))
+                    unique_err = z * unique * math.sqrt(rse ** 2 + ratio_err ** 2)
+                    unique_err = min(unique_err, max(unique - d_full, cap - unique))
+
+            # --- Nulls ---
+            p_null = n_null / sample_size if sample_size else 0.0
+            null_count = p_null * row_count
+            null_err = z * row_count * math.sqrt(p_null * (1 - p_null) / sample_size) * fpc if sample_size else 0.0
+
+            # --- Top values ---
+            # Κρατάμε μόνο εγγυημένα heavy hitters: όταν ο sketch έχει γεμίσει, ο μικρότερος
+            # counter είναι το μέγιστο πλήθος που μπορεί να έχει μια τιμή που δεν παρακολουθείται.
+            counters = heavy[i].top(heavy[i].k)
+            floor = counters[-1][1] if len(counters) == heavy[i].k else 0
+            top_values = []
+            for v, c, err in counters:
+                if len(top_values) == self.top_n:
+                    break
+                if c - err <= floor or (c < 2 and not exact):
+                    continue
+                p = c / sample_size
+                sampling_err = z * row_count * math.sqrt(p * (1 - p) / sample_size) * fpc
+                top_values.append({
+                    "value": to_json_value(v),
+                    "count": int(round(c * scale)),
+                    "error": int(math.ceil(err * scale + sampling_err))
+                })
+
+            # --- Min/max/avg (numeric) ---
+            avg = avg_err = None
+            if numeric[i] and n_values:
+                avg = sums[i] / n_values
+                variance = max(0.0, sq_sums[i] / n_values - avg * avg)
+                avg_err = z * math.sqrt(variance / n_values) * fpc
+
+            col_stats[col_name] = {
+                "type": col_type,
+                "unique_count": int(round(unique)),
+                "null_count": int(round(null_count)),
+                "top_values": top_values,
+                "min": to_json_value(mins[i]) if numeric[i] else None,
+                "max": to_json_value(maxs[i]) if numeric[i] else None,
+                "avg": avg,
+                "error": {
+                    "unique_count": int(math.ceil(unique_err)),
+                    "null_count": int(math.ceil(null_err)),
+                    "avg": avg_err
+                }
+            }
+        return sample_size, col_stats
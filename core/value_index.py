@@ -0,0 +1,178 @@
+# ----------------------------- core/value_index.py -----------------------------
+import os
+import re
+import json
+import shutil
+import hashlib
+import unicodedata
+
+import numpy as np
+
+ARRAYS = ("keys", "ptr", "column", "count", "text_ptr")
+# Λέξεις της ερώτησης που δεν ψάχνονται μόνες τους ως τιμές
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "not", "of", "in", "on", "at", "for", "from", "with", "to", "by",
+    "is", "are", "was", "were", "be", "all", "any", "each", "per", "show", "list", "find", "get",
+    "give", "me", "how", "many", "much", "what", "which", "who", "where", "when", "that", "this",
+    "than", "more", "less", "top", "total", "count", "number", "average", "sum"
+}
+
+_TOKEN = re.compile(r"\w+")
+
+
+def value_index_path_for(db_folder: str) -> str:
+    return os.path.join(db_folder, "value_index")
+
+
+def normalize_value(text: str) -> str:
+    """Πεζά, χωρίς τόνους και σημεία στίξης: "São Paulo!" -> "sao paulo"."""
+    text = unicodedata.normalize("NFKD", str(text))
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return " ".join(_TOKEN.findall(text.casefold()))
+
+
+def _hash(normalized: str) -> int:
+    return int.from_bytes(hashlib.blake2b(normalized.encode("utf-8"), digest_size=8).digest(), "big", signed=True)
+
+
+def _is_text_value(value, max_words: int) -> bool:
+    # Μόνο κείμενα με γράμματα: αριθμοί, ημερομηνίες και ids θα ταίριαζαν τυχαία
+    if not isinstance(value, str) or not any(ch.isalpha() for ch in value):
+        return False
+    normalized = normalize_value(value)
+    return len(normalized) >= 2 and 0 < normalized.count(" ") + 1 <= max_words
+
+
+class ValueIndex:
+    """
+    Τιμή -> (πίνακας, στήλη): hash (64-bit) της κανονικοποιημένης τιμής σε ταξινομημένο
+    πίνακα keys, με postings σε μορφή CSR (ptr -> column, count) και το κείμενο κάθε
+    posting όπως είναι στη βάση (text_ptr -> text.bin), για το literal του SQL.
+
+    Χτίζεται από τα top_values του <db>_stats.json και τα "values" (πλήρεις λίστες τιμών
+    στηλών με λίγες διακριτές τιμές, βλ. StatsCollector distinct_limit). Αποθηκεύεται
+    στο value_index/ (memory-mapped). Το lookup μιας φράσης είναι ένα hash και ένα
+    searchsorted, χωρίς να φορτωθούν οι τιμές.
+    """
+    def __init__(self, arrays: dict, text, meta: dict):
+        self.meta = meta
+        self.columns = [tuple(c) for c in meta["columns"]]
+        self.max_words = int(meta["max_words"])
+        self.text = text
+        for name in ARRAYS:
+            setattr(self, name, np.asarray(arrays[name]).view(np.ndarray))
+
+    @property
+    def size(self) -> int:
+        return len(self.keys)
+
+    # ---------------- build ----------------
+    @classmethod
+    def build(cls, stats: dict, max_words: int = 4) -> "ValueIndex":
+        """stats: το <db>_stats.json ({table: {"columns": {column: {"top_values", "values"}}}})."""
+        columns, postings = [], {}
+        for table, table_info in stats.items():
+            for column, col_stat in (table_info.get("columns") or {}).items():
+                values = {}
+                for item in (col_stat.get("top_values") or []) + (col_stat.get("values") or []):
+                    value = item.get("value")
+                    if _is_text_value(value, max_words):
+                        values[value] = max(values.get(value, 0), item.get("count") or 0)
+                if not values:
+                    continue
+                column_id = len(columns)
+                columns.append((table, column))
+                for value, count in values.items():
+                    postings.setdefault(_hash(normalize_value(value)), []).append((column_id, count, value))
+
+        keys = sorted(postings)
+        ptr = np.zeros(len(keys) + 1, dtype=np.int64)
+        column, count, texts = [], [], []
+        for i, key in enumerate(keys):
+            # Οι στήλες όπου η τιμή είναι πιο συχνή πρώτες
+            for column_id, value_count, value in sorted(postings[key], key=lambda p: -p[1]):
+                column.append(column_id)
+                count.append(value_count)
+                texts.append(value.encode("utf-8"))
+            ptr[i + 1] = len(column)
+        text_ptr = np.zeros(len(texts) + 1, dtype=np.int64)
+        np.cumsum([len(t) for t in texts], out=text_ptr[1:])
+        arrays = {
+            "keys": np.array(keys, dtype=np.int64),
+            "ptr": ptr,
+            "column": np.array(column, dtype=np.int32),
+            "count": np.array(count, dtype=np.int64),
+            "text_ptr": text_ptr
+        }
+        text = np.frombuffer(b"".join(texts), dtype=np.uint8)
+        return cls(arrays, text, {"columns": columns, "max_words": max_words})
+
+    # ---------------- save / load ----------------
+    def save(self, path: str):
+        tmp = path + ".tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        for name in ARRAYS:
+            np.save(os.path.join(tmp, f"{name}.npy"), getattr(self, name))
+        with open(os.path.join(tmp, "text.bin"), "wb") as f:
+            f.write(self.text.tobytes())
+        with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(self.meta, f, ensure_ascii=False)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp, path)
+        print(f"Value index ({self.size} values, {len(self.columns)} columns) saved at: {path}")
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "ValueIndex":
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r" if mmap else None) for name in ARRAYS}
+        text_file = os.path.join(path, "text.bin")
+        if mmap and os.path.getsize(text_file):
+            text = np.memmap(text_file, dtype=np.uint8, mode="r")
+        else:
+            text = np.fromfile(text_file, dtype=np.uint8)
+        return cls(arrays, text, meta)
+
+    # ---------------- lookups ----------------
+    def get(self, value: str, limit: int = None):
+        """[(table, column, count, τιμή όπως στη βάση)] για μια τιμή, έως limit, με σειρά συχνότητας."""
+        normalized = normalize_value(value)
+        if not normalized or not self.size:
+            return []
+        key = _hash(normalized)
+        i = int(np.searchsorted(self.keys, key))
+        if i >= self.size or self.keys[i] != key:
+            return []
+        start, end = self.ptr[i:i + 2].tolist()
+        if limit is not None:
+            end = min(end, start + limit)
+        result = []
+        for p in range(start, end):
+            a, b = self.text_ptr[p:p + 2].tolist()
+            table, column = self.columns[int(self.column[p])]
+            result.append((table, column, int(self.count[p]), bytes(self.text[a:b]).decode("utf-8")))
+        return result
+
+    def lookup(self, text: str, max_columns: int = 3):
+        """
+        Οι τιμές που αναφέρει μια ερώτηση: φράσεις έως max_words λέξεων, η μεγαλύτερη
+        πρώτα και χωρίς επικαλύψεις. [(φράση, [(table, column, count, τιμή)])], έως
+        max_columns στήλες ανά φράση.
+        """
+        words = normalize_value(text).split()
+        found = []
+        i = 0
+        while i < len(words):
+            for n in range(min(self.max_words, len(words) - i), 0, -1):
+                phrase = " ".join(words[i:i + n])
+                if n == 1 and (phrase in STOPWORDS or phrase.isdigit()):
+                    continue
+                hits = self.get(phrase, max_columns)
+                if hits:
+                    found.append((phrase, hits))
+                    i += n
+                    break
+            else:
+                i += 1
+        return found
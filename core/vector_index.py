@@ -0,0 +1,134 @@
+# ----------------------------- core/vector_index.py -----------------------------
+import os
+import json
+import numpy as np
+import faiss
+
+INDEX_TYPES = ("auto", "flat", "hnsw", "ivf")
+# none: float32, sq8: 1 byte/διάσταση (4x), pq: dim/8 bytes/vector (32x)
+QUANTIZATIONS = ("none", "sq8", "pq")
+# Το PQ χρειάζεται ~39 σημεία εκπαίδευσης για κάθε ένα από τα 256 centroids
+PQ_MIN_VECTORS = 39 * 256
+
+
+def normalize(vectors) -> np.ndarray:
+    """float32, contiguous, L2-normalized αντίγραφο (inner product == cosine)."""
+    vectors = np.array(vectors, dtype=np.float32, copy=True, ndmin=2)
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def resolve_index_type(n: int, index_type: str = "auto", ann_threshold: int = 20000) -> str:
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type: {index_type} (expected one of {INDEX_TYPES})")
+    if index_type == "auto":
+        # Κάτω από το threshold το exact flat search είναι ήδη αρκετά γρήγορο
+        return "flat" if n < ann_threshold else "hnsw"
+    return index_type
+
+
+def resolve_quantization(n: int, quantization: str = "none") -> str:
+    if quantization not in QUANTIZATIONS:
+        raise ValueError(f"Unknown quantization: {quantization} (expected one of {QUANTIZATIONS})")
+    if quantization == "pq" and n < PQ_MIN_VECTORS:
+        # Λίγα vectors για εκπαίδευση του PQ: scalar quantizer
+        return "sq8"
+    return quantization
+
+
+def pq_subquantizers(dim: int) -> int:
+    # ~dim/8 sub-vectors των 8 bits: 32x μικρότερα από float32, και πρέπει να διαιρεί το dim
+    m = max(1, dim // 8)
+    while dim % m:
+        m -= 1
+    return m
+
+
+def _ivf_nlist(n: int) -> int:
+    # IVF: ~4*sqrt(n) lists, με τουλάχιστον ~39 σημεία εκπαίδευσης ανά list
+    return max(1, min(int(4 * np.sqrt(n)), n // 39))
+
+
+def make_quantized_index(dim: int, n: int, kind: str, quantization: str):
+    """
+    sq8: SQ8 / HNSW32,SQ8 / IVF,SQ8.  pq: PQ / IVF,PQ (και για hnsw: το HNSW πάνω σε PQ
+    codes εκπαιδεύεται πολύ αργά, οπότε χρησιμοποιείται IVF).
+    """
+    codec = "SQ8" if quantization == "sq8" else f"PQ{pq_subquantizers(dim)}"
+    if kind == "flat":
+        spec = codec
+    elif kind == "hnsw" and quantization == "sq8":
+        spec = f"HNSW32,{codec}"
+    else:
+        spec = f"IVF{_ivf_nlist(n)},{codec}"
+    index = faiss.index_factory(dim, spec, faiss.METRIC_INNER_PRODUCT)
+    if isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efConstruction = 80
+    return index
+
+
+def is_exact(index) -> bool:
+    """Flat float32 index: τα scores είναι ήδη τα ακριβή, δεν χρειάζεται rescoring."""
+    return isinstance(index, faiss.IndexFlat)
+
+
+def make_index(dim: int, n: int, index_type: str = "auto", ann_threshold: int = 20000, quantization: str = "none"):
+    kind = resolve_index_type(n, index_type, ann_threshold)
+    quantization = resolve_quantization(n, quantization)
+    if quantization != "none":
+        return make_quantized_index(dim, n, kind, quantization)
+    if kind == "flat":
+        return faiss.IndexFlatIP(dim)
+    if kind == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, 32, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = 80
+        return index
+    quantizer = faiss.IndexFlatIP(dim)
+    return faiss.IndexIVFFlat(quantizer, dim, _ivf_nlist(n), faiss.METRIC_INNER_PRODUCT)
+
+
+def build_index(embeddings, index_type: str = "auto", ann_threshold: int = 20000, quantization: str = "none"):
+    vectors = normalize(embeddings)
+    index = make_index(vectors.shape[1], len(vectors), index_type, ann_threshold, quantization)
+    if not index.is_trained:
+        index.train(vectors)
+    index.add(vectors)
+    return index
+
+
+def tune_index(index, nprobe: int = 16, ef_search: int = 64):
+    """Παράμετροι αναζήτησης για τα ANN indexes (no-op για flat)."""
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = min(nprobe, ivf.nlist)
+    if isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = ef_search
+    return index
+
+
+def read_index(path: str, mmap: bool = True):
+    # Memory-mapped: οι σελίδες φορτώνονται on demand και μοιράζονται μεταξύ processes
+    if mmap:
+        try:
+            return faiss.read_index(path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+        except RuntimeError:
+            pass
+    return faiss.read_index(path)
+
+
+def ids_path_for(index_path: str) -> str:
+    return os.path.splitext(index_path)[0] + "_ids.json"
+
+
+def save_ids(index_path: str, ids):
+    """ids[i] = [source, chunk_idx] για τη γραμμή i του index."""
+    with open(ids_path_for(index_path), "w", encoding="utf-8") as f:
+        json.dump(ids, f)
+
+
+def load_ids(index_path: str):
+    path = ids_path_for(index_path)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return [tuple(i) for i in json.load(f)]
@@ -1,17 +1,46 @@
 import os
 import sys
+import json
+import time
 from dotenv import load_dotenv
-from llama_cpp import Llama
 
-from core.schema_loader import SchemaLoader
-from core.graph_builder import GraphBuilder
-from core.stats_collector import StatsCollector
-from core.chunks import MultiJSONChunker
-from core.query_ai import QueryAI
+# Τα βαριά modules (sentence_transformers/torch, faiss, llama_cpp, pyodbc) φορτώνονται
+# μέσα στα στάδια που τα χρειάζονται, ώστε ένα start με ενημερωμένα αρχεία να μην τα πληρώνει
+from core.background import BackgroundModel
+from core.instrumentation import instrumentation, configure_from_env
 
 MODEL_NAME = "mistral-7b-instruct-v0.1.Q4_K_M.gguf"
+EMBED_MODEL_NAME = "all-MiniLM-L6-v2"
+
+
+def load_embed_model():
+    from sentence_transformers import SentenceTransformer
+    model = SentenceTransformer(EMBED_MODEL_NAME)
+    model.model_name = EMBED_MODEL_NAME
+    return model
+
+
+def load_llm(base_path):
+    # Με LLM_SERVER_URL το μοντέλο μένει φορτωμένο στο core.llm_server
+    llm_server_url = os.getenv("LLM_SERVER_URL")
+    if llm_server_url:
+        from core.llm_server import RemoteLLM
+        llm = RemoteLLM(llm_server_url)
+        if not llm.health():
+            raise RuntimeError(f" LLM server not reachable at {llm_server_url}")
+        return llm
+
+    from llama_cpp import Llama
+    return Llama(
+        model_path=os.path.join(base_path, "models", MODEL_NAME),
+        n_ctx=2048,
+        n_gpu_layers=10,
+        verbose=False
+    )
+
 
 def main():
+    started = time.perf_counter()
     load_dotenv()
 
     # --- Base path ---
@@ -24,52 +53,183 @@ def main():
 
     db_name = os.getenv("DB_DATABASE")
     stats_mode = os.getenv("STATS_PARAMETER", "full").lower()
-    if not db_name:
+    stats_workers = int(os.getenv("STATS_WORKERS", "1"))
+    stats_timeout = float(os.getenv("STATS_TABLE_TIMEOUT", "0")) or None
+    stats_sample_rows = int(os.getenv("STATS_SAMPLE_ROWS", "10000"))
+    # STATS_DISTINCT_LIMIT: όλες οι τιμές κειμενικών στηλών με έως τόσες διακριτές τιμές (value index)
+    stats_distinct_limit = int(os.getenv("STATS_DISTINCT_LIMIT", "0"))
+    # GRAPH_JSON=off: μόνο το binary graph store, χωρίς <db>_graph.json
+    graph_json = os.getenv("GRAPH_JSON", "on").lower() not in {"off", "0", "false", "none"}
+    # SERVE_DATABASES: κενό = μόνο η DB_DATABASE, "all" = όλοι οι φάκελοι του databases/
+    # με chunk store, ή λίστα με κόμματα
+    serve = os.getenv("SERVE_DATABASES", "").strip()
+    max_active = int(os.getenv("MAX_ACTIVE_DATABASES", "4"))
+    if not db_name and not serve:
         raise RuntimeError(" DB_DATABASE not set in .env")
 
-    db_folder = os.path.join(base_path, "databases", db_name)
-    os.makedirs(db_folder, exist_ok=True)
     results_folder = os.path.join(base_path, "results")
     os.makedirs(results_folder, exist_ok=True)
-
-    SchemaLoader(base_path, db_name).load_schema()
-
-    GraphBuilder(base_path, db_name).build()
-
-    StatsCollector(base_path, db_name, mode=stats_mode).collect_stats()
-
-
-    MultiJSONChunker(base_path, db_name).run()
-
- 
-    llm = Llama(
-        model_path=os.path.join(base_path, "models", MODEL_NAME),
-        n_ctx=2048,
-        n_gpu_layers=10,
-        verbose=False
-    )
+    # INSTRUMENTATION=on: spans σε instrumentation/spans.jsonl και metrics στην έξοδο
+    instrumentation_folder = os.path.join(base_path, "instrumentation")
+    configure_from_env(instrumentation_folder)
+
+    # Ένα embedding model για τον chunker και για όλες τις βάσεις που εξυπηρετούνται. Φορτώνει
+    # σε background thread μαζί με το LLM: το περιμένει μόνο όποιος το χρειαστεί πρώτος
+    # (ο chunker αν τα chunks δεν είναι ενημερωμένα, αλλιώς η πρώτη ερώτηση)
+    timings = {}
+    embed_model = BackgroundModel(load_embed_model, EMBED_MODEL_NAME)
+
+    if db_name:
+        phase = time.perf_counter()
+        with instrumentation.span("pipeline", database=db_name):
+            build_database(base_path, db_name, embed_model, stats_mode, stats_workers,
+                           stats_timeout, stats_sample_rows, graph_json, stats_distinct_limit)
+        timings["pipeline"] = time.perf_counter() - phase
+
+    phase = time.perf_counter()
+    llm = load_llm(base_path)
+    timings["llm"] = time.perf_counter() - phase
 
     # -------------------------------
-    #  Query AI
-    query_ai = QueryAI(base_path=base_path, db_name=db_name, top_k=3, llm=llm)
+    #  Query AI: ένα QueryAI ανά βάση, φορτώνεται όταν τη ρωτήσουν (LRU έως MAX_ACTIVE_DATABASES)
+    if not serve:
+        databases = [db_name]
+    elif serve.lower() == "all":
+        databases = None
+    else:
+        databases = [name.strip() for name in serve.split(",") if name.strip()]
+    phase = time.perf_counter()
+    from core.registry import DatabaseRegistry
+    result_cache = os.getenv("RESULT_CACHE", "on").lower() not in {"off", "0", "false", "none"}
+    registry = DatabaseRegistry(base_path, llm, embed_model=embed_model, databases=databases,
+                                max_active=max_active, top_k=3,
+                                result_cache_path="default" if result_cache else None,
+                                cache_threshold=float(os.getenv("RESULT_CACHE_THRESHOLD", "0.92")),
+                                cache_ttl_seconds=float(os.getenv("RESULT_CACHE_TTL_HOURS", "168")) * 3600,
+                                sql_grammar=os.getenv("SQL_GRAMMAR", "off").lower())
+    timings["query_ai"] = time.perf_counter() - phase
+    print(f"⏱ Ready in {time.perf_counter() - started:.1f}s "
+          f"({', '.join(f'{name} {seconds:.1f}s' for name, seconds in timings.items())})")
+    if len(registry.databases) > 1:
+        print(f"Serving {len(registry.databases)} databases: {', '.join(registry.databases)}"
+              f" (prefix a question with '<db>:' to pick one)")
 
     # -------------------------------
     #  Interactive loop
     while True:
         user_query = input("\n Query (or 'exit'): ").strip()
         if user_query.lower() in {"exit", "quit"}:
+            for name, stats in registry.result_cache_stats().items():
+                print(f"📊 Result cache ({name}): {stats}")
+            print(f"📊 Databases: {registry.stats()}")
+            save_instrumentation(instrumentation_folder)
+            registry.close()
             break
+        if user_query.startswith(":"):
+            instrumentation_command(user_query, instrumentation_folder)
+            continue
 
-        sql_query = query_ai.generate_sql(user_query)
+        target, question, query_vec = registry.resolve(user_query)
+        if len(registry.databases) > 1:
+            print(f"→ {target}")
 
+        # Το SQL τυπώνεται όπως παράγεται
         print("\n" + "="*60)
-        print(sql_query)
-        print("="*60 + "\n")
+        query_ai = registry.get(target)
+        pieces = []
+        for piece in query_ai.stream_sql(question, query_vec=query_vec):
+            print(piece, end="", flush=True)
+            pieces.append(piece)
+        sql_query = "".join(pieces).strip()
+        print("\n" + "="*60 + "\n")
+        # None όταν η απάντηση ήρθε από το result cache
+        usage = query_ai.last_usage
 
         # Save
         filename = os.path.join(results_folder, f"query_{len(os.listdir(results_folder)) + 1}.txt")
         with open(filename, "w", encoding="utf-8") as f:
-            f.write(f"--- Query ---\n{user_query}\n\n--- SQL ---\n{sql_query}\n")
+            f.write(f"--- Database ---\n{target}\n\n--- Query ---\n{question}\n\n--- SQL ---\n{sql_query}\n")
+            if usage:
+                f.write(f"\n--- Prompt tokens ---\n{json.dumps(usage)}\n")
+
+
+def instrumentation_command(command, folder):
+    """:instrument on|off, :profile on|off, :metrics (σύνοψη των spans), :prometheus"""
+    name, _, value = command[1:].strip().partition(" ")
+    value = value.strip().lower()
+    if name in ("instrument", "profile") and value in ("on", "off"):
+        if name == "instrument":
+            jsonl_path = instrumentation.status()["jsonl_path"] or os.path.join(folder, "spans.jsonl")
+            instrumentation.configure(enabled=value == "on", jsonl_path=jsonl_path if value == "on" else None)
+        else:
+            instrumentation.configure(profiling=value == "on")
+        print(f"📈 Instrumentation: {instrumentation.status()}")
+    elif name == "metrics":
+        for span_name, metric in instrumentation.metrics().items():
+            print(f"{span_name:<24} {metric}")
+    elif name == "prometheus":
+        print(instrumentation.prometheus())
+    else:
+        print("Commands: :instrument on|off, :profile on|off, :metrics, :prometheus")
+
+
+def save_instrumentation(folder):
+    """Στην έξοδο: metrics.prom (Prometheus text) και ένα .pstats ανά hot path που έγινε profile."""
+    metrics = instrumentation.metrics()
+    if metrics:
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, "metrics.prom")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(instrumentation.prometheus())
+        print(f"📈 Metrics ({len(metrics)} span types) saved at: {path}")
+    for path in instrumentation.dump_profiles(os.path.join(folder, "profiles")):
+        print(f"📈 Profile saved at: {path}")
+    instrumentation.close()
+
+
+def build_database(base_path, db_name, embed_model, stats_mode, stats_workers,
+                   stats_timeout, stats_sample_rows, graph_json, stats_distinct_limit=0):
+    """
+    Schema, graph, stats και chunks της DB_DATABASE (το connection string είναι στο .env).
+    Κάθε στάδιο τρέχει μόνο αν λείπουν ή είναι παλιά τα αρχεία του, οπότε με όλα
+    ενημερωμένα δεν ανοίγει σύνδεση στη βάση ούτε χρειάζεται το embedding model.
+    """
+    db_folder = os.path.join(base_path, "databases", db_name)
+    os.makedirs(db_folder, exist_ok=True)
+
+    if os.getenv("SCHEMA_REFRESH", "none").lower() == "incremental":
+        from core.refresh import IncrementalRefresher
+        IncrementalRefresher(base_path, db_name, stats_mode=stats_mode,
+                             workers=stats_workers, table_timeout=stats_timeout,
+                             sample_rows=stats_sample_rows, distinct_limit=stats_distinct_limit,
+                             export_graph_json=graph_json).refresh()
+
+    from core.schema_loader import SchemaLoader, schema_path_for
+    schema_built = not os.path.exists(schema_path_for(db_folder, db_name))
+    if schema_built:
+        SchemaLoader(base_path, db_name).extract_schema()
+
+    from core.graph_builder import GraphBuilder
+    graph_builder = GraphBuilder(base_path, db_name, export_json=graph_json)
+    if schema_built or not graph_builder.is_built():
+        graph_builder.build(force=schema_built)
+
+    if stats_mode != "none" and not os.path.exists(os.path.join(db_folder, f"{db_name}_stats.json")):
+        from core.stats_collector import StatsCollector
+        StatsCollector(base_path, db_name, mode=stats_mode,
+                       workers=stats_workers, table_timeout=stats_timeout,
+                       sample_rows=stats_sample_rows, distinct_limit=stats_distinct_limit).collect_stats()
+
+    from core.chunks import MultiJSONChunker
+    chunker = MultiJSONChunker(base_path, db_name, embed_model=embed_model,
+                               index_type=os.getenv("VECTOR_INDEX", "auto").lower(),
+                               store_dtype=os.getenv("CHUNK_STORE_DTYPE", "float32").lower(),
+                               quantization=os.getenv("VECTOR_QUANTIZATION", "none").lower())
+    if chunker.is_current():
+        print(f"Chunks and FAISS index are up to date in {db_folder}")
+    else:
+        chunker.run()
+
 
 if __name__ == "__main__":
     main()